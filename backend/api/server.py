@@ -8,11 +8,11 @@ Or with uvicorn directly:
     uvicorn backend.api.server:app --reload --host localhost --port 8000
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Optional, AsyncIterator
+from pydantic import BaseModel, Field
+from typing import Optional, Literal, AsyncIterator
 import json
 import sys
 import asyncio
@@ -22,10 +22,23 @@ from pathlib import Path
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
-from scripts.config import validate_config, API_PORT, API_HOST
+from scripts.config import (
+    validate_config, API_PORT, API_HOST, FOOTPRINT_CACHE_ENABLED, STATISTICS_CUBE_ENABLED, RESULT_PAGE_SIZE,
+    FUNCTION_INDEX_ENABLED, LEXICAL_SEARCH_ENABLED, FUNCTION_HIERARCHY_ENABLED, EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_WARMUP
+)
 from scripts.graph import graph
 from scripts.main import create_initial_state
-from scripts.utils.neo4j_client import neo4j_client
+from scripts.utils.neo4j_client import neo4j_client, async_neo4j_client
+from scripts.utils.centroid_cache import centroid_cache
+from scripts.utils.footprint_cache import footprint_cache, attach_footprint_geojson
+from scripts.utils.statistics_cube import statistics_cube
+from scripts.utils.function_index import function_index
+from scripts.utils.lexical_index import lexical_index
+from scripts.utils.function_hierarchy import function_hierarchy
+from scripts.utils.embedding_cache import embedding_cache
+from scripts.utils.result_store import result_store
+from scripts.utils.query_cache import query_cache
 
 
 app = FastAPI(
@@ -49,6 +62,11 @@ class QueryRequest(BaseModel):
     query: str
     stream: Optional[bool] = True
     spatial_filter: Optional[str] = None  # WKT geometry string in EPSG:25833
+    # How polygon filters test buildings: by centroid ("containment") or by footprint
+    spatial_mode: Optional[Literal["containment", "intersects", "within", "overlap"]] = None
+    min_overlap: Optional[float] = Field(default=None, ge=0.0, le=1.0)  # For spatial_mode "overlap"
+    # Attach building footprints (geometry_geojson) to the final results, e.g. for map display
+    include_geometry: Optional[bool] = True
 
 
 class QueryResponse(BaseModel):
@@ -64,22 +82,73 @@ class QueryResponse(BaseModel):
 
 @app.on_event("startup")
 async def startup_event():
-    """Validate configuration and database connection on startup."""
+    """Validate configuration and database connection on startup, then warm caches."""
     try:
         validate_config()
-        if not neo4j_client.verify_connection():
+        if not await async_neo4j_client.verify_connection():
             raise RuntimeError("Could not connect to Neo4j database")
         print("Server started successfully")
         print("Neo4j connection verified")
     except Exception as e:
         print(f"Startup failed: {e}")
         raise
+    
+    # Warm caches; the agent falls back to parsing geometries if this fails
+    try:
+        cached = centroid_cache.warm()
+        print(f"Centroid cache warmed with {cached} buildings")
+    except Exception as e:
+        print(f"Centroid cache warm-up failed: {e}")
+    
+    if FOOTPRINT_CACHE_ENABLED:
+        try:
+            cached = footprint_cache.warm()
+            print(f"Footprint cache warmed with {cached} buildings")
+        except Exception as e:
+            print(f"Footprint cache warm-up failed: {e}")
+    
+    if STATISTICS_CUBE_ENABLED:
+        try:
+            cells = statistics_cube.warm()
+            print(f"Statistics cube loaded with {cells} cells")
+        except Exception as e:
+            print(f"Statistics cube load failed: {e}")
+    
+    if FUNCTION_INDEX_ENABLED:
+        try:
+            functions = function_index.warm()
+            print(f"Function index loaded with {functions} building functions")
+        except Exception as e:
+            print(f"Function index load failed: {e}")
+    
+    if LEXICAL_SEARCH_ENABLED:
+        try:
+            functions = lexical_index.warm()
+            print(f"Lexical index built over {functions} building functions")
+        except Exception as e:
+            print(f"Lexical index load failed: {e}")
+    
+    if FUNCTION_HIERARCHY_ENABLED:
+        try:
+            functions = function_hierarchy.warm()
+            print(f"Function hierarchy closure built over {functions} building functions")
+        except Exception as e:
+            print(f"Function hierarchy load failed: {e}")
+    
+    if EMBEDDING_CACHE_ENABLED and EMBEDDING_CACHE_WARMUP:
+        try:
+            embedded = embedding_cache.warm(EMBEDDING_CACHE_WARMUP)
+            print(f"Embedding cache warmed with {embedded} new function queries")
+        except Exception as e:
+            print(f"Embedding cache warm-up failed: {e}")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close database connections on shutdown."""
     neo4j_client.close()
+    await async_neo4j_client.close()
+    embedding_cache.close()
     print("Server shutdown complete")
 
 
@@ -96,14 +165,64 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Detailed health check including database connection."""
-    db_status = neo4j_client.verify_connection()
+    db_status = await async_neo4j_client.verify_connection()
     return {
         "status": "healthy" if db_status else "degraded",
-        "database": "connected" if db_status else "disconnected"
+        "database": "connected" if db_status else "disconnected",
+        "query_cache": query_cache.stats()
     }
 
 
-async def stream_agent_state(query: str, spatial_filter: str = None) -> AsyncIterator[str]:
+def _with_geometry(results: list, include_geometry: bool) -> list:
+    """Attach footprints to the buildings of results, or strip them if not requested."""
+    if not include_geometry:
+        if results and isinstance(results[0], dict) and results[0].get("buildings"):
+            buildings = [
+                {key: value for key, value in b.items() if key != "geometry_geojson"}
+                for b in results[0]["buildings"]
+            ]
+            return [{**results[0], "buildings": buildings}] + list(results[1:])
+        return results
+    try:
+        return attach_footprint_geojson(results)
+    except Exception as e:
+        print(f"Attaching footprints failed: {e}")
+        return results
+
+
+def _final_results(final_state: dict, include_geometry: bool) -> list:
+    """
+    Final results for the response.
+    
+    Results with more than RESULT_PAGE_SIZE buildings are stored in the result
+    store; only the first page is returned, with a 'pagination' entry
+    (result_id, total, page_size, next_offset) for the /results endpoint.
+    Footprints are fetched only for the returned buildings and only if requested.
+    """
+    results = final_state.get("results", [])
+    if results and isinstance(results[0], dict) and len(results[0].get("buildings") or []) > RESULT_PAGE_SIZE:
+        buildings = results[0]["buildings"]
+        result_id = result_store.put(buildings)
+        results = [{
+            **results[0],
+            "buildings": buildings[:RESULT_PAGE_SIZE],
+            "pagination": {
+                "result_id": result_id,
+                "total": len(buildings),
+                "page_size": RESULT_PAGE_SIZE,
+                "next_offset": RESULT_PAGE_SIZE,
+            }
+        }] + list(results[1:])
+    return _with_geometry(results, include_geometry)
+
+
+async def stream_agent_state(
+    query: str,
+    spatial_filter: str = None,
+    spatial_mode: str = None,
+    min_overlap: float = None,
+    include_geometry: bool = True
+) -> AsyncIterator[str]:
     """
     Stream agent execution messages as Server-Sent Events.
     
@@ -118,12 +237,14 @@ async def stream_agent_state(query: str, spatial_filter: str = None) -> AsyncIte
     - error: error message
     """
     try:
-        initial_state = create_initial_state(query, spatial_filter)
+        initial_state = create_initial_state(query, spatial_filter, spatial_mode, min_overlap)
         sent_messages = set()  # Track which messages we've already sent
         
-        # Stream graph execution with stream_mode="values" to get complete state each time
+        # Stream graph execution with stream_mode="values" to get complete state each time;
+        # astream runs sync nodes in worker threads and awaits database I/O, so the
+        # event loop keeps serving other requests
         final_state = None
-        for step_output in graph.stream(initial_state, stream_mode="values"):
+        async for step_output in graph.astream(initial_state, stream_mode="values"):
             # step_output is now the complete state after each node
             # Get all current messages
             all_messages = step_output.get("messages", [])
@@ -134,7 +255,6 @@ async def stream_agent_state(query: str, spatial_filter: str = None) -> AsyncIte
                 if message_id not in sent_messages:
                     yield f"data: {json.dumps({'type': 'message', 'content': message}, ensure_ascii=False)}\n\n"
                     sent_messages.add(message_id)
-                    await asyncio.sleep(0)
             
             final_state = step_output
         
@@ -150,7 +270,7 @@ async def stream_agent_state(query: str, spatial_filter: str = None) -> AsyncIte
                 "building_function_descriptions": final_state.get("building_function_descriptions", []),
                 "query_type": final_state.get("query_type", ""),
                 "cypher_query": final_state.get("cypher_query", ""),
-                "results": final_state.get("results", []),
+                "results": await asyncio.to_thread(_final_results, final_state, include_geometry),
                 "spatial_comparison": final_state.get("spatial_comparison"),
                 "final_answer": final_state.get("final_answer", ""),
                 "error": final_state.get("error"),
@@ -181,7 +301,10 @@ async def query_agent(request: QueryRequest):
     # Streaming response
     if request.stream:
         return StreamingResponse(
-            stream_agent_state(request.query, request.spatial_filter),
+            stream_agent_state(
+                request.query, request.spatial_filter, request.spatial_mode,
+                request.min_overlap, request.include_geometry
+            ),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
@@ -192,21 +315,54 @@ async def query_agent(request: QueryRequest):
     
     # Non-streaming response
     try:
-        initial_state = create_initial_state(request.query, request.spatial_filter)
-        final_state = graph.invoke(initial_state)
+        initial_state = create_initial_state(
+            request.query, request.spatial_filter, request.spatial_mode, request.min_overlap
+        )
+        final_state = await graph.ainvoke(initial_state)
         
         # Return complete AgentState as JSON
-        return final_state
+        results = await asyncio.to_thread(_final_results, final_state, request.include_geometry)
+        return {**final_state, "results": results}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
 
+@app.get("/results/{result_id}")
+async def get_result_page(
+    result_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(RESULT_PAGE_SIZE, ge=1, le=5000),
+    sort_by: Optional[str] = None,
+    descending: bool = False,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    include_geometry: bool = True
+):
+    """
+    Fetch a page of a stored query result.
+    
+    Large results of /query are kept server-side; the response of /query
+    contains the first page and 'pagination.result_id'. Pages can be sorted
+    by a building attribute and restricted to a value range of it.
+    """
+    try:
+        page = result_store.page(result_id, offset, limit, sort_by, descending, min_value, max_value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    
+    results = await asyncio.to_thread(_with_geometry, [{"buildings": page["buildings"]}], include_geometry)
+    page["buildings"] = results[0]["buildings"]
+    return page
+
+
 @app.get("/functions")
 async def list_building_functions():
     """List all available building functions from the database."""
     try:
-        functions = neo4j_client.get_building_functions()
+        functions = await async_neo4j_client.get_building_functions()
         return {
             "count": len(functions),
             "functions": functions
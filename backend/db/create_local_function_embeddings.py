@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Create local-model embeddings for BuildingFunction descriptions in Neo4j.
+
+Companion of create_function_embeddings.py for EMBEDDING_PROVIDER=local:
+embeds all Function descriptions with the in-process sentence-transformers
+model (LOCAL_EMBEDDING_MODEL) and stores them as description_embedding_local,
+so query embeddings of the local provider and the stored vectors live in the
+same vector space. Also creates the cosine vector index
+function_embeddings_local and updates the dataset version stamp so running
+backends reload their function index.
+
+Usage:
+    python create_local_function_embeddings.py [--model NAME] [--batch-size 64]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Dict
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+# Shared dataset version stamp of the import scripts
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "data_import"))
+
+from scripts.config import LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_DEVICE, NEO4J_DATABASE
+from scripts.utils.embedding_providers import LocalEmbeddingProvider
+from scripts.utils.neo4j_client import neo4j_client
+from data_version import bump_data_version
+
+
+def fetch_functions() -> List[Dict]:
+    """Fetch all Function nodes with code, name, and description."""
+    return neo4j_client.execute_query(
+        """
+        MATCH (f:Function)
+        WHERE f.description IS NOT NULL
+        RETURN f.code AS code, f.name AS name, f.description AS description
+        ORDER BY f.code
+        """,
+        tag="local_embeddings"
+    )
+
+
+def store_embeddings(tx, rows: List[Dict], model: str):
+    tx.run(
+        """
+        UNWIND $rows AS row
+        MATCH (f:Function {code: row.code})
+        SET f.description_embedding_local = row.embedding,
+            f.description_embedding_local_model = $model
+        """,
+        rows=rows,
+        model=model,
+    )
+
+
+def create_vector_index(session, dimension: int):
+    """(Re)create the cosine vector index over the local embeddings with the model's dimension."""
+    session.run("DROP INDEX function_embeddings_local IF EXISTS")
+    # Index options do not accept parameters
+    session.run(
+        f"""
+        CREATE VECTOR INDEX function_embeddings_local IF NOT EXISTS
+        FOR (f:Function) ON (f.description_embedding_local)
+        OPTIONS {{indexConfig: {{
+            `vector.dimensions`: {int(dimension)},
+            `vector.similarity_function`: 'cosine'
+        }}}}
+        """
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create local-model embeddings for BuildingFunction descriptions in Neo4j"
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=LOCAL_EMBEDDING_MODEL,
+        help="sentence-transformers model (must match LOCAL_EMBEDDING_MODEL of the backend)",
+    )
+    parser.add_argument("--device", type=str, default=LOCAL_EMBEDDING_DEVICE, help="Torch device")
+    parser.add_argument("--batch-size", type=int, default=64, help="Descriptions per batch")
+    args = parser.parse_args()
+
+    provider = LocalEmbeddingProvider(args.model, args.device)
+
+    try:
+        print("Fetching Function nodes from Neo4j...")
+        functions = fetch_functions()
+        print(f"Found {len(functions)} Function with descriptions\n")
+        if not functions:
+            print("No Function found. Exiting.")
+            return 0
+
+        print(f"Creating embeddings using {args.model} on {args.device}")
+        print("=" * 60)
+        with neo4j_client.session() as session:
+            for start in range(0, len(functions), args.batch_size):
+                batch = functions[start:start + args.batch_size]
+                embeddings = provider.embed([f["description"] for f in batch])
+                rows = [{"code": f["code"], "embedding": e} for f, e in zip(batch, embeddings)]
+                session.execute_write(store_embeddings, rows, args.model)
+                print(f"  Stored {start + len(batch)}/{len(functions)}")
+
+            create_vector_index(session, provider.dimension)
+            print(f"Vector index function_embeddings_local ({provider.dimension} dimensions) created")
+            # Building data is unchanged, so a current statistics cube stays current
+            bump_data_version(session, keep_cube=True)
+
+        print(f"\nLocal embeddings created in database '{NEO4J_DATABASE}'")
+        return 0
+
+    finally:
+        neo4j_client.close()
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -9,11 +9,97 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
 
+# Embedding Provider Configuration
+# "openai" (OPENAI_EMBEDDING_MODEL) or "local" (sentence-transformers model in-process, see
+# db/create_local_function_embeddings.py for the matching Function vectors)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+LOCAL_EMBEDDING_DEVICE = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+
 # Neo4j Configuration
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+# Connection pool of the Neo4j drivers (per driver: one sync, one async for the API)
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+# Seconds to wait for a free pooled connection before a query fails
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "60"))
+# Seconds after which pooled connections are closed and replaced (below server/load balancer idle limits)
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+# Seconds a read transaction may run before the server aborts it (0 = server default)
+NEO4J_QUERY_TIMEOUT = float(os.getenv("NEO4J_QUERY_TIMEOUT", "30"))
+# Seconds the full-scan cache warm-ups (centroids, footprints, statistics cube, memberships) may run (0 = server default)
+NEO4J_BULK_TIMEOUT = float(os.getenv("NEO4J_BULK_TIMEOUT", "600"))
+# Seconds the driver keeps retrying read transactions that failed with transient errors
+NEO4J_MAX_RETRY_TIME = float(os.getenv("NEO4J_MAX_RETRY_TIME", "15"))
+# Hard ceiling on the rows a single query may return: records, or elements of collected list columns (0 = unlimited)
+NEO4J_MAX_ROWS = int(os.getenv("NEO4J_MAX_ROWS", "200000"))
+
+# Query Configuration
+# Retrieve buildings without geometry_geojson; footprints are fetched by id only where needed
+RESULT_PROJECTION = os.getenv("RESULT_PROJECTION", "true").lower() == "true"
+# Compute statistics inside Neo4j for statistics-only queries (no building lists are returned)
+AGGREGATE_PUSHDOWN = os.getenv("AGGREGATE_PUSHDOWN", "true").lower() == "true"
+# Size of the quantile sketches used by the mergeable statistics accumulators
+# (exact percentiles up to this many values, rank error ~1/k above)
+QUANTILE_SKETCH_K = int(os.getenv("QUANTILE_SKETCH_K", "500"))
+# Answer district/function-only statistics queries from the cube built by data_import/statistics_cube.py
+STATISTICS_CUBE_ENABLED = os.getenv("STATISTICS_CUBE_ENABLED", "true").lower() == "true"
+
+# Spatial Configuration
+# Push spatial filters into generated Cypher (requires Building.location from data_import/neo4j_import.py)
+SPATIAL_PUSHDOWN = os.getenv("SPATIAL_PUSHDOWN", "true").lower() == "true"
+
+# Margin (meters) added to the pushed-down bounding box for footprint modes while
+# the footprint cache is cold and the largest building extent is unknown
+FOOTPRINT_SEARCH_MARGIN = float(os.getenv("FOOTPRINT_SEARCH_MARGIN", "500"))
+# Edge length (meters) of the grid cells over cached building centroids
+GRID_CELL_SIZE = float(os.getenv("GRID_CELL_SIZE", "250"))
+
+# Filter spatial queries while streaming records from Neo4j instead of materializing all candidates
+SPATIAL_STREAMING = os.getenv("SPATIAL_STREAMING", "true").lower() == "true"
+# Number of records fetched from the Bolt stream per chunk
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+
+# Result Store Configuration
+# Results with more buildings are stored server-side and returned page by page
+RESULT_PAGE_SIZE = int(os.getenv("RESULT_PAGE_SIZE", "500"))
+# Seconds a stored result stays available for page requests
+RESULT_STORE_TTL_SECONDS = float(os.getenv("RESULT_STORE_TTL_SECONDS", "1800"))
+# Maximum number of stored results (least recently used are dropped first)
+RESULT_STORE_MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", "50"))
+
+# Cache Configuration
+# Score building function embeddings in memory instead of querying the Neo4j vector index
+FUNCTION_INDEX_ENABLED = os.getenv("FUNCTION_INDEX_ENABLED", "true").lower() == "true"
+# Resolve building function queries that name functions literally without an embedding call
+LEXICAL_SEARCH_ENABLED = os.getenv("LEXICAL_SEARCH_ENABLED", "true").lower() == "true"
+# A lexical match naming more functions than this is ambiguous and left to embedding search
+LEXICAL_MAX_HITS = int(os.getenv("LEXICAL_MAX_HITS", "5"))
+# Expand found building functions to all their subfunction codes (in-memory hierarchy closure)
+FUNCTION_HIERARCHY_ENABLED = os.getenv("FUNCTION_HIERARCHY_ENABLED", "true").lower() == "true"
+# Seconds between checks of the dataset version stamp written by the import scripts
+DATA_VERSION_CHECK_SECONDS = float(os.getenv("DATA_VERSION_CHECK_SECONDS", "60"))
+# Parse all building footprints at API startup (needed for fast footprint modes)
+FOOTPRINT_CACHE_ENABLED = os.getenv("FOOTPRINT_CACHE_ENABLED", "true").lower() == "true"
+# Cache the records of executed Cypher queries (dropped when the dataset version changes)
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+# Maximum total size of the cached records in bytes (least recently used are evicted first)
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds a cached query result stays valid
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+
+# Embedding Cache Configuration
+# Keep embeddings of building function queries in a local SQLite database
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "embeddings.sqlite3")
+)
+# Maximum number of cached embeddings (least recently used are evicted first)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000"))
+# Comma-separated texts embedded at API startup, e.g. "Schulen,Wohngebäude,Krankenhäuser"
+EMBEDDING_CACHE_WARMUP = [text.strip() for text in os.getenv("EMBEDDING_CACHE_WARMUP", "").split(",") if text.strip()]
 
 # LangSmith Configuration for Tracing/Debugging
 LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY")
@@ -1,4 +1,5 @@
 from langgraph.graph import StateGraph, START, END
+from langchain_core.runnables import RunnableLambda
 from typing import Literal
 
 from .models import AgentState
@@ -6,11 +7,14 @@ from .nodes import (
     identify_attributes,
     embedding_search,
     generate_cypher_district,
+    spatial_prefilter,
     execute_query,
+    aexecute_query,
     spatial_filtering,
     statistics_calculation,
     generate_answer,
-    route_function_needed
+    route_function_needed,
+    route_spatial_prefilter_needed
 )
 
 
@@ -31,7 +35,9 @@ def create_workflow() -> StateGraph:
     workflow.add_node("generate_cypher_district", generate_cypher_district)
     
     # Phase 3: Data Retrieval & Processing
-    workflow.add_node("execute_query", execute_query)
+    workflow.add_node("spatial_prefilter", spatial_prefilter)
+    # Sync variant for graph.invoke/stream, async variant (async Neo4j driver) for ainvoke/astream
+    workflow.add_node("execute_query", RunnableLambda(execute_query, afunc=aexecute_query, name="execute_query"))
     workflow.add_node("spatial_filtering", spatial_filtering)
     workflow.add_node("statistics_calculation", statistics_calculation)
     
@@ -58,19 +64,30 @@ def create_workflow() -> StateGraph:
     # Embedding search -> Generate Cypher
     workflow.add_edge("embedding_search", "generate_cypher_district")
     
-    # Cypher generation -> Execute query
-    workflow.add_edge("generate_cypher_district", "execute_query")
+    # Conditional: Push spatial filter into the Cypher query?
+    workflow.add_conditional_edges(
+        "generate_cypher_district",
+        route_spatial_prefilter_needed,
+        {
+            "spatial_prefilter": "spatial_prefilter",
+            "execute_query": "execute_query"
+        }
+    )
+    
+    # Spatial pre-filter -> Execute query
+    workflow.add_edge("spatial_prefilter", "execute_query")
     
     # Conditional: Need spatial filtering?
     def route_spatial_filter_needed(state: AgentState) -> Literal["spatial_filter", "statistics"]:
         """Determine if spatial filtering is needed based on spatial_filter parameter."""
         has_spatial_filter = bool(state.get("spatial_filter"))
+        already_filtered = bool((state.get("spatial_comparison") or {}).get("streamed"))
         
-        if has_spatial_filter:
+        if has_spatial_filter and not already_filtered:
             # User provided spatial filter WKT - apply spatial filtering
             return "spatial_filter"
         else:
-            # No spatial processing needed - go directly to statistics
+            # No spatial processing needed (or applied while streaming) - go directly to statistics
             return "statistics"
     
     workflow.add_conditional_edges(
@@ -85,26 +85,39 @@ def print_state_update(state: AgentState, step_name: str = ""):
     print(f"{'='*60}\n")
 
 
-def create_initial_state(query: str, spatial_filter: str = None) -> AgentState:
+def create_initial_state(
+    query: str,
+    spatial_filter: str = None,
+    spatial_polygon_mode: str = None,
+    spatial_min_overlap: float = None
+) -> AgentState:
     """Create the initial state for a new agent run.
     
     Args:
         query: The user's natural language query
         spatial_filter: Optional WKT geometry string in EPSG:25833 for spatial filtering
+        spatial_polygon_mode: Optional polygon test ("containment", "intersects", "within", "overlap")
+        spatial_min_overlap: Optional minimum footprint overlap fraction for "overlap"
     """
     return {
         "query": query,
         "spatial_filter": spatial_filter,
+        "spatial_polygon_mode": spatial_polygon_mode,
+        "spatial_min_overlap": spatial_min_overlap,
         "query_language": None,
         "attributes": [],
         "needs_building_function": False,
         "building_function_query": None,
+        "statistics_only": False,
+        "group_by": [],
         "building_functions": [],
         "building_function_names": [],
         "building_function_descriptions": [],
         "cypher_query": "",
+        "cypher_parameters": {},
         "results": [],
         "spatial_comparison": None,
+        "spatial_point_filter": None,
         "final_answer": "",
         "error": None,
         "messages": []
@@ -7,12 +7,16 @@ class AgentState(TypedDict):
     # Input
     query: str                                      # Original user query
     spatial_filter: Optional[str]                   # Optional WKT geometry for spatial filtering (EPSG:25833)
+    spatial_polygon_mode: Optional[str]             # Polygon test: "containment" (centroid, default), "intersects", "within", "overlap"
+    spatial_min_overlap: Optional[float]            # Minimum footprint overlap fraction for "overlap" mode (default 0.5)
     query_language: Optional[str]                   # Detected query language (e.g., "de", "en")
     
     # Attribute Identification
     attributes: List[str]                           # Identified building attributes (e.g., "floors", "function", "area")
     needs_building_function: bool                   # Whether building function lookup is needed
     building_function_query: Optional[str]          # Extracted building function-relevant query for embedding search
+    statistics_only: bool                           # Query only asks for counts/aggregates (no building list needed)
+    group_by: List[str]                             # Statistics breakdown: "district", "function", "floor_band"
     
     # Building Function Search
     building_functions: List[int]                   # Found building function codes (e.g., 1010, 2000)
@@ -21,12 +25,14 @@ class AgentState(TypedDict):
     
     # Cypher Generation (always district query type)
     cypher_query: str                               # Generated Cypher query
+    cypher_parameters: Dict[str, Any]               # Parameters for the Cypher query (e.g., spatial pre-filter)
     
     # Data Retrieval & Statistics
     results: List[Dict[str, Any]]                   # Results with structure: [{"buildings": [...], "statistics": {...}}]
     
     # Spatial Processing (optional)
     spatial_comparison: Optional[Dict[str, Any]]    # Results from spatial filtering metadata
+    spatial_point_filter: Optional[Dict[str, Any]]  # Determined point filter mode: {"mode": "nearest"|"radius", "value": ...}
     
     # Output
     final_answer: str                               # Final formatted answer for user
@@ -3,21 +3,25 @@
 from .attribute_identification import identify_attributes
 from .embedding_search import embedding_search
 from .cypher_generation import generate_cypher_district
-from .data_retrieval import execute_query
+from .data_retrieval import execute_query, aexecute_query
+from .spatial_prefilter import spatial_prefilter
 from .spatial_filtering import spatial_filtering
 from .statistics_calculation import statistics_calculation
 from .answer_generation import generate_answer
 
 # Routing functions
-from .routing import route_function_needed
+from .routing import route_function_needed, route_spatial_prefilter_needed
 
 __all__ = [
     "identify_attributes",
     "embedding_search",
     "generate_cypher_district",
+    "spatial_prefilter",
     "execute_query",
+    "aexecute_query",
     "spatial_filtering",
     "statistics_calculation",
     "generate_answer",
-    "route_function_needed"
+    "route_function_needed",
+    "route_spatial_prefilter_needed"
 ]
\ No newline at end of file
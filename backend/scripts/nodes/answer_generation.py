@@ -54,6 +54,19 @@ def generate_answer(state: AgentState) -> Dict[str, Any]:
                 break
     results_text = json.dumps(results_to_show, ensure_ascii=False, indent=2)
     
+    # Statistics-only queries: aggregates (from Neo4j or the stream) instead of buildings
+    if isinstance(results[0], dict) and results[0].get("aggregated"):
+        if results[0].get("source") == "statistics_cube":
+            note = ("Statistiken stammen aus beim Datenimport vorberechneten Aggregaten, "
+                    "einzelne Gebäude wurden nicht abgerufen.")
+        elif (state.get("spatial_comparison") or {}).get("streamed"):
+            note = ("Statistiken wurden beim Abrufen aus der Datenbank fortlaufend berechnet, "
+                    "einzelne Gebäude wurden nicht gespeichert.")
+        else:
+            note = ("Statistiken wurden direkt in der Datenbank berechnet, "
+                    "einzelne Gebäude wurden nicht abgerufen.")
+        results_text = note + "\n\n" + results_text
+    
     # Add building function context if used
     building_functions = state.get("building_functions", [])
     building_function_names = state.get("building_function_names", [])
@@ -71,9 +84,17 @@ def generate_answer(state: AgentState) -> Dict[str, Any]:
         filter_description = ""
         if mode == "polygon_containment":
             filter_description = f"Räumliche Filterung: {original_count} Gebäude gefunden, {filtered_count} innerhalb der angegebenen Geometrie"
+        elif mode == "footprint_intersects":
+            filter_description = f"Räumliche Filterung: {filtered_count} von {original_count} Gebäuden berühren oder schneiden die angegebene Geometrie"
+        elif mode == "footprint_within":
+            filter_description = f"Räumliche Filterung: {filtered_count} von {original_count} Gebäuden liegen vollständig innerhalb der angegebenen Geometrie"
+        elif mode == "footprint_overlap":
+            min_overlap = spatial_comparison.get("min_overlap", 0.5)
+            filter_description = f"Räumliche Filterung: {filtered_count} von {original_count} Gebäuden liegen zu mindestens {min_overlap:.0%} ihrer Grundfläche innerhalb der angegebenen Geometrie"
         elif mode == "nearest":
             count = spatial_comparison.get("count", 0)
-            filter_description = f"Räumliche Filterung: Die {count} nächstgelegenen Gebäude von {original_count} gefundenen Gebäuden"
+            scope = " je Gebäudefunktion" if spatial_comparison.get("per_function") else ""
+            filter_description = f"Räumliche Filterung: Die {count} nächstgelegenen Gebäude{scope} von {original_count} gefundenen Gebäuden"
         elif mode == "radius":
             radius = spatial_comparison.get("radius_meters", 0)
             filter_description = f"Räumliche Filterung: {filtered_count} von {original_count} Gebäuden innerhalb von {radius}m Radius"
@@ -1,6 +1,7 @@
 from typing import Dict, Any
 
 from ..models import AgentState
+from ..utils.building_stats import GROUP_DIMENSIONS
 from ..utils.llm_client import llm_client
 from ..utils.prompts import PROMPTS
 
@@ -14,13 +15,16 @@ def identify_attributes(state: AgentState) -> Dict[str, Any]:
     - Whether a building function lookup is needed
     - Extract only building function-relevant parts for embedding search
     - Detect the language of the query (for response generation)
+    - Whether only statistics are asked for (enables aggregate pushdown)
+    - Which dimensions the statistics are grouped by (district, function, floor_band)
     
     Args:
         state: Current agent state with 'query' field
         
     Returns:
         Dict with updates for 'attributes', 'needs_building_function', 
-        'building_function_query', 'query_language', and 'messages'
+        'building_function_query', 'query_language', 'statistics_only',
+        'group_by' and 'messages'
     """
     query = state["query"]
     prompt = PROMPTS["identify_attributes"]
@@ -32,16 +36,24 @@ def identify_attributes(state: AgentState) -> Dict[str, Any]:
     
     try:
         response = llm_client.chat_completion_json(messages)
+        group_by = [
+            dimension for dimension in dict.fromkeys(response.get("group_by") or [])
+            if dimension in GROUP_DIMENSIONS
+        ]
         
         return {
             "attributes": response.get("attributes", []),
             "needs_building_function": response.get("needs_building_function", False),
             "building_function_query": response.get("building_function_query", query),
             "query_language": response.get("query_language", "de"),
+            "statistics_only": bool(response.get("statistics_only", False)),
+            "group_by": group_by,
             "messages": [
                 f"Identified attributes: {response.get('attributes', [])}",
                 f"Language: {response.get('query_language', 'de')}",
-                f"Building function query: {response.get('building_function_query', 'N/A')}"
+                f"Building function query: {response.get('building_function_query', 'N/A')}",
+                f"Statistics only: {bool(response.get('statistics_only', False))}",
+                f"Group by: {group_by}"
             ]
         }
         
@@ -51,6 +63,8 @@ def identify_attributes(state: AgentState) -> Dict[str, Any]:
             "needs_building_function": False,
             "building_function_query": query,  # Fallback to full query
             "query_language": "German",  # Default to German
+            "statistics_only": False,
+            "group_by": [],
             "error": f"Error in attribute identification: {str(e)}",
             "messages": [f"Error in attribute identification: {str(e)}"]
         }
\ No newline at end of file
@@ -1,10 +1,69 @@
 """Nodes for generating Cypher queries based on query type."""
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import re
 
 from ..models import AgentState
 from ..utils.llm_client import llm_client
 from ..utils.prompts import PROMPTS
+from ..utils.function_hierarchy import function_hierarchy
+from ..config import FUNCTION_HIERARCHY_ENABLED
+
+# Variables bound to Function nodes, e.g. `(f:Function)`
+_FUNCTION_VARIABLE = re.compile(r"\(\s*([A-Za-z_]\w*)\s*:\s*Function\b")
+_CODES_PARAMETER = re.compile(r"\$codes\b")
+
+# Correction requests when the generated query and the $codes parameter disagree
+_CODES_REQUIRED = (
+    "Die Query muss die Gebäudefunktionen mit `(b)-[:HAS_FUNCTION]->(f:Function) WHERE f.code IN $codes` filtern. "
+    "Antworte NUR mit der korrigierten Cypher-Query."
+)
+_CODES_UNDEFINED = (
+    "Es wurden keine Gebäudefunktionen gefunden, der Parameter $codes ist nicht definiert. "
+    "Entferne den Filter auf $codes. Antworte NUR mit der korrigierten Cypher-Query."
+)
+
+
+def _clean_cypher(response: str) -> str:
+    """Strip markdown code block markers from an LLM response."""
+    cypher = response.strip()
+    if cypher.startswith("```"):
+        lines = cypher.split("\n")
+        # Remove first and last line (code block markers)
+        cypher = "\n".join(lines[1:-1] if lines[-1] == "```" else lines[1:])
+    return cypher.strip()
+
+
+def bind_function_codes(cypher: str, has_codes: bool) -> Optional[str]:
+    """
+    Make the function filter of a generated query agree with the $codes parameter.
+
+    Literal code filters on Function variables (`f.code IN [1010, 1020]`,
+    `f.code = 1010`) are rewritten to `f.code IN $codes`, so the subfunction
+    expansion is not lost.
+
+    Args:
+        cypher: Generated Cypher query
+        has_codes: Whether the $codes parameter is supplied
+
+    Returns:
+        Query that uses $codes exactly if has_codes, or None if it has to be
+        regenerated ($codes without codes, or codes without any function filter)
+    """
+    if bool(_CODES_PARAMETER.search(cypher)) == has_codes:
+        return cypher
+    if not has_codes:
+        return None
+
+    variables = set(_FUNCTION_VARIABLE.findall(cypher))
+    if not variables:
+        return None
+    literal = re.compile(
+        r"\b(" + "|".join(map(re.escape, variables)) + r")\.code\s*(?:IN\s*\[[^\]]*\]|=\s*\d+)",
+        re.IGNORECASE,
+    )
+    rewritten, count = literal.subn(lambda m: f"{m.group(1)}.code IN $codes", cypher)
+    return rewritten if count else None
 
 
 def _generate_cypher(state: AgentState, prompt_key: str) -> Dict[str, Any]:
@@ -16,7 +75,8 @@ def _generate_cypher(state: AgentState, prompt_key: str) -> Dict[str, Any]:
         prompt_key: Key in PROMPTS dict for the specific query type
         
     Returns:
-        Dict with generated 'cypher_query'
+        Dict with generated 'cypher_query' and 'cypher_parameters' (found
+        building functions and all their subfunctions as $codes)
     """
     query = state["query"]
     attributes = state.get("attributes", [])
@@ -31,6 +91,20 @@ def _generate_cypher(state: AgentState, prompt_key: str) -> Dict[str, Any]:
     else:
         functions_text = "[]"
     
+    # The query filters with `f.code IN $codes`; parent functions include all subfunctions
+    parameters = dict(state.get("cypher_parameters") or {})
+    parameters.pop("codes", None)
+    notes = []
+    if building_functions:
+        if FUNCTION_HIERARCHY_ENABLED and function_hierarchy.ensure_current():
+            parameters["codes"] = function_hierarchy.expand(building_functions)
+        else:
+            parameters["codes"] = sorted(set(building_functions))
+        if len(parameters["codes"]) > len(set(building_functions)):
+            notes.append(
+                f"Expanded {len(set(building_functions))} building functions to {len(parameters['codes'])} codes incl. subfunctions"
+            )
+    
     prompt = PROMPTS[prompt_key]
     
     messages = [
@@ -43,18 +117,31 @@ def _generate_cypher(state: AgentState, prompt_key: str) -> Dict[str, Any]:
     ]
     
     try:
-        cypher = llm_client.chat_completion(messages)
-        
-        # Clean up the response (remove markdown code blocks if present)
-        cypher = cypher.strip()
-        if cypher.startswith("```"):
-            lines = cypher.split("\n")
-            # Remove first and last line (code block markers)
-            cypher = "\n".join(lines[1:-1] if lines[-1] == "```" else lines[1:])
+        cypher = _clean_cypher(llm_client.chat_completion(messages))
+        has_codes = "codes" in parameters
+        bound = bind_function_codes(cypher, has_codes)
+        if bound is None:
+            # One regeneration with the mismatch pointed out
+            messages += [
+                {"role": "assistant", "content": cypher},
+                {"role": "user", "content": _CODES_REQUIRED if has_codes else _CODES_UNDEFINED},
+            ]
+            cypher = _clean_cypher(llm_client.chat_completion(messages))
+            bound = bind_function_codes(cypher, has_codes)
+            if bound is None:
+                error = "Generated Cypher does not filter building functions with $codes" if has_codes \
+                    else "Generated Cypher uses $codes without building functions"
+                return {
+                    "cypher_query": "",
+                    "error": f"Error generating Cypher: {error}",
+                    "messages": [f"Error generating Cypher: {error}"]
+                }
+            notes.append("Regenerated Cypher query to match the $codes parameter")
         
         return {
-            "cypher_query": cypher.strip(),
-            "messages": [f"Generated Cypher query for {prompt_key}"]
+            "cypher_query": bound,
+            "cypher_parameters": parameters,
+            "messages": notes + [f"Generated Cypher query for {prompt_key}"]
         }
         
     except Exception as e:
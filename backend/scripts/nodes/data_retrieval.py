@@ -1,9 +1,200 @@
 """Node for executing Cypher queries against Neo4j."""
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Iterable, Iterator, AsyncIterator, Tuple
+import asyncio
 
 from ..models import AgentState
-from ..utils.neo4j_client import neo4j_client
+from ..config import (
+    AGGREGATE_PUSHDOWN, SPATIAL_STREAMING, STREAM_CHUNK_SIZE, STATISTICS_CUBE_ENABLED, RESULT_PROJECTION,
+    NEO4J_QUERY_TIMEOUT
+)
+from ..utils.neo4j_client import neo4j_client, async_neo4j_client, RowLimitExceeded
+from ..utils.query_cache import query_cache
+from ..utils.cypher_rewrite import return_building_rows, return_aggregates, building_selection, project_buildings
+from ..utils.building_stats import statistics_from_record
+from ..utils.stats_accumulator import BuildingStatsAccumulator
+from ..utils.statistics_cube import statistics_cube
+from .spatial_filtering import stream_spatial_filter
+
+
+def _from_cube(cypher_query: str, parameters: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
+    """
+    Answer from the precomputed statistics cube without running the query.
+    
+    Only queries that select buildings by district and/or function alone
+    (see cypher_rewrite.building_selection) can be answered from the cube.
+    
+    Returns:
+        State update with results [{"buildings": [], "statistics": {...},
+        "aggregated": True, "source": "statistics_cube"}], or None if the
+        query has other predicates or no current cube is loaded
+    """
+    selection = building_selection(cypher_query, parameters)
+    if selection is None or not statistics_cube.ensure_current():
+        return None
+    
+    statistics = statistics_cube.statistics(selection)
+    if statistics is None:
+        return None
+    return {
+        "results": [{"buildings": [], "statistics": statistics, "aggregated": True, "source": "statistics_cube"}],
+        "messages": [f"Statistics for {statistics['building_count']} buildings taken from the statistics cube"]
+    }
+
+
+def _aggregate_results(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """State update with the statistics of an aggregate query's single record."""
+    statistics = statistics_from_record(records[0] if records else {})
+    return {
+        "results": [{"buildings": [], "statistics": statistics, "aggregated": True}],
+        "messages": [f"Aggregates computed in Neo4j for {statistics['building_count']} buildings"]
+    }
+
+
+def _stream_filtered(state: AgentState, chunks: Iterable[List[Dict[str, Any]]]) -> Dict[str, Any] | None:
+    """
+    Apply the spatial filter per chunk of streamed building rows.
+    
+    For statistics-only queries (without group_by) each filtered chunk is
+    folded into a statistics accumulator and dropped.
+    
+    Args:
+        state: Current agent state with 'spatial_filter'
+        chunks: Chunks of records of the return_building_rows query
+    
+    Returns:
+        State update with filtered results, or None if the spatial filter
+        cannot be streamed
+    """
+    buildings = ([row["building"] for row in chunk] for chunk in chunks)
+    accumulator = None
+    if state.get("statistics_only") and not state.get("group_by"):
+        accumulator = BuildingStatsAccumulator()
+    streamed = stream_spatial_filter(state, buildings, accumulator)
+    if streamed is None:
+        return None
+    return {**streamed, "messages": ["Query executed in streaming mode"] + streamed["messages"]}
+
+
+def _sync_chunks(chunks: AsyncIterator[List[Dict[str, Any]]], loop: asyncio.AbstractEventLoop) -> Iterator[List[Dict[str, Any]]]:
+    """Iterate an async chunk stream from a worker thread; every fetch runs on the event loop."""
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(chunks.__anext__(), loop).result()
+        except StopAsyncIteration:
+            return
+
+
+def _plan(state: AgentState, cypher_query: str) -> List[Tuple[str, str]]:
+    """
+    Execution strategies for a query, in the order they are tried.
+    
+    Shared by execute_query and aexecute_query, which only differ in how they
+    run each step. Every step but the last may decline (return None).
+    
+    Returns:
+        List of (step, query): "cube" (the original query, answered from the
+        statistics cube), "aggregate" (aggregate query computed by Neo4j),
+        "stream" (building row query, streamed through the spatial filter)
+        and finally "query" (the building query, through the query cache)
+    """
+    steps = []
+    aggregate_only = (state.get("statistics_only")
+                      and not state.get("spatial_filter") and not state.get("group_by"))
+    if STATISTICS_CUBE_ENABLED and aggregate_only:
+        steps.append(("cube", cypher_query))
+    
+    if AGGREGATE_PUSHDOWN and aggregate_only:
+        aggregate_query = return_aggregates(cypher_query)
+        if aggregate_query is not None:
+            steps.append(("aggregate", aggregate_query))
+    
+    if SPATIAL_STREAMING and state.get("spatial_filter"):
+        row_query = return_building_rows(cypher_query, projected=RESULT_PROJECTION)
+        if row_query is not None:
+            steps.append(("stream", row_query))
+    
+    # Leave out footprints; they are attached later for the displayed buildings only
+    if RESULT_PROJECTION:
+        cypher_query = project_buildings(cypher_query) or cypher_query
+    steps.append(("query", cypher_query))
+    return steps
+
+
+def _query_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """State update with the records of the building query in the standard result format."""
+    # Results are already in the correct format from Neo4j
+    # If they're a plain list, wrap them; otherwise pass through
+    if isinstance(results, list) and len(results) > 0:
+        # Check if already wrapped
+        if isinstance(results[0], dict) and "buildings" in results[0]:
+            # Already in correct format: [{"buildings": [...]}]
+            pass
+        else:
+            # Plain list of buildings - wrap them
+            results = [{"buildings": results}]
+    elif not results:
+        # Empty results
+        results = [{"buildings": []}]
+    
+    # Count buildings for logging
+    building_count = 0
+    if isinstance(results, list) and len(results) > 0 and isinstance(results[0], dict):
+        building_count = len(results[0].get("buildings", []))
+    
+    return {
+        "results": results,
+        "messages": [f"Query executed successfully, returned {building_count} results"]
+    }
+
+
+def _query_error(e: Exception) -> Dict[str, Any]:
+    """State update for a failed query."""
+    error_msg = str(e)
+    code = getattr(e, "code", None) or ""
+    
+    # Runaway queries: aborted by the server-side timeout or the row ceiling
+    if "TransactionTimedOut" in code:
+        return {
+            "results": [{"buildings": []}],
+            "error": f"Query timed out: {error_msg}",
+            "messages": [f"Query timed out after {NEO4J_QUERY_TIMEOUT:g}s and was aborted"]
+        }
+    if isinstance(e, RowLimitExceeded):
+        return {
+            "results": [{"buildings": []}],
+            "error": f"Query result too large: {error_msg}",
+            "messages": [f"Query aborted: {error_msg}"]
+        }
+    
+    # Check for common Cypher errors
+    if "SyntaxError" in error_msg:
+        return {
+            "results": [{"buildings": []}],
+            "error": f"Cypher syntax error: {error_msg}",
+            "messages": [f"Cypher syntax error: {error_msg}"]
+        }
+    elif "Unknown" in error_msg and "label" in error_msg.lower():
+        return {
+            "results": [{"buildings": []}],
+            "error": f"Unknown label in query: {error_msg}",
+            "messages": [f"Unknown label in query: {error_msg}"]
+        }
+    else:
+        return {
+            "results": [{"buildings": []}],
+            "error": f"Query execution error: {error_msg}",
+            "messages": [f"Query execution error: {error_msg}"]
+        }
+
+
+def _no_query() -> Dict[str, Any]:
+    """State update if there is no query to execute."""
+    return {
+        "results": [{"buildings": []}],
+        "error": "No Cypher query to execute",
+        "messages": ["Error: No Cypher query available to execute"]
+    }
 
 
 def execute_query(state: AgentState) -> Dict[str, Any]:
@@ -11,7 +202,12 @@ def execute_query(state: AgentState) -> Dict[str, Any]:
     Node: Execute the generated Cypher query against Neo4j.
     
     Takes the Cypher query from state and runs it against the database,
-    returning the results.
+    returning the results. With a spatial filter the buildings are streamed
+    from Neo4j and filtered chunk by chunk (if the query shape allows it), so
+    the unfiltered candidates are never materialized. Statistics-only queries
+    without a spatial filter are answered from the precomputed statistics
+    cube (district/function-only selections) or return aggregates computed by
+    Neo4j instead of buildings.
     
     Args:
         state: Current agent state with 'cypher_query'
@@ -22,59 +218,66 @@ def execute_query(state: AgentState) -> Dict[str, Any]:
     cypher_query = state.get("cypher_query", "")
     
     if not cypher_query:
-        return {
-            "results": [{"buildings": []}],
-            "error": "No Cypher query to execute",
-            "messages": ["Error: No Cypher query available to execute"]
-        }
+        return _no_query()
     
+    parameters = state.get("cypher_parameters") or {}
     try:
-        # Execute the query
-        results = neo4j_client.execute_query(cypher_query)
-        
-        # Results are already in the correct format from Neo4j
-        # If they're a plain list, wrap them; otherwise pass through
-        if isinstance(results, list) and len(results) > 0:
-            # Check if already wrapped
-            if isinstance(results[0], dict) and "buildings" in results[0]:
-                # Already in correct format: [{"buildings": [...]}]
-                pass
+        for step, query in _plan(state, cypher_query):
+            if step == "cube":
+                update = _from_cube(query, parameters)
+            elif step == "aggregate":
+                update = _aggregate_results(query_cache.execute(query, parameters, tag="aggregate"))
+            elif step == "stream":
+                chunks = neo4j_client.stream_records(query, parameters, STREAM_CHUNK_SIZE, tag="stream_filter")
+                update = _stream_filtered(state, chunks)
             else:
-                # Plain list of buildings - wrap them
-                results = [{"buildings": results}]
-        elif not results:
-            # Empty results
-            results = [{"buildings": []}]
-        
-        # Count buildings for logging
-        building_count = 0
-        if isinstance(results, list) and len(results) > 0 and isinstance(results[0], dict):
-            building_count = len(results[0].get("buildings", []))
-        
-        return {
-            "results": results,
-            "messages": [f"Query executed successfully, returned {building_count} results"]
-        }
-        
+                # Repeated queries are answered from the query result cache
+                update = _query_results(query_cache.execute(query, parameters, tag="execute_query"))
+            if update is not None:
+                return update
     except Exception as e:
-        error_msg = str(e)
+        return _query_error(e)
+
+
+async def aexecute_query(state: AgentState) -> Dict[str, Any]:
+    """
+    Node (async variant of execute_query, used by graph.astream/ainvoke).
+    
+    Runs the same steps as execute_query (see _plan). Aggregate and regular
+    queries await the async Neo4j client, so the event loop keeps serving
+    other requests during database I/O. Streamed records are fetched with
+    async_neo4j_client.stream_records while the spatial filter (CPU-bound per
+    chunk) runs in a worker thread; cube lookups run in a worker thread too.
+    
+    Args:
+        state: Current agent state with 'cypher_query'
         
-        # Check for common Cypher errors
-        if "SyntaxError" in error_msg:
-            return {
-                "results": [{"buildings": []}],
-                "error": f"Cypher syntax error: {error_msg}",
-                "messages": [f"Cypher syntax error: {error_msg}"]
-            }
-        elif "Unknown" in error_msg and "label" in error_msg.lower():
-            return {
-                "results": [{"buildings": []}],
-                "error": f"Unknown label in query: {error_msg}",
-                "messages": [f"Unknown label in query: {error_msg}"]
-            }
-        else:
-            return {
-                "results": [{"buildings": []}],
-                "error": f"Query execution error: {error_msg}",
-                "messages": [f"Query execution error: {error_msg}"]
-            }
+    Returns:
+        Dict with query 'results' or error information
+    """
+    cypher_query = state.get("cypher_query", "")
+    
+    if not cypher_query:
+        return _no_query()
+    
+    parameters = state.get("cypher_parameters") or {}
+    try:
+        for step, query in _plan(state, cypher_query):
+            if step == "cube":
+                update = await asyncio.to_thread(_from_cube, query, parameters)
+            elif step == "aggregate":
+                update = _aggregate_results(await query_cache.aexecute(query, parameters, tag="aggregate"))
+            elif step == "stream":
+                chunks = async_neo4j_client.stream_records(query, parameters, STREAM_CHUNK_SIZE, tag="stream_filter")
+                try:
+                    update = await asyncio.to_thread(
+                        _stream_filtered, state, _sync_chunks(chunks, asyncio.get_running_loop())
+                    )
+                finally:
+                    await chunks.aclose()
+            else:
+                update = _query_results(await query_cache.aexecute(query, parameters, tag="execute_query"))
+            if update is not None:
+                return update
+    except Exception as e:
+        return _query_error(e)
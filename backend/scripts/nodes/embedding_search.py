@@ -3,9 +3,12 @@
 from typing import Dict, Any, List
 
 from ..models import AgentState
+from ..utils.embedding_cache import embedding_cache
 from ..utils.llm_client import llm_client
 from ..utils.neo4j_client import neo4j_client
-from ..config import OPENAI_EMBEDDING_MODEL
+from ..utils.function_index import function_index
+from ..utils.lexical_index import lexical_index
+from ..config import FUNCTION_INDEX_ENABLED, LEXICAL_SEARCH_ENABLED
 
 # Configuration for embedding search filtering
 # Adjust these to fine-tune the embedding search behavior
@@ -32,12 +35,17 @@ def embedding_search(state: AgentState) -> Dict[str, Any]:
     """
     Node: Search for matching building functions using embeddings.
     
-    Creates an embedding of the extracted building function query
-    and searches for similar building functions in Neo4j.
-    Falls back to basic text search if vector index is not available.
+    Queries that literally name building functions ("Krankenhäuser",
+    "Hotels") are resolved from the lexical index first, without an
+    embedding call. Otherwise creates (or looks up in the embedding cache) an embedding of the
+    extracted building function query and scores it against all building functions with the in-memory
+    function index (one matrix-vector product, no database round trip).
+    Uses the Neo4j vector index if the in-memory index is disabled or
+    cannot be loaded, and basic text search if neither is available.
     
-    Uses the embedding model specified in OPENAI_EMBEDDING_MODEL config
-    to determine whether to use small or large embeddings.
+    Uses the configured embedding provider (EMBEDDING_PROVIDER) and
+    compares against the stored Function vectors of its vector space
+    (small/large OpenAI embeddings or the local model's embeddings).
     
     Filtering behavior can be controlled via EMBEDDING_SEARCH_CONFIG:
     - "top_k" method: Returns top N results (default: top 5)
@@ -53,45 +61,54 @@ def embedding_search(state: AgentState) -> Dict[str, Any]:
     # Use extracted building function query instead of full query
     building_function_query = state.get("building_function_query", state["query"])
     
-    # Determine which embedding model is being used
-    use_large_model = "large" in OPENAI_EMBEDDING_MODEL.lower()
+    # Confident lexical hits skip the embedding call
+    if LEXICAL_SEARCH_ENABLED and lexical_index.ensure_current():
+        matches = lexical_index.match(building_function_query)
+        if matches:
+            return _function_result(
+                matches,
+                f"Found building functions via lexical match: {[m['code'] for m in matches]} ({[m['name'] for m in matches]})"
+            )
     
-    # Determine how many results to query (always get top_k from DB, then filter)
+    # Vector space of the embedding provider (description_embedding_<space>)
+    space = llm_client.embedding_provider.space
+    
+    # Determine how many results to query from the Neo4j vector index (then filtered)
     db_top_k = max(300, EMBEDDING_SEARCH_CONFIG.get("top_k", 5))
     
     try:
         # First try vector similarity search
-        embedding = llm_client.create_embedding(building_function_query)
+        # Repeated function queries are answered from the persistent embedding cache
+        embedding = embedding_cache.embed(building_function_query)
         
-        results = neo4j_client.similarity_search(
-            embedding=embedding,
-            top_k=db_top_k,
-            use_large_model=use_large_model
-        )
+        indexed = None
+        if FUNCTION_INDEX_ENABLED and function_index.ensure_current():
+            indexed = function_index.search(embedding, space, **_selection_policy())
         
-        if results:
+        if indexed is not None:
+            # All functions scored in memory, policy already applied
+            filtered_results, best_score = indexed
+        else:
+            results = neo4j_client.similarity_search(
+                embedding=embedding,
+                top_k=db_top_k,
+                space=space
+            )
             # Filter results based on configuration
-            filtered_results = _filter_results(results)
-            
-            if filtered_results:
-                codes = [r["code"] for r in filtered_results]
-                names = [r["name"] for r in filtered_results]
-                descriptions = [r["description"] for r in filtered_results]
-                scores = [r.get("score", 0.0) for r in filtered_results]
-                
-                message = _format_message(codes, names, scores)
-                
-                return {
-                    "building_functions": codes,
-                    "building_function_names": names,
-                    "building_function_descriptions": descriptions,
-                    "building_function_scores": scores,
-                    "messages": [message]
-                }
-
+            filtered_results = _filter_results(results) if results else []
+            best_score = results[0].get("score", 0.0) if results else None
+        
+        if filtered_results:
+            message = _format_message(
+                [r["code"] for r in filtered_results],
+                [r["name"] for r in filtered_results],
+                [r.get("score", 0.0) for r in filtered_results]
+            )
+            return _function_result(filtered_results, message)
+        
+        if best_score is not None:
             # Vector search returned results, but none passed the filter.
             threshold = EMBEDDING_SEARCH_CONFIG.get("score_threshold", 0.6)
-            best_score = results[0].get("score", 0.0) if results else 0.0
             return {
                 "building_functions": [],
                 "building_function_names": [],
@@ -125,6 +142,27 @@ def embedding_search(state: AgentState) -> Dict[str, Any]:
         return fallback_result
 
 
+def _function_result(functions: List[Dict[str, Any]], message: str) -> Dict[str, Any]:
+    """State update for the found functions (dicts with 'code', 'name', 'description', 'score')."""
+    return {
+        "building_functions": [f["code"] for f in functions],
+        "building_function_names": [f.get("name", "") for f in functions],
+        "building_function_descriptions": [f.get("description", "") for f in functions],
+        "building_function_scores": [f.get("score", 0.0) for f in functions],
+        "messages": [message]
+    }
+
+
+def _selection_policy() -> Dict[str, Any]:
+    """EMBEDDING_SEARCH_CONFIG as parameters of function_index.search / select_scores."""
+    return {
+        "method": EMBEDDING_SEARCH_CONFIG.get("method", "top_k"),
+        "top_k": EMBEDDING_SEARCH_CONFIG.get("top_k", 5),
+        "score_threshold": EMBEDDING_SEARCH_CONFIG.get("score_threshold", 0.6),
+        "relative_delta": EMBEDDING_SEARCH_CONFIG.get("relative_delta", 0.05),
+    }
+
+
 def _filter_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Filter search results based on EMBEDDING_SEARCH_CONFIG.
@@ -201,14 +239,12 @@ def _fallback_function_search(query: str) -> Dict[str, Any]:
     """
     Fallback: Search building functions using text matching.
     
-    Used when vector index is not available.
-    Returns codes, names, descriptions, and scores (all 1.0 for keyword matches).
+    Used when vector index is not available. Ranks the functions with the
+    BM25 lexical index over names and descriptions.
+    Returns codes, names, descriptions, and scores (relative to the best match).
     """
     try:
-        # Get all building functions from database
-        all_functions = neo4j_client.get_building_functions()
-        
-        if not all_functions:
+        if not lexical_index.ensure_current():
             return {
                 "building_functions": [],
                 "building_function_names": [],
@@ -217,43 +253,16 @@ def _fallback_function_search(query: str) -> Dict[str, Any]:
                 "messages": ["No building functions found in database"]
             }
         
-        # Simple keyword matching
-        query_lower = query.lower()
-        keywords = {
-            "wohn": [1000, 1010, 1020, 1023, 1024],  # Wohngebäude
-            "büro": [2020, 1122],  # Bürogebäude
-            "industrie": [2100, 2200],  # Industriegebäude
-            "schule": [3021, 3022, 3023],  # Schulen
-            "kirche": [3041],  # Kirchen
-            "krankenhaus": [3051, 3242],  # Krankenhäuser (3051: Krankenhaus, 3242: Sanatorium)
-            "hotel": [2071],  # Hotels
-            "geschäft": [2050, 2052, 1123],  # Geschäftsgebäude
-            "landwirtschaft": [2721, 2726],  # Landwirtschaft
-        }
-        
-        matched_codes = []
-        for keyword, codes in keywords.items():
-            if keyword in query_lower:
-                matched_codes.extend(codes)
+        # Best ranked functions; confident matches are taken as they are
+        matched = lexical_index.match(query) or lexical_index.search(query, top_k=5)
         
-        if matched_codes:
-            # Filter functions that match our codes
-            matched_functions = [f for f in all_functions if f.get("code") in matched_codes]
-            codes = [f["code"] for f in matched_functions]
-            names = [f.get("name", "") for f in matched_functions]
-            descriptions = [f.get("description", "") for f in matched_functions]
-            # Fallback matches get perfect score
-            scores = [1.0] * len(codes)
-            
-            return {
-                "building_functions": codes,
-                "building_function_names": names,
-                "building_function_descriptions": descriptions,
-                "building_function_scores": scores,
-                "messages": [f"Found building functions via keyword matching (fallback): {codes} ({names})"]
-            }
+        if matched:
+            return _function_result(
+                matched,
+                f"Found building functions via text search (fallback): {[m['code'] for m in matched]} ({[m['name'] for m in matched]})"
+            )
         
-        # No keyword match - return empty but don't error
+        # No text match - return empty but don't error
         return {
             "building_functions": [],
             "building_function_names": [],
@@ -24,3 +24,19 @@ def route_function_needed(state: AgentState) -> Literal["needs_function", "no_fu
     if needs_function:
         return "needs_function"
     return "no_function"
+
+
+def route_spatial_prefilter_needed(state: AgentState) -> Literal["spatial_prefilter", "execute_query"]:
+    """
+    Router: Determine if the spatial filter should be pushed into the Cypher query.
+    
+    Args:
+        state: Current agent state
+        
+    Returns:
+        "spatial_prefilter" if a spatial filter WKT was provided
+        "execute_query" to run the generated query unchanged
+    """
+    if state.get("spatial_filter") and state.get("cypher_query"):
+        return "spatial_prefilter"
+    return "execute_query"
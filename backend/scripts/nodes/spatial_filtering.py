@@ -3,28 +3,57 @@ Spatial Filtering Node
 
 Performs local spatial analysis on building results based on user-provided WKT geometry.
 Operates after Cypher query execution using shapely for geometry operations.
+Building centroids are read from the process-wide centroid cache (or parsed
+in one vectorized batch on a cache miss), so each filter mode is answered
+with bulk array operations: polygon and radius filters query the centroid
+grid (radius falls back to an STRtree-backed SpatialIndex while the cache is
+cold), nearest filters use argpartition over the coordinate array.
 
 Three filtering modes:
 1. Polygon/MultiPolygon: Filter buildings by containment
 2. Point + "nearest X": Sort by distance, return top X buildings
 3. Point + "radius X": Filter buildings within distance threshold
+
+Polygon filters can alternatively test building footprints instead of
+centroids (spatial_polygon_mode): "intersects", "within" or "overlap"
+(minimum fraction of the footprint area inside the polygon).
+
+stream_spatial_filter applies the same filters chunk by chunk while the
+execute_query node streams records from Neo4j, keeping only survivors.
 """
 
-from typing import Dict, Any, List
-import json
+from typing import Dict, Any, List, Optional, Callable, Iterable, Tuple
+import numpy as np
+import shapely
 from shapely import wkt
-from shapely.geometry import Point, Polygon, MultiPolygon, GeometryCollection, shape
+from shapely.geometry import Point, Polygon, MultiPolygon
 from shapely.errors import ShapelyError
 
 from ..models import AgentState
 from ..utils.llm_client import llm_client
+from ..utils.neo4j_client import neo4j_client
+from ..utils.geometry import parse_building_points, points_in_polygon
+from ..utils.spatial_index import SpatialIndex
+from ..utils.centroid_cache import centroid_cache
+from ..utils.grid_index import GridIndex
+from ..utils.footprint_cache import footprint_cache
+from ..utils.stats_accumulator import BuildingStatsAccumulator
+from ..utils.knn import k_nearest, k_nearest_per_group
+from ..utils.spatial_intent import parse_point_filter_mode
 from ..utils.prompts import PROMPTS
 
+# Polygon modes that test building footprints instead of centroids
+FOOTPRINT_MODES = ("intersects", "within", "overlap")
+DEFAULT_MIN_OVERLAP = 0.5
+
 
 def parse_building_geometry(building: Dict[str, Any]) -> Point:
     """
     Parse building geometry from WKT string or GeoJSON.
     
+    Single-building convenience wrapper around the batch parser
+    `parse_building_points`; prefer the batch version for result sets.
+    
     Args:
         building: Building dict with geometry_geojson or centroid field
         
@@ -34,45 +63,10 @@ def parse_building_geometry(building: Dict[str, Any]) -> Point:
     Raises:
         ValueError: If geometry cannot be parsed
     """
-    # Try centroid first (faster, already a point)
-    centroid_wkt = building.get("centroid")
-    if centroid_wkt:
-        try:
-            # Fix format: "Point (x y)" -> "POINT(x y)"
-            if centroid_wkt.startswith("Point "):
-                centroid_wkt = "POINT" + centroid_wkt[5:]  # Replace "Point " with "POINT"
-            
-            geom = wkt.loads(centroid_wkt)
-            if isinstance(geom, Point):
-                return geom
-        except ShapelyError:
-            pass  # Fall through to try geometry_geojson
-    
-    # Try geometry_geojson
-    geometry_data = building.get("geometry_geojson")
-    if not geometry_data:
-        raise ValueError(f"Building {building.get('id', 'unknown')} has no geometry")
-    
-    try:
-        # Check if it's a JSON string (GeoJSON format)
-        if isinstance(geometry_data, str) and geometry_data.strip().startswith("{"):
-            geojson = json.loads(geometry_data)
-            # Use shapely's shape to convert GeoJSON to geometry
-            geom = shape(geojson)
-        else:
-            # Assume it's WKT
-            geom = wkt.loads(geometry_data)
-        
-        # If it's a polygon/multipolygon, use centroid
-        if isinstance(geom, (Polygon, MultiPolygon, GeometryCollection)):
-            return geom.centroid
-        elif isinstance(geom, Point):
-            return geom
-        else:
-            raise ValueError(f"Unsupported geometry type: {type(geom)}")
-            
-    except (ShapelyError, json.JSONDecodeError, Exception) as e:
-        raise ValueError(f"Failed to parse geometry: {str(e)}")
+    points, valid = parse_building_points([building])
+    if not valid[0]:
+        raise ValueError(f"Building {building.get('id', 'unknown')} has no parseable geometry")
+    return points[0]
 
 
 def extract_buildings_list(results: Any) -> List[Dict[str, Any]]:
@@ -118,15 +112,23 @@ def update_results_structure(state: AgentState, filtered_buildings: List[Dict[st
 
 def determine_point_filter_mode(query: str, spatial_filter_wkt: str) -> Dict[str, Any]:
     """
-    Use LLM to determine if query wants 'nearest X' or 'radius X' filtering.
+    Determine if query wants 'nearest X' or 'radius X' filtering.
+    
+    Common phrasings are parsed with rules; the LLM is only asked when the
+    rule-based parser is unsure.
     
     Args:
         query: User's original query
         spatial_filter_wkt: WKT Point geometry
         
     Returns:
-        Dict with 'mode' ('nearest' or 'radius') and 'value' (number)
+        Dict with 'mode' ('nearest' or 'radius'), 'value' (number) and
+        'per_function' (nearest X per building function)
     """
+    parsed = parse_point_filter_mode(query)
+    if parsed is not None:
+        return parsed
+    
     prompt = PROMPTS["spatial_filter_mode"]
     
     messages = [
@@ -147,6 +149,7 @@ def determine_point_filter_mode(query: str, spatial_filter_wkt: str) -> Dict[str
         return {
             "mode": mode,
             "value": value,
+            "per_function": bool(response.get("per_function", False)),
             "reasoning": reasoning
         }
         
@@ -155,111 +158,387 @@ def determine_point_filter_mode(query: str, spatial_filter_wkt: str) -> Dict[str
         return {
             "mode": "nearest",
             "value": 10,
+            "per_function": False,
             "reasoning": f"Fallback due to error: {str(e)}"
         }
 
 
+def build_spatial_index(buildings: List[Dict[str, Any]]) -> SpatialIndex:
+    """
+    Build a spatial index over the centroids of a list of buildings.
+    
+    Coordinates are read from the process-wide centroid cache; buildings
+    missing from the cache are parsed in one vectorized batch. Buildings with
+    invalid geometry are kept as empty slots so index positions line up with
+    the input list, but they never match any query.
+    
+    Args:
+        buildings: List of building dictionaries
+        
+    Returns:
+        SpatialIndex whose positions correspond to the buildings list
+    """
+    points, _ = centroid_cache.building_points(buildings)
+    return SpatialIndex(points)
+
+
+def _with_distances(
+    buildings: List[Dict[str, Any]],
+    positions: Any,
+    distances: Any
+) -> List[Dict[str, Any]]:
+    """Copy the selected buildings and annotate them with their distance."""
+    selected = []
+    for position, distance in zip(positions, distances):
+        building_copy = buildings[position].copy()
+        building_copy["_distance"] = float(distance)
+        selected.append(building_copy)
+    return selected
+
+
+def _grid_membership(
+    buildings: List[Dict[str, Any]],
+    region: Callable[[GridIndex], np.ndarray]
+) -> Tuple[Optional[np.ndarray], np.ndarray]:
+    """
+    Test cached buildings against a region query on the centroid grid.
+    
+    Args:
+        buildings: List of building dictionaries
+        region: Function returning the cache rows inside the region of a GridIndex
+        
+    Returns:
+        Tuple of (inside, cached): membership mask of the cached buildings
+        (None if no grid is available) and the mask of cached buildings
+    """
+    grid, rows = centroid_cache.grid_rows([building.get("id") for building in buildings])
+    cached = rows >= 0
+    if grid is None or not cached.any():
+        return None, cached
+    
+    inside = np.zeros(len(buildings), dtype=bool)
+    inside[cached] = np.isin(rows[cached], region(grid))
+    return inside, cached
+
+
+def region_aggregates(
+    buildings: List[Dict[str, Any]],
+    filtered_count: int,
+    region: Callable[[GridIndex], Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """
+    Precomputed grid aggregates for a filter result, if they describe it exactly.
+    
+    The aggregates cover all cached buildings in the region. They equal the
+    statistics of the filtered buildings when every input building is cached
+    and the filter kept as many buildings as the region contains (e.g. the
+    Cypher query returned all buildings).
+    
+    Args:
+        buildings: Unfiltered list of building dictionaries
+        filtered_count: Number of buildings kept by the spatial filter
+        region: Function returning the aggregates of the region of a GridIndex
+        
+    Returns:
+        Aggregate dict (see GridIndex.aggregate_polygon) or None
+    """
+    grid, rows = centroid_cache.grid_rows([building.get("id") for building in buildings])
+    if grid is None or not (rows >= 0).all():
+        return None
+    
+    aggregates = region(grid)
+    if aggregates["building_count"] != filtered_count:
+        return None
+    return aggregates
+
+
 def filter_by_polygon(
     buildings: List[Dict[str, Any]], 
-    polygon: Polygon | MultiPolygon
+    polygon: Polygon | MultiPolygon,
+    use_grid: bool = True
 ) -> List[Dict[str, Any]]:
     """
     Filter buildings by polygon containment.
     
+    Cached buildings are matched via the centroid grid: cells fully inside
+    the polygon are taken whole, only buildings in boundary cells are tested.
+    Uncached candidates outside the polygon's envelope are rejected with a
+    vectorized bounding-box test; the rest are tested against the prepared
+    polygon, so dense polygons with thousands of vertices stay fast.
+    
     Args:
         buildings: List of building dictionaries
         polygon: Shapely Polygon or MultiPolygon
+        use_grid: Match cached buildings via the centroid grid (the grid query
+            covers the whole region, so small batches skip it)
         
     Returns:
         List of buildings whose centroids are within the polygon
     """
-    filtered = []
+    inside, cached = None, None
+    if use_grid:
+        inside, cached = _grid_membership(buildings, lambda grid: grid.query_polygon(polygon))
+    if inside is None:
+        xy, _ = centroid_cache.building_xy(buildings)
+        inside = points_in_polygon(polygon, xy)
+    elif not cached.all():
+        uncached = np.flatnonzero(~cached)
+        xy, _ = centroid_cache.building_xy([buildings[i] for i in uncached])
+        inside[uncached] = points_in_polygon(polygon, xy)
+    return [buildings[position] for position in np.flatnonzero(inside)]
+
+
+def footprint_predicate(mode: str) -> str:
+    """STRtree predicate of a footprint mode ("within" -> "contains", otherwise "intersects")."""
+    if mode not in FOOTPRINT_MODES:
+        raise ValueError(f"Unknown footprint mode: {mode}")
+    return "contains" if mode == "within" else "intersects"
+
+
+def filter_by_footprint(
+    buildings: List[Dict[str, Any]],
+    polygon: Polygon | MultiPolygon,
+    mode: str,
+    min_overlap: float = DEFAULT_MIN_OVERLAP,
+    hit_ids: Optional[frozenset] = None
+) -> List[Dict[str, Any]]:
+    """
+    Filter buildings by their footprint polygons instead of centroids.
+    
+    Modes:
+        - "intersects": footprint touches or overlaps the polygon
+        - "within": footprint lies completely inside the polygon
+        - "overlap": at least min_overlap of the footprint area is inside
+    
+    Footprints come pre-parsed from the footprint cache (with an STRtree over
+    all buildings); uncached buildings are parsed in one batch.
+    
+    Args:
+        buildings: List of building dictionaries
+        polygon: Shapely Polygon or MultiPolygon
+        mode: "intersects", "within" or "overlap"
+        min_overlap: Minimum overlap fraction (0-1) for mode "overlap"
+        hit_ids: Precomputed footprint_cache.hit_ids(polygon, footprint_predicate(mode))
+            when filtering several batches against the same polygon
+        
+    Returns:
+        List of matching buildings; in "overlap" mode annotated with '_overlap_fraction'
+    """
+    footprints, matches = footprint_cache.match(buildings, polygon, footprint_predicate(mode), hit_ids)
+    positions = np.flatnonzero(matches)
     
-    for building in buildings:
-        try:
-            building_point = parse_building_geometry(building)
-            if polygon.contains(building_point):
-                filtered.append(building)
-        except ValueError:
-            # Skip buildings with invalid geometry
-            continue
+    if mode != "overlap":
+        return [buildings[position] for position in positions]
     
-    return filtered
+    candidates = footprints[positions]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fractions = shapely.area(shapely.intersection(candidates, polygon)) / shapely.area(candidates)
+    keep = np.nan_to_num(fractions) >= min_overlap
+    
+    selected = []
+    for position, fraction in zip(positions[keep], fractions[keep]):
+        building_copy = buildings[position].copy()
+        building_copy["_overlap_fraction"] = round(float(fraction), 4)
+        selected.append(building_copy)
+    return selected
 
 
 def filter_by_nearest(
     buildings: List[Dict[str, Any]], 
     point: Point, 
-    count: int
+    count: int,
+    group_by: Optional[List[Any]] = None
 ) -> List[Dict[str, Any]]:
     """
     Filter buildings by distance, returning nearest X buildings.
     
+    Selects the winners with argpartition over the centroid coordinate array;
+    only the returned buildings are copied and annotated with '_distance'.
+    
     Args:
         buildings: List of building dictionaries
         point: Reference point
         count: Number of nearest buildings to return
+        group_by: Optional group key per building (e.g. function code). If set,
+            the nearest X buildings of every group are returned.
         
     Returns:
         List of nearest buildings, sorted by distance
     """
-    buildings_with_distance = []
+    xy, _ = centroid_cache.building_xy(buildings)
+    origin = (point.x, point.y)
     
-    for building in buildings:
-        try:
-            building_point = parse_building_geometry(building)
-            distance = point.distance(building_point)
-            
-            # Add distance to building data
-            building_copy = building.copy()
-            building_copy["_distance"] = distance
-            buildings_with_distance.append(building_copy)
-            
-        except ValueError:
-            # Skip buildings with invalid geometry
-            continue
+    if group_by is None:
+        positions, distances = k_nearest(xy, origin, int(count))
+    else:
+        positions, distances = k_nearest_per_group(xy, group_by, origin, int(count))
     
-    # Sort by distance and take top N
-    buildings_with_distance.sort(key=lambda b: b["_distance"])
-    return buildings_with_distance[:count]
+    return _with_distances(buildings, positions, distances)
 
 
 def filter_by_radius(
     buildings: List[Dict[str, Any]], 
     point: Point, 
-    radius: float
+    radius: float,
+    use_grid: bool = True
 ) -> List[Dict[str, Any]]:
     """
     Filter buildings within radius (in meters) from point.
     
+    With a warm centroid cache the candidates come from the centroid grid
+    (cells fully inside the circle are taken whole); otherwise an STRtree
+    over the buildings answers the query.
+    
     Args:
         buildings: List of building dictionaries
         point: Reference point
         radius: Maximum distance in meters
+        use_grid: Match cached buildings via the centroid grid
         
     Returns:
         List of buildings within radius, sorted by distance
     """
-    buildings_with_distance = []
+    radius = float(radius)
+    inside, cached = None, None
+    if use_grid:
+        inside, cached = _grid_membership(buildings, lambda grid: grid.query_radius((point.x, point.y), radius))
+    if inside is None:
+        index = build_spatial_index(buildings)
+        positions, distances = index.query_radius(point, radius)
+        return _with_distances(buildings, positions, distances)
     
-    for building in buildings:
-        try:
-            building_point = parse_building_geometry(building)
-            distance = point.distance(building_point)
-            
-            if distance <= radius:
-                # Add distance to building data
-                building_copy = building.copy()
-                building_copy["_distance"] = distance
-                buildings_with_distance.append(building_copy)
-                
-        except ValueError:
-            # Skip buildings with invalid geometry
-            continue
+    # Distances only for grid matches and uncached buildings (which are tested here)
+    candidates = np.flatnonzero(inside | ~cached)
+    xy, _ = centroid_cache.building_xy([buildings[i] for i in candidates])
+    distances = np.hypot(xy[:, 0] - point.x, xy[:, 1] - point.y)
+    keep = inside[candidates] | (distances <= radius)
+    positions, distances = candidates[keep], distances[keep]
+    order = np.lexsort((positions, distances))
+    return _with_distances(buildings, positions[order], distances[order])
+
+
+def stream_spatial_filter(
+    state: AgentState,
+    chunks: Iterable[List[Dict[str, Any]]],
+    accumulator: Optional[BuildingStatsAccumulator] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Apply the spatial filter to buildings arriving in chunks.
+    
+    Each chunk is filtered as it arrives and only survivors are kept: polygon
+    and radius matches are accumulated, "nearest X" keeps a running top X.
+    Peak memory therefore scales with the filtered result instead of the
+    candidate set. Per-function nearest filtering needs all candidates and is
+    not streamed.
+    
+    With an accumulator (statistics-only queries) the matches of each chunk
+    are folded into the statistics and dropped, so not even the filtered
+    buildings are kept in memory.
+    
+    Args:
+        state: Current agent state with 'spatial_filter'
+        chunks: Iterable of building lists (consumed only if streaming applies)
+        accumulator: Optional statistics accumulator for statistics-only results
+        
+    Returns:
+        State update like the spatial_filtering node (with 'streamed' set in
+        'spatial_comparison'), or None if this filter cannot be streamed.
+        With an accumulator the results are
+        [{"buildings": [], "statistics": {...}, "aggregated": True}]
+    """
+    try:
+        filter_geometry = wkt.loads(state.get("spatial_filter") or "")
+    except ShapelyError:
+        return None
     
-    # Sort by distance
-    buildings_with_distance.sort(key=lambda b: b["_distance"])
-    return buildings_with_distance
+    geometry_type = filter_geometry.geom_type
+    # select: matches of one chunk; nearest keeps a running top X instead
+    select = None
+    finish = None
+    
+    if geometry_type in ["Polygon", "MultiPolygon"]:
+        polygon_mode = state.get("spatial_polygon_mode") or "containment"
+        filter_info = {"geometry_type": geometry_type}
+        
+        if polygon_mode in FOOTPRINT_MODES:
+            footprint_cache.ensure_current()
+            min_overlap = state.get("spatial_min_overlap")
+            if min_overlap is None:
+                min_overlap = DEFAULT_MIN_OVERLAP
+            filter_info["mode"] = f"footprint_{polygon_mode}"
+            if polygon_mode == "overlap":
+                filter_info["min_overlap"] = min_overlap
+            # One tree query for the whole stream; chunks only look up their ids
+            hit_ids = footprint_cache.hit_ids(filter_geometry, footprint_predicate(polygon_mode))
+            select = lambda chunk: filter_by_footprint(chunk, filter_geometry, polygon_mode, min_overlap, hit_ids)
+            description = f"by footprint ({polygon_mode})"
+        else:
+            centroid_cache.ensure_current()
+            filter_info["mode"] = "polygon_containment"
+            select = lambda chunk: filter_by_polygon(chunk, filter_geometry, use_grid=False)
+            description = "by polygon containment"
+    
+    elif geometry_type == "Point":
+        point_filter = state.get("spatial_point_filter") or determine_point_filter_mode(
+            state.get("query", ""), state.get("spatial_filter")
+        )
+        if point_filter.get("per_function"):
+            return None
+        
+        centroid_cache.ensure_current()
+        value = point_filter["value"]
+        reasoning = point_filter.get("reasoning", "")
+        
+        if point_filter["mode"] == "nearest":
+            filter_info = {"mode": "nearest", "count": value, "per_function": False, "reasoning": reasoning}
+            description = f"nearest {value} buildings"
+        else:
+            filter_info = {"mode": "radius", "radius_meters": value, "reasoning": reasoning}
+            select = lambda chunk: filter_by_radius(chunk, filter_geometry, value, use_grid=False)
+            finish = lambda kept: sorted(kept, key=lambda building: building["_distance"])
+            description = f"buildings within {value}m radius"
+    
+    else:
+        return None
+    
+    filtered_buildings: List[Dict[str, Any]] = []
+    original_count = 0
+    for chunk in chunks:
+        original_count += len(chunk)
+        if select is None:
+            # Running top X: previous winners first, so distance ties keep input order
+            filtered_buildings = filter_by_nearest(filtered_buildings + chunk, filter_geometry, value)
+        elif accumulator is not None:
+            accumulator.update(select(chunk))
+        else:
+            filtered_buildings += select(chunk)
+    
+    if accumulator is not None:
+        if select is None:
+            accumulator.update(filtered_buildings)
+        filtered_count = accumulator.building_count
+        results = [{
+            "buildings": [],
+            "statistics": {**accumulator.result(), "building_count": filtered_count},
+            "aggregated": True
+        }]
+    else:
+        if finish:
+            filtered_buildings = finish(filtered_buildings)
+        filtered_count = len(filtered_buildings)
+        results = [{"buildings": filtered_buildings}]
+    
+    filter_info.update({
+        "original_count": original_count,
+        "filtered_count": filtered_count,
+        "streamed": True
+    })
+    
+    return {
+        "results": results,
+        "spatial_comparison": filter_info,
+        "messages": [f"Streamed and filtered {description}: {original_count} → {filtered_count} buildings"]
+    }
 
 
 def spatial_filtering(state: AgentState) -> Dict[str, Any]:
@@ -293,6 +572,9 @@ def spatial_filtering(state: AgentState) -> Dict[str, Any]:
             "messages": [f"Failed to parse spatial filter WKT: {str(e)}"]
         }
     
+    # Reload cached centroids if the import scripts changed the data
+    centroid_cache.ensure_current()
+    
     # Extract buildings from results
     buildings = extract_buildings_list(state.get("results", []))
     original_count = len(buildings)
@@ -309,33 +591,68 @@ def spatial_filtering(state: AgentState) -> Dict[str, Any]:
     
     try:
         if geometry_type in ["Polygon", "MultiPolygon"]:
-            # Mode 1: Filter by polygon containment
-            filtered_buildings = filter_by_polygon(buildings, filter_geometry)
-            filter_info = {
-                "mode": "polygon_containment",
-                "geometry_type": geometry_type,
-                "original_count": original_count,
-                "filtered_count": len(filtered_buildings)
-            }
-            message = f"Filtered buildings by polygon containment: {original_count} → {len(filtered_buildings)} buildings"
+            polygon_mode = state.get("spatial_polygon_mode") or "containment"
+            
+            if polygon_mode in FOOTPRINT_MODES:
+                # Mode 1b: Filter by building footprints
+                footprint_cache.ensure_current()
+                min_overlap = state.get("spatial_min_overlap")
+                if min_overlap is None:
+                    min_overlap = DEFAULT_MIN_OVERLAP
+                filtered_buildings = filter_by_footprint(buildings, filter_geometry, polygon_mode, min_overlap)
+                filter_info = {
+                    "mode": f"footprint_{polygon_mode}",
+                    "geometry_type": geometry_type,
+                    "original_count": original_count,
+                    "filtered_count": len(filtered_buildings)
+                }
+                if polygon_mode == "overlap":
+                    filter_info["min_overlap"] = min_overlap
+                message = f"Filtered buildings by footprint ({polygon_mode}): {original_count} → {len(filtered_buildings)} buildings"
+            
+            else:
+                # Mode 1: Filter by polygon containment
+                filtered_buildings = filter_by_polygon(buildings, filter_geometry)
+                filter_info = {
+                    "mode": "polygon_containment",
+                    "geometry_type": geometry_type,
+                    "original_count": original_count,
+                    "filtered_count": len(filtered_buildings)
+                }
+                aggregates = region_aggregates(
+                    buildings, len(filtered_buildings), lambda grid: grid.aggregate_polygon(filter_geometry)
+                )
+                if aggregates:
+                    filter_info["aggregates"] = aggregates
+                message = f"Filtered buildings by polygon containment: {original_count} → {len(filtered_buildings)} buildings"
             
         elif geometry_type == "Point":
-            # Mode 2 or 3: Determine from query using LLM
-            point_filter = determine_point_filter_mode(state.get("query", ""), spatial_filter_wkt)
+            # Mode 2 or 3: Reuse the mode from the spatial pre-filter or determine it via LLM
+            point_filter = state.get("spatial_point_filter") or determine_point_filter_mode(
+                state.get("query", ""), spatial_filter_wkt
+            )
             mode = point_filter["mode"]
             value = point_filter["value"]
             
             if mode == "nearest":
-                # Mode 2: Nearest X buildings
-                filtered_buildings = filter_by_nearest(buildings, filter_geometry, value)
+                # Mode 2: Nearest X buildings (optionally per building function)
+                per_function = point_filter.get("per_function", False)
+                group_by = None
+                if per_function:
+                    memberships = neo4j_client.get_building_memberships([b.get("id") for b in buildings])
+                    group_by = [memberships.get(b.get("id"), {}).get("function_code") for b in buildings]
+                
+                filtered_buildings = filter_by_nearest(buildings, filter_geometry, value, group_by=group_by)
                 filter_info = {
                     "mode": "nearest",
                     "count": value,
+                    "per_function": per_function,
                     "original_count": original_count,
                     "filtered_count": len(filtered_buildings),
                     "reasoning": point_filter.get("reasoning", "")
                 }
-                message = f"Filtered nearest {value} buildings: {original_count} → {len(filtered_buildings)} buildings"
+                scope = " per building function" if per_function else ""
+                message = f"Filtered nearest {value} buildings{scope}: {original_count} → {len(filtered_buildings)} buildings"
                 
             else:  # mode == "radius"
                 # Mode 3: Buildings within radius
@@ -347,6 +664,12 @@ def spatial_filtering(state: AgentState) -> Dict[str, Any]:
                     "filtered_count": len(filtered_buildings),
                     "reasoning": point_filter.get("reasoning", "")
                 }
+                center = (filter_geometry.x, filter_geometry.y)
+                aggregates = region_aggregates(
+                    buildings, len(filtered_buildings), lambda grid: grid.aggregate_radius(center, float(value))
+                )
+                if aggregates:
+                    filter_info["aggregates"] = aggregates
                 message = f"Filtered buildings within {value}m radius: {original_count} → {len(filtered_buildings)} buildings"
         
         else:
@@ -0,0 +1,165 @@
+"""
+Spatial Pre-Filter Node
+
+Pushes the user-provided spatial filter into the generated Cypher query so
+Neo4j only returns candidate buildings instead of every building matching the
+non-spatial predicates. Uses the native `location` point property (indexed by
+the `building_location` point index) written by data_import/neo4j_import.py.
+
+Predicates by geometry type:
+1. Polygon/MultiPolygon: bounding box of the geometry via point.withinBBox
+2. Point + "radius X": point.distance to the reference point
+3. Point + "nearest X": no pushdown, the nearest X depend on all candidates
+
+For the footprint modes "intersects" and "overlap" the bounding box is widened
+by the largest building extent, since a footprint can reach into the polygon
+while its centroid lies outside.
+
+The pre-filter is a coarse candidate selection; exact filtering still happens
+in the spatial_filtering node after the query was executed. The predicates
+drop buildings without a location, so pushdown is skipped on databases
+imported before Building.location and its point index existed (checked once
+per dataset version).
+"""
+
+from typing import Dict, Any, Optional
+import threading
+
+from neo4j.spatial import CartesianPoint
+from shapely import wkt
+from shapely.errors import ShapelyError
+
+from ..models import AgentState
+from ..config import SPATIAL_PUSHDOWN, FOOTPRINT_SEARCH_MARGIN
+from ..utils.cypher_rewrite import inject_building_predicate
+from ..utils.footprint_cache import footprint_cache
+from ..utils.neo4j_client import neo4j_client
+from ..utils.data_version import data_version_tracker
+from .spatial_filtering import determine_point_filter_mode
+
+BBOX_PREDICATE = (
+    "point.withinBBox({var}.location, $spatial_lower_left, $spatial_upper_right)"
+)
+RADIUS_PREDICATE = (
+    "point.distance({var}.location, $spatial_center) <= $spatial_radius"
+)
+
+# Dataset version -> whether Building.location and its point index exist
+_location_support: Dict[Optional[int], bool] = {}
+# Guards _location_support; nodes run concurrently in async handlers and worker threads
+_location_lock = threading.Lock()
+
+
+def _locations_available() -> bool:
+    """Whether buildings have indexed `location` points (checked once per dataset version)."""
+    version = data_version_tracker.current()
+    available = _location_support.get(version)
+    if available is not None:
+        return available
+    with _location_lock:
+        # Another request may have checked while this one waited
+        if version not in _location_support:
+            try:
+                available = neo4j_client.has_building_locations()
+            except Exception as e:
+                # Not cached, the next query checks again
+                print(f"Building location check failed: {e}")
+                return False
+            _location_support.clear()
+            _location_support[version] = available
+        return _location_support[version]
+
+
+def spatial_prefilter(state: AgentState) -> Dict[str, Any]:
+    """
+    Node: Inject a parameterized spatial predicate into the generated Cypher.
+
+    Args:
+        state: Current agent state with 'cypher_query' and 'spatial_filter'
+
+    Returns:
+        Dict with rewritten 'cypher_query', 'cypher_parameters' and, for point
+        filters, the determined 'spatial_point_filter'
+    """
+    cypher_query = state.get("cypher_query", "")
+    spatial_filter_wkt = state.get("spatial_filter")
+
+    if not cypher_query or not spatial_filter_wkt:
+        return {
+            "messages": ["No spatial filter or Cypher query, skipping spatial pre-filter"]
+        }
+
+    if not SPATIAL_PUSHDOWN:
+        return {
+            "messages": ["Spatial pre-filter disabled by configuration"]
+        }
+
+    if not _locations_available():
+        return {
+            "messages": [
+                "Spatial pre-filter skipped, Building.location or its point index is missing "
+                "(run data_import/neo4j_import.py to backfill)"
+            ]
+        }
+
+    try:
+        filter_geometry = wkt.loads(spatial_filter_wkt)
+    except ShapelyError as e:
+        # spatial_filtering reports invalid geometries to the user
+        return {
+            "messages": [f"Spatial pre-filter skipped, invalid WKT: {str(e)}"]
+        }
+
+    updates: Dict[str, Any] = {}
+    geometry_type = filter_geometry.geom_type
+
+    if geometry_type in ["Polygon", "MultiPolygon"]:
+        min_x, min_y, max_x, max_y = filter_geometry.bounds
+        if state.get("spatial_polygon_mode") in ("intersects", "overlap"):
+            margin = footprint_cache.max_extent
+            if margin is None:
+                margin = FOOTPRINT_SEARCH_MARGIN
+            min_x, min_y, max_x, max_y = min_x - margin, min_y - margin, max_x + margin, max_y + margin
+        predicate = BBOX_PREDICATE
+        parameters = {
+            "spatial_lower_left": CartesianPoint((min_x, min_y)),
+            "spatial_upper_right": CartesianPoint((max_x, max_y)),
+        }
+        description = "bounding box"
+
+    elif geometry_type == "Point":
+        # Determine the point mode once; spatial_filtering reuses it
+        point_filter = determine_point_filter_mode(state.get("query", ""), spatial_filter_wkt)
+        updates["spatial_point_filter"] = point_filter
+
+        if point_filter["mode"] != "radius":
+            return {
+                **updates,
+                "messages": [f"Spatial pre-filter skipped for mode '{point_filter['mode']}'"]
+            }
+
+        predicate = RADIUS_PREDICATE
+        parameters = {
+            "spatial_center": CartesianPoint((filter_geometry.x, filter_geometry.y)),
+            "spatial_radius": float(point_filter["value"]),
+        }
+        description = f"{point_filter['value']}m radius"
+
+    else:
+        return {
+            "messages": [f"Spatial pre-filter skipped for geometry type {geometry_type}"]
+        }
+
+    rewritten = inject_building_predicate(cypher_query, predicate)
+    if rewritten is None:
+        return {
+            **updates,
+            "messages": ["Spatial pre-filter skipped, could not locate collected buildings in Cypher query"]
+        }
+
+    return {
+        **updates,
+        "cypher_query": rewritten,
+        "cypher_parameters": {**(state.get("cypher_parameters") or {}), **parameters},
+        "messages": [f"Pushed {description} spatial predicate into Cypher query"]
+    }
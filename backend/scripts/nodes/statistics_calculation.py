@@ -2,50 +2,92 @@
 Statistics Calculation Node
 
 Calculates descriptive statistics from building results before answer generation.
-Computes min, mean, max for area and floors_above, and min/max for house_number.
+Uses the mergeable accumulators in utils/stats_accumulator.py on top of the
+columnar engine in utils/building_stats.py: area, floors_above, floors_below
+and the numeric part of house_number are extracted into NumPy arrays in one
+pass; count, sum, mean, std, min, max, percentiles and histograms are
+computed vectorized (house_number: min/max only). The same accumulators
+compute statistics chunk by chunk while records stream from Neo4j.
+When spatial filtering provides precomputed grid aggregates that describe the
+filtered buildings exactly, floors_above statistics are taken from them.
+If attribute identification asked for a breakdown (state "group_by"), the
+statistics are additionally grouped by district, building function and/or
+floor band in one pass over the same columnar arrays.
 """
 
-from typing import Dict, Any, List
-import re
+from typing import Dict, Any, List, Optional
+import math
 from ..models import AgentState
+from ..config import QUANTILE_SKETCH_K
+from ..utils.building_stats import (
+    histogram_percentiles, building_columns, floor_bands,
+    group_statistics, COLUMNS, GROUP_COLUMNS
+)
+from ..utils.stats_accumulator import BuildingStatsAccumulator
+from ..utils.neo4j_client import neo4j_client
 
 
-def extract_numeric_from_house_number(house_number: str) -> int | None:
+def _moments(count: int, total: float, sum_of_squares: float) -> Dict[str, float]:
+    """Mean and (population) standard deviation from count, sum and sum of squares."""
+    mean = total / count
+    variance = max(sum_of_squares / count - mean * mean, 0.0)
+    return {"mean": round(mean, 2), "std": round(math.sqrt(variance), 2)}
+
+
+def statistics_from_aggregates(aggregates: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Extract numeric part from house number string.
+    Derive floors_above statistics from precomputed grid aggregates.
     
-    Examples:
-        "12" -> 12
-        "12a" -> 12
-        "4c" -> 4
-        "abc" -> None
+    Floors percentiles come from the floors histogram, so the result has the
+    same keys as the accumulator. Area percentiles and histogram need
+    per-building values and are not available from aggregates; area is
+    therefore always computed from the buildings.
     
     Args:
-        house_number: House number string
+        aggregates: Aggregate dict from GridIndex (counts, sums, min/max, floors histogram)
         
     Returns:
-        Numeric part as integer, or None if no number found
+        Dictionary with floors_above_* statistics
     """
-    if not house_number:
-        return None
+    stats = {}
     
-    match = re.search(r'\d+', house_number)
-    if match:
-        return int(match.group())
-    return None
+    floors_count = aggregates.get("floors_count")
+    if floors_count:
+        stats["floors_above_count"] = floors_count
+        stats["floors_above_sum"] = int(aggregates["floors_sum"])
+        stats.update({f"floors_above_{name}": value for name, value in _moments(
+            floors_count, aggregates["floors_sum"], aggregates["floors_sumsq"]
+        ).items()})
+        stats["floors_above_min"] = int(aggregates["floors_min"])
+        stats["floors_above_max"] = int(aggregates["floors_max"])
+        histogram = aggregates.get("floors_histogram") or {}
+        stats.update({f"floors_above_{name}": value for name, value in histogram_percentiles(histogram).items()})
+        stats["floors_above_histogram"] = histogram
+    
+    return stats
 
 
-def calculate_building_statistics(buildings: List[Dict[str, Any]]) -> Dict[str, Any]:
+def calculate_building_statistics(
+    buildings: List[Dict[str, Any]],
+    aggregates: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """
     Calculate descriptive statistics for building attributes.
     
     Statistics:
-        - area: min, mean, max (parsed from string with "." decimal separator)
-        - floors_above: min, mean, max (integer)
+        - area: count, sum, mean, std, min, max, p10-p90, histogram
+          (parsed from string with "." decimal separator)
+        - floors_above / floors_below: count, sum, mean, std, min, max,
+          p10-p90, histogram ({floors: count})
         - house_number: min, max (numeric part only)
     
+    All buildings are in memory here, so the quantile sketch is sized to hold
+    every value and percentiles are exact.
+    
     Args:
         buildings: List of building dictionaries
+        aggregates: Optional precomputed grid aggregates of exactly these
+            buildings; floors_above is then not parsed per building
         
     Returns:
         Dictionary with calculated statistics
@@ -53,54 +95,15 @@ def calculate_building_statistics(buildings: List[Dict[str, Any]]) -> Dict[str,
     if not buildings:
         return {}
     
-    # Collect valid values
-    areas = []
-    floors = []
-    house_numbers = []
-    
-    for building in buildings:
-        # Parse area (string with "." as decimal separator)
-        area_str = building.get("area")
-        if area_str:
-            try:
-                areas.append(float(area_str))
-            except (ValueError, TypeError):
-                pass
-        
-        # Parse floors_above (should be integer)
-        floors_above = building.get("floors_above")
-        if floors_above is not None:
-            try:
-                floors.append(int(floors_above))
-            except (ValueError, TypeError):
-                pass
-        
-        # Parse house_number (extract numeric part)
-        house_number = building.get("house_number")
-        if house_number:
-            numeric_part = extract_numeric_from_house_number(str(house_number))
-            if numeric_part is not None:
-                house_numbers.append(numeric_part)
-    
-    # Calculate statistics
+    columns = COLUMNS
     stats = {}
+    if aggregates is not None:
+        stats = statistics_from_aggregates(aggregates)
+        columns = [column for column in COLUMNS if column != "floors_above"]
     
-    # Area statistics
-    if areas:
-        stats["area_min"] = round(min(areas), 2)
-        stats["area_max"] = round(max(areas), 2)
-        stats["area_mean"] = round(sum(areas) / len(areas), 2)
-    
-    # Floors statistics
-    if floors:
-        stats["floors_above_min"] = min(floors)
-        stats["floors_above_max"] = max(floors)
-        stats["floors_above_mean"] = round(sum(floors) / len(floors), 2)
-    
-    # House number statistics
-    if house_numbers:
-        stats["house_number_min"] = min(house_numbers)
-        stats["house_number_max"] = max(house_numbers)
+    accumulator = BuildingStatsAccumulator(columns, k=max(QUANTILE_SKETCH_K, len(buildings)))
+    accumulator.update(buildings)
+    stats.update(accumulator.result())
     
     # Building count
     stats["building_count"] = len(buildings)
@@ -108,6 +111,43 @@ def calculate_building_statistics(buildings: List[Dict[str, Any]]) -> Dict[str,
     return stats
 
 
+def calculate_grouped_statistics(
+    buildings: List[Dict[str, Any]],
+    group_by: List[str]
+) -> Dict[str, Any]:
+    """
+    Calculate area and floors_above statistics per group.
+    
+    District and building function are looked up via IN_DISTRICT / HAS_FUNCTION
+    in one Neo4j query; floor bands are derived from floors_above.
+    
+    Args:
+        buildings: List of building dictionaries
+        group_by: Group dimensions in nesting order ("district", "function", "floor_band")
+        
+    Returns:
+        {"group_by": [...], "groups": {label: ... {statistics}}}, empty dict
+        if there are no buildings or dimensions
+    """
+    if not buildings or not group_by:
+        return {}
+    
+    columns = building_columns(buildings, GROUP_COLUMNS)
+    memberships = {}
+    if "district" in group_by or "function" in group_by:
+        memberships = neo4j_client.get_building_memberships([b.get("id") for b in buildings])
+    
+    keys = {}
+    for dimension in group_by:
+        if dimension == "floor_band":
+            keys[dimension] = floor_bands(columns["floors_above"])
+        else:
+            field = "district" if dimension == "district" else "function_code"
+            keys[dimension] = [memberships.get(b.get("id"), {}).get(field) for b in buildings]
+    
+    return group_statistics(columns, keys)
+
+
 def statistics_calculation(state: AgentState) -> Dict[str, Any]:
     """
     Calculate statistics from query results and add to results structure.
@@ -118,6 +158,8 @@ def statistics_calculation(state: AgentState) -> Dict[str, Any]:
     To:
         [{"buildings": [...], "statistics": {...}}]
     
+    plus "grouped_statistics" if the state requests a breakdown (group_by).
+    
     Args:
         state: Current agent state with results
         
@@ -132,6 +174,12 @@ def statistics_calculation(state: AgentState) -> Dict[str, Any]:
             "messages": ["No results to calculate statistics from"]
         }
     
+    # Statistics were already computed by Neo4j (aggregate pushdown)
+    if isinstance(results[0], dict) and results[0].get("aggregated"):
+        return {
+            "messages": ["Using statistics computed in Neo4j"]
+        }
+    
     # Extract buildings from results structure
     buildings = []
     if isinstance(results, list) and len(results) > 0:
@@ -142,8 +190,13 @@ def statistics_calculation(state: AgentState) -> Dict[str, Any]:
             # Direct list of buildings: [building1, building2, ...]
             buildings = results
     
+    # Use grid aggregates from spatial filtering if they cover exactly these buildings
+    aggregates = (state.get("spatial_comparison") or {}).get("aggregates")
+    if not aggregates or aggregates.get("building_count") != len(buildings):
+        aggregates = None
+    
     # Calculate statistics
-    statistics = calculate_building_statistics(buildings)
+    statistics = calculate_building_statistics(buildings, aggregates)
     
     # Update results structure
     updated_results = [
@@ -152,8 +205,17 @@ def statistics_calculation(state: AgentState) -> Dict[str, Any]:
             "statistics": statistics
         }
     ]
+    messages = [f"Calculated statistics for {statistics.get('building_count', 0)} buildings"]
+    
+    group_by = state.get("group_by") or []
+    if group_by and buildings:
+        try:
+            updated_results[0]["grouped_statistics"] = calculate_grouped_statistics(buildings, group_by)
+            messages.append(f"Calculated grouped statistics by {', '.join(group_by)}")
+        except Exception as e:
+            messages.append(f"Grouped statistics failed: {str(e)}")
     
     return {
         "results": updated_results,
-        "messages": [f"Calculated statistics for {statistics.get('building_count', 0)} buildings"]
+        "messages": messages
     }
@@ -0,0 +1,255 @@
+"""
+Columnar statistics engine for building attributes.
+
+Pulls the numeric building attributes (area, floors above/below ground and
+the numeric part of the house number) into typed NumPy arrays in a single
+pass over the building dicts, then computes descriptive statistics with
+vectorized operations: count, sum, mean, std, min, max, percentiles and
+histograms.
+
+Missing or unparseable values are NaN in the arrays and are ignored by all
+statistics.
+
+group_statistics breaks the statistics down by one or more group keys
+(district, building function, floor band) in a single hash-based pass.
+"""
+
+from typing import Dict, Any, List, Iterable, Sequence
+import re
+
+import numpy as np
+
+# Columns extracted from building dicts
+COLUMNS = ("area", "floors_above", "floors_below", "house_number")
+# Columns with integer values (floors): histogram as value counts
+INTEGER_COLUMNS = ("floors_above", "floors_below")
+# Columns that only get min/max (mean/percentiles of house numbers are meaningless)
+RANGE_ONLY_COLUMNS = ("house_number",)
+
+PERCENTILES = (10, 25, 50, 75, 90)
+AREA_HISTOGRAM_BINS = 10
+
+# Supported group-by dimensions
+GROUP_DIMENSIONS = ("district", "function", "floor_band")
+# Lower edges of the floor bands: 0-2, 3-5, 6-9, 10+
+FLOOR_BAND_EDGES = (0, 3, 6, 10)
+# Columns summarized per group
+GROUP_COLUMNS = ("area", "floors_above")
+UNKNOWN_GROUP = "unknown"
+
+_HOUSE_NUMBER_PATTERN = re.compile(r"\d+")
+
+
+def _float_array(values: List[Any]) -> np.ndarray:
+    """Convert raw values to float64; None, empty and invalid values become NaN."""
+    cleaned = [np.nan if value is None or value == "" else value for value in values]
+    try:
+        return np.array(cleaned, dtype=np.float64)
+    except (ValueError, TypeError):
+        array = np.full(len(cleaned), np.nan, dtype=np.float64)
+        for i, value in enumerate(cleaned):
+            try:
+                array[i] = float(value)
+            except (ValueError, TypeError):
+                pass
+        return array
+
+
+def building_columns(
+    buildings: List[Dict[str, Any]],
+    columns: Iterable[str] = COLUMNS
+) -> Dict[str, np.ndarray]:
+    """
+    Extract numeric attribute columns from building dicts in one pass.
+
+    Args:
+        buildings: List of building dictionaries
+        columns: Columns to extract (subset of COLUMNS)
+
+    Returns:
+        Dict mapping column name to a float64 array (NaN where missing).
+        Floors are truncated to integers, house numbers reduced to their
+        numeric part ("12a" -> 12).
+    """
+    columns = tuple(columns)
+    raw: Dict[str, List[Any]] = {column: [] for column in columns}
+    appends = [(raw[column].append, column) for column in columns]
+
+    for building in buildings:
+        for append, column in appends:
+            append(building.get(column))
+
+    arrays = {}
+    for column in columns:
+        values = raw[column]
+        if column == "house_number":
+            matches = [_HOUSE_NUMBER_PATTERN.search(str(value)) if value else None for value in values]
+            values = [int(match.group()) if match else None for match in matches]
+        array = _float_array(values)
+        if column in INTEGER_COLUMNS:
+            array = np.trunc(array)
+        arrays[column] = array
+    return arrays
+
+
+def histogram_percentiles(counts: Dict[int, int], decimals: int = 2) -> Dict[str, float]:
+    """
+    Percentiles of integer values given as a {value: count} histogram.
+
+    Interpolates linearly like np.percentile on the expanded values, so the
+    result is exact for histograms of integer columns.
+    """
+    if not counts:
+        return {}
+    values = np.array(sorted(counts), dtype=np.float64)
+    cumulative = np.cumsum([counts[int(value)] for value in values])
+    ranks = np.array(PERCENTILES, dtype=np.float64) / 100 * (cumulative[-1] - 1)
+
+    lower = np.floor(ranks)
+    low_values = values[np.searchsorted(cumulative, lower, side="right")]
+    high_values = values[np.searchsorted(cumulative, np.minimum(lower + 1, cumulative[-1] - 1), side="right")]
+    result = low_values + (ranks - lower) * (high_values - low_values)
+    return {f"p{q}": round(float(value), decimals) for q, value in zip(PERCENTILES, result)}
+
+
+def statistics_from_record(record: Dict[str, Any], decimals: int = 2) -> Dict[str, Any]:
+    """
+    Format a statistics row computed by Neo4j (see cypher_rewrite.return_aggregates).
+
+    Uses the same keys and rounding as BuildingStatsAccumulator.result;
+    columns without any valid value are dropped.
+
+    Args:
+        record: Single result row with building_count and <column>_<stat> values
+
+    Returns:
+        Flat statistics dict
+    """
+    stats: Dict[str, Any] = {}
+    columns = {key[:-len("_count")] for key in record if key.endswith("_count") and key != "building_count"}
+
+    for column in sorted(columns, key=lambda name: COLUMNS.index(name) if name in COLUMNS else len(COLUMNS)):
+        if not record.get(f"{column}_count"):
+            continue
+        integer = column in INTEGER_COLUMNS
+        for key, value in record.items():
+            if not key.startswith(f"{column}_") or value is None:
+                continue
+            stat = key[len(column) + 1:]
+            if stat == "count" or (integer and stat in ("sum", "min", "max")):
+                stats[key] = int(value)
+            else:
+                stats[key] = round(float(value), decimals)
+
+    stats["building_count"] = int(record.get("building_count") or 0)
+    return stats
+
+
+def floor_bands(floors: np.ndarray) -> List[str]:
+    """Label floor counts with their band (e.g. "3-5", "10+"); NaN becomes UNKNOWN_GROUP."""
+    labels = [
+        f"{low}-{high - 1}" for low, high in zip(FLOOR_BAND_EDGES, FLOOR_BAND_EDGES[1:])
+    ] + [f"{FLOOR_BAND_EDGES[-1]}+"]
+    band = np.searchsorted(FLOOR_BAND_EDGES, np.nan_to_num(floors, nan=-1), side="right") - 1
+    return [labels[b] if b >= 0 else UNKNOWN_GROUP for b in band]
+
+
+def _factorize(labels: Sequence[Any]) -> tuple:
+    """Hash-based factorization: integer code per row and the distinct labels."""
+    index: Dict[str, int] = {}
+    codes = np.fromiter(
+        (index.setdefault(UNKNOWN_GROUP if label is None else str(label), len(index)) for label in labels),
+        dtype=np.int64,
+        count=len(labels),
+    )
+    return codes, list(index)
+
+
+def group_statistics(
+    columns: Dict[str, np.ndarray],
+    keys: Dict[str, Sequence[Any]],
+    decimals: int = 2
+) -> Dict[str, Any]:
+    """
+    Statistics per group of one or more keys in a single pass.
+
+    Every key is factorized with a hash map, the codes are combined into one
+    group id per row and all per-group sums, counts, minima and maxima are
+    computed with bincount / ufunc.at over the columnar arrays.
+
+    Args:
+        columns: Column arrays from building_columns (GROUP_COLUMNS are used)
+        keys: Group dimension name -> label per row (None = UNKNOWN_GROUP),
+            in nesting order (at least one key)
+        decimals: Rounding of float statistics
+
+    Returns:
+        {"group_by": [...], "groups": nested dict label -> ... -> stats}
+        where stats has building_count and <column>_sum/_mean/_min/_max
+    """
+    names = list(keys)
+    size = len(next(iter(keys.values()))) if keys else 0
+    group_ids = np.zeros(size, dtype=np.int64)
+    dimensions = []
+    for name in names:
+        codes, labels = _factorize(keys[name])
+        group_ids = group_ids * len(labels) + codes
+        dimensions.append(labels)
+
+    unique_ids, group_index = np.unique(group_ids, return_inverse=True)
+    group_count = len(unique_ids)
+    counts = np.bincount(group_index, minlength=group_count)
+
+    summaries = {}
+    for column in GROUP_COLUMNS:
+        values = columns.get(column)
+        if values is None:
+            continue
+        valid = ~np.isnan(values)
+        index, data = group_index[valid], values[valid]
+        valid_counts = np.bincount(index, minlength=group_count)
+        sums = np.bincount(index, weights=data, minlength=group_count)
+        minima = np.full(group_count, np.inf)
+        maxima = np.full(group_count, -np.inf)
+        np.minimum.at(minima, index, data)
+        np.maximum.at(maxima, index, data)
+        summaries[column] = (valid_counts, sums, minima, maxima)
+
+    groups: Dict[str, Any] = {}
+    for position, group_id in enumerate(unique_ids):
+        # Decode the mixed-radix group id into one label per dimension
+        labels = []
+        for dimension in reversed(dimensions):
+            group_id, code = divmod(int(group_id), len(dimension))
+            labels.append(dimension[code])
+        labels.reverse()
+
+        stats: Dict[str, Any] = {"building_count": int(counts[position])}
+        for column, (valid_counts, sums, minima, maxima) in summaries.items():
+            if not valid_counts[position]:
+                continue
+            integer = column in INTEGER_COLUMNS
+            cast = int if integer else (lambda value: round(float(value), decimals))
+            stats[f"{column}_sum"] = cast(sums[position])
+            stats[f"{column}_mean"] = round(float(sums[position] / valid_counts[position]), decimals)
+            stats[f"{column}_min"] = cast(minima[position])
+            stats[f"{column}_max"] = cast(maxima[position])
+
+        node = groups
+        for label in labels[:-1]:
+            node = node.setdefault(label, {})
+        node[labels[-1]] = stats
+
+    return {"group_by": names, "groups": _sorted_groups(groups, len(names))}
+
+
+def _sorted_groups(groups: Dict[str, Any], depth: int) -> Dict[str, Any]:
+    """Sort nested group labels naturally ("3-5" before "10+", UNKNOWN_GROUP last)."""
+    def key(label: str) -> tuple:
+        number = re.match(r"\d+", label)
+        return label == UNKNOWN_GROUP, number is None, int(number.group()) if number else 0, label
+
+    ordered = sorted(groups, key=key)
+    if depth <= 1:
+        return {label: groups[label] for label in ordered}
+    return {label: _sorted_groups(groups[label], depth - 1) for label in ordered}
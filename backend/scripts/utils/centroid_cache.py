@@ -0,0 +1,233 @@
+"""
+Process-wide cache of building centroid coordinates.
+
+Holds the centroids of all Building nodes as a contiguous float64 (n, 2)
+array with an id -> row index, so spatial steps read coordinates directly
+instead of re-parsing centroid WKT strings on every request. Area and floors
+are kept alongside for the grid cell index (utils/grid_index.py), which is
+built lazily over the cached centroids.
+
+The cache is warmed from a single Neo4j scan (at API startup) and reloaded
+when the dataset version stamp written by the import scripts changes.
+"""
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import threading
+
+import numpy as np
+import shapely
+
+from ..config import GRID_CELL_SIZE
+from .geometry import parse_building_points, points_xy
+from .grid_index import GridIndex
+from .neo4j_client import neo4j_client
+from .data_version import data_version_tracker
+
+
+def _numeric_array(values: List[Any], cast) -> np.ndarray:
+    """Float array of values converted with cast (like the statistics node); NaN if invalid."""
+    array = np.full(len(values), np.nan, dtype=np.float64)
+    for i, value in enumerate(values):
+        if value is None or value == "":
+            continue
+        try:
+            array[i] = cast(value)
+        except (ValueError, TypeError):
+            pass
+    return array
+
+
+class _CacheState:
+    """Immutable snapshot of the cached coordinates (swapped atomically)."""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        xy: np.ndarray,
+        version: Optional[int],
+        area: np.ndarray,
+        floors: np.ndarray
+    ):
+        self.ids = ids
+        self.xy = np.ascontiguousarray(xy, dtype=np.float64)
+        self.rows: Dict[str, int] = {building_id: row for row, building_id in enumerate(ids)}
+        self.version = version
+        self.area = area
+        self.floors = floors
+        self.grid: Optional[GridIndex] = None
+
+
+class CentroidCache:
+    """In-memory cache mapping building id to its centroid (x, y) in EPSG:25833."""
+
+    _instance: Optional["CentroidCache"] = None
+
+    def __new__(cls):
+        """Singleton pattern so all nodes share one cache."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._state = None
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether the cache currently holds coordinates."""
+        return self._state is not None
+
+    @property
+    def version(self) -> Optional[int]:
+        """Dataset version the cached coordinates were loaded from."""
+        state = self._state
+        return state.version if state else None
+
+    def __len__(self) -> int:
+        state = self._state
+        return len(state.ids) if state else 0
+
+    def load(self, records: List[Dict[str, Any]], version: Optional[int] = None) -> int:
+        """
+        Replace the cache contents from id/centroid records.
+
+        Args:
+            records: Dicts with 'id' and 'centroid' (WKT) keys, optionally
+                'area' and 'floors_above' for the grid aggregates
+            version: Dataset version the records belong to
+
+        Returns:
+            Number of buildings cached (records without a valid centroid are skipped)
+        """
+        points, valid = parse_building_points(records)
+        ids = np.array([record.get("id") for record in records], dtype=object)
+        keep = valid & np.array([building_id is not None for building_id in ids], dtype=bool)
+
+        x, y = points_xy(points[keep])
+        kept = [records[i] for i in np.flatnonzero(keep)]
+        area = _numeric_array([record.get("area") for record in kept], float)
+        floors = _numeric_array([record.get("floors_above") for record in kept], int)
+        self._state = _CacheState(ids[keep], np.column_stack((x, y)), version, area, floors)
+        return len(self)
+
+    def warm(self) -> int:
+        """
+        Load all building centroids from Neo4j in a single scan.
+
+        Returns:
+            Number of buildings cached
+        """
+        with self._lock:
+            version = data_version_tracker.current(force=True)
+            records = neo4j_client.get_building_centroids()
+            return self.load(records, version)
+
+    def invalidate(self):
+        """Drop all cached coordinates."""
+        self._state = None
+
+    def ensure_current(self) -> bool:
+        """
+        Reload the cache if the dataset changed since it was warmed.
+
+        A cold cache stays cold; only a cache that was warmed explicitly
+        (e.g. at API startup) is kept up to date.
+
+        Returns:
+            True if the cache is warm after the check
+        """
+        state = self._state
+        if state is None:
+            return False
+
+        # The new snapshot is swapped in only once it is complete: during a
+        # reload (or after a failed one) requests keep using the previous one
+        if data_version_tracker.current() != state.version and not self._lock.locked():
+            try:
+                self.warm()
+            except Exception as e:
+                print(f"Centroid cache reload failed, keeping the previous snapshot: {e}")
+        return self.is_warm
+
+    def _grid(self, state: Optional[_CacheState]) -> Optional[GridIndex]:
+        """Build (once) and return the grid of one snapshot; positions are cache rows."""
+        if state is None:
+            return None
+        if state.grid is None:
+            with self._lock:
+                if state.grid is None:
+                    state.grid = GridIndex(state.xy, GRID_CELL_SIZE, state.area, state.floors)
+        return state.grid
+
+    def grid_rows(self, ids: Sequence[Any]) -> Tuple[Optional[GridIndex], np.ndarray]:
+        """
+        Grid index and cache rows of building ids, taken from the same snapshot.
+
+        Returns:
+            Tuple of (grid, rows): the grid (None while cold) and the cache
+            rows of the ids (-1 for ids that are not cached)
+        """
+        state = self._state
+        return self._grid(state), self._lookup(state, ids)
+
+    @staticmethod
+    def _lookup(state: Optional[_CacheState], ids: Sequence[Any]) -> np.ndarray:
+        """Map ids to rows of one snapshot (so rows and coordinates never mix snapshots)."""
+        if state is None:
+            return np.full(len(ids), -1, dtype=np.intp)
+        rows = state.rows
+        return np.fromiter((rows.get(building_id, -1) for building_id in ids), dtype=np.intp, count=len(ids))
+
+    def coordinates(self, ids: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up centroid coordinates for building ids.
+
+        Returns:
+            Tuple of (xy, found) where xy is a float64 (n, 2) array (NaN for
+            unknown ids) and found is a boolean mask
+        """
+        state = self._state
+        rows = self._lookup(state, ids)
+        found = rows >= 0
+        xy = np.full((len(ids), 2), np.nan, dtype=np.float64)
+        if state is not None and found.any():
+            xy[found] = state.xy[rows[found]]
+        return xy, found
+
+    def building_xy(self, buildings: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Centroid coordinates for a batch of buildings, read from the cache where possible.
+
+        Buildings that are not cached fall back to parsing their own geometry
+        fields with the batch parser.
+
+        Returns:
+            Tuple of (xy, valid) where xy is a float64 (n, 2) array (NaN where
+            no geometry is available) and valid is a boolean mask
+        """
+        xy, found = self.coordinates([building.get("id") for building in buildings])
+
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            parsed, _ = parse_building_points([buildings[i] for i in missing])
+            x, y = points_xy(parsed)
+            xy[missing, 0] = x
+            xy[missing, 1] = y
+
+        valid = ~np.isnan(xy).any(axis=1)
+        return xy, valid
+
+    def building_points(self, buildings: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Centroid points for a batch of buildings (see building_xy).
+
+        Returns:
+            Tuple of (points, valid) like parse_building_points
+        """
+        xy, valid = self.building_xy(buildings)
+        points = np.full(len(buildings), None, dtype=object)
+        if valid.any():
+            points[valid] = shapely.points(xy[valid])
+        return points, valid
+
+
+# Global instance for convenience
+centroid_cache = CentroidCache()
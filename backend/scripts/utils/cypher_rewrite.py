@@ -0,0 +1,366 @@
+"""
+Helpers for rewriting LLM-generated Cypher queries.
+
+The cypher_district prompt makes every generated query end in
+`RETURN collect(b) AS buildings`. These helpers locate that final RETURN
+clause and the collected building variable, so later pipeline stages can
+inject predicates, stream the buildings row by row or replace them with
+server-side aggregates without another LLM round trip. building_selection
+recognizes queries that select buildings by district and function only, which
+can be answered from the precomputed statistics cube. When a query does not
+have the expected shape the helpers return None and callers leave it untouched.
+"""
+
+from typing import Any, Dict, List, Optional
+import re
+
+from .building_stats import PERCENTILES
+
+_KEYWORD_PATTERN = re.compile(r"[A-Za-z_]\w*")
+_COLLECT_PATTERN = re.compile(r"collect\s*\(\s*(?:DISTINCT\s+)?([A-Za-z_]\w*)\s*\)", re.IGNORECASE)
+# Typed expressions of the building attributes aggregated by return_aggregates
+AGGREGATE_EXPRESSIONS = {
+    "area": "toFloat({var}.area)",
+    "floors_above": "toInteger({var}.floors_above)",
+    "floors_below": "toInteger({var}.floors_below)",
+}
+# Building properties fetched for analysis (everything but the geometry_geojson footprint)
+BUILDING_PROPERTIES = (
+    "id", "name", "street_name", "house_number", "post_code",
+    "area", "floors_above", "floors_below", "centroid",
+)
+_COLLECT_RETURN_PATTERN = re.compile(
+    r"RETURN\s+collect\s*\(\s*(DISTINCT\s+)?([A-Za-z_]\w*)\s*\)\s+AS\s+buildings\s*;?\s*",
+    re.IGNORECASE,
+)
+
+
+def _top_level_keywords(cypher: str) -> List[tuple]:
+    """
+    List (position, KEYWORD) pairs of identifiers outside strings and braces.
+
+    Skips string literals, backtick-quoted names and comments, and ignores
+    everything nested in {...} (map literals, CALL subqueries).
+    """
+    keywords = []
+    depth = 0
+    i = 0
+    length = len(cypher)
+
+    while i < length:
+        char = cypher[i]
+        if char in ("'", '"', "`"):
+            end = i + 1
+            while end < length and cypher[end] != char:
+                end += 2 if cypher[end] == "\\" else 1
+            i = end + 1
+        elif cypher.startswith("//", i):
+            end = cypher.find("\n", i)
+            i = length if end == -1 else end
+        elif char == "{":
+            depth += 1
+            i += 1
+        elif char == "}":
+            depth = max(depth - 1, 0)
+            i += 1
+        elif char.isalpha() or char == "_":
+            match = _KEYWORD_PATTERN.match(cypher, i)
+            if depth == 0:
+                keywords.append((i, match.group().upper()))
+            i = match.end()
+        else:
+            i += 1
+
+    return keywords
+
+
+def find_final_return(cypher: str) -> Optional[int]:
+    """
+    Find the start offset of the final top-level RETURN clause.
+
+    Returns:
+        Offset of the RETURN keyword, or None for UNION queries and
+        queries without a top-level RETURN
+    """
+    keywords = _top_level_keywords(cypher)
+    if any(keyword == "UNION" for _, keyword in keywords):
+        return None
+
+    returns = [position for position, keyword in keywords if keyword == "RETURN"]
+    return returns[-1] if returns else None
+
+
+def find_building_variable(cypher: str) -> Optional[str]:
+    """
+    Find the variable of the buildings collected in the final RETURN clause.
+
+    The variable must be bound to the Building label somewhere in the query,
+    e.g. `(b:Building)` for `RETURN collect(b) AS buildings`.
+
+    Returns:
+        Variable name, or None if the query does not collect buildings
+    """
+    return_position = find_final_return(cypher)
+    if return_position is None:
+        return None
+
+    match = _COLLECT_PATTERN.search(cypher, return_position)
+    if not match:
+        return None
+
+    variable = match.group(1)
+    if not re.search(rf"\(\s*{re.escape(variable)}\s*:\s*Building\b", cypher):
+        return None
+    return variable
+
+
+def inject_building_predicate(cypher: str, predicate: str) -> Optional[str]:
+    """
+    Add a predicate on the collected buildings right before the final RETURN.
+
+    Args:
+        cypher: Generated Cypher query
+        predicate: Cypher boolean expression using `{var}` as placeholder for
+            the building variable, e.g. "{var}.floors_above > $min_floors"
+
+    Returns:
+        Rewritten query, or None if the query shape is not recognized
+    """
+    variable = find_building_variable(cypher)
+    if variable is None:
+        return None
+
+    return_position = find_final_return(cypher)
+    condition = predicate.format(var=variable)
+    head = cypher[:return_position].rstrip()
+    tail = cypher[return_position:]
+    return f"{head}\nWITH * WHERE {condition}\n{tail}"
+
+
+def _projection(variable: str) -> str:
+    """Map projection of BUILDING_PROPERTIES, e.g. `b {.id, .name, ...}`."""
+    return f"{variable} {{{', '.join('.' + name for name in BUILDING_PROPERTIES)}}}"
+
+
+def project_buildings(cypher: str) -> Optional[str]:
+    """
+    Rewrite `RETURN collect(b) AS buildings` to collect only BUILDING_PROPERTIES.
+
+    Leaves out the geometry_geojson footprint, by far the largest property;
+    footprints are fetched by id only for the buildings that need them.
+
+    Returns:
+        Rewritten query, or None if the query shape is not recognized
+    """
+    located = _collect_return(cypher)
+    if located is None:
+        return None
+    return_position, variable, distinct = located
+
+    distinct_keyword = "DISTINCT " if distinct else ""
+    return f"{cypher[:return_position]}RETURN collect({distinct_keyword}{_projection(variable)}) AS buildings"
+
+
+def return_building_rows(cypher: str, projected: bool = False) -> Optional[str]:
+    """
+    Rewrite `RETURN collect(b) AS buildings` to return one row per building.
+
+    The row form `RETURN b AS building` lets callers stream buildings from the
+    result instead of receiving one record with the whole collected list. Only
+    queries whose final RETURN consists of exactly the collected buildings are
+    rewritten.
+
+    Args:
+        cypher: Generated Cypher query
+        projected: Return only BUILDING_PROPERTIES (see project_buildings)
+
+    Returns:
+        Rewritten query, or None if the query shape is not recognized
+    """
+    located = _collect_return(cypher)
+    if located is None:
+        return None
+    return_position, variable, distinct = located
+
+    distinct_keyword = "DISTINCT " if distinct else ""
+    expression = _projection(variable) if projected else variable
+    return f"{cypher[:return_position]}RETURN {distinct_keyword}{expression} AS building"
+
+
+def _collect_return(cypher: str) -> Optional[tuple]:
+    """Locate an exact `RETURN collect([DISTINCT] b) AS buildings` (offset, variable, distinct)."""
+    variable = find_building_variable(cypher)
+    if variable is None:
+        return None
+
+    return_position = find_final_return(cypher)
+    match = _COLLECT_RETURN_PATTERN.fullmatch(cypher, return_position)
+    if not match or match.group(2) != variable:
+        return None
+    return return_position, variable, bool(match.group(1))
+
+
+def return_aggregates(cypher: str) -> Optional[str]:
+    """
+    Rewrite `RETURN collect(b) AS buildings` to return statistics computed by Neo4j.
+
+    The query returns a single row with building_count and, for every column
+    of AGGREGATE_EXPRESSIONS, <column>_count/_sum/_mean/_std/_min/_max and
+    percentileCont percentiles <column>_p10 ... (see building_stats.PERCENTILES).
+
+    Returns:
+        Rewritten query, or None if the query shape is not recognized
+    """
+    located = _collect_return(cypher)
+    if located is None:
+        return None
+    return_position, variable, distinct = located
+
+    projections = ", ".join(
+        f"{expression.format(var=variable)} AS {column}" for column, expression in AGGREGATE_EXPRESSIONS.items()
+    )
+    items = [f"count({variable}) AS building_count"]
+    for column in AGGREGATE_EXPRESSIONS:
+        items += [
+            f"count({column}) AS {column}_count",
+            f"sum({column}) AS {column}_sum",
+            f"avg({column}) AS {column}_mean",
+            f"stDevP({column}) AS {column}_std",
+            f"min({column}) AS {column}_min",
+            f"max({column}) AS {column}_max",
+        ]
+        items += [f"percentileCont({column}, {q / 100}) AS {column}_p{q}" for q in PERCENTILES]
+
+    distinct_keyword = "DISTINCT " if distinct else ""
+    return (
+        f"{cypher[:return_position]}WITH {distinct_keyword}{variable}, {projections}\n"
+        f"RETURN " + ",\n       ".join(items)
+    )
+
+
+_NODE_PATTERN = re.compile(
+    r"\(\s*([A-Za-z_]\w*)?\s*(?::\s*([A-Za-z_]\w*))?\s*(?:\{([^{}]*)\})?\s*\)"
+)
+_RELATIONSHIP_PATTERN = re.compile(r"-\s*\[\s*(?:[A-Za-z_]\w*)?\s*:\s*([A-Za-z_]\w*)\s*\]\s*->")
+_VALUE = r"(?:'[^']*'|\"[^\"]*\"|\d+)"
+_CONDITION_PATTERN = re.compile(
+    r"([A-Za-z_]\w*)\.(Gemeinde_name|code)\s*(?:=\s*(" + _VALUE + r")|IN\s*\[\s*((?:" + _VALUE + r"\s*,?\s*)*)\]"
+    r"|IN\s*\$([A-Za-z_]\w*))",
+    re.IGNORECASE,
+)
+# `IN $name` list parameters (e.g. the expanded function codes)
+_LIST_PARAMETER = re.compile(r"\bIN\s*\$([A-Za-z_]\w*)", re.IGNORECASE)
+# Keywords that make a query more than a district / function selection
+_SELECTION_BLOCKERS = {
+    "OPTIONAL", "WITH", "UNWIND", "CALL", "OR", "XOR", "NOT", "EXISTS", "CONTAINS",
+    "STARTS", "ENDS", "IS", "NULL", "COUNT", "SIZE", "UNION", "FOREACH", "LOAD",
+}
+_SELECTION_LABELS = {"Building": None, "District": "IN_DISTRICT", "Function": "HAS_FUNCTION"}
+
+
+def _literal_values(single: Optional[str], listed: Optional[str]) -> List[Any]:
+    """Values of `= literal` or `IN [literals]` (strings unquoted, digits as int)."""
+    tokens = [single] if single is not None else re.findall(_VALUE, listed or "")
+    return [token[1:-1] if token[0] in "'\"" else int(token) for token in tokens]
+
+
+def building_selection(cypher: str, parameters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Recognize queries that select buildings only by district and function.
+
+    Matches queries like
+    `MATCH (b:Building)-[:IN_DISTRICT]->(d:District {Gemeinde_name: 'Pankow'}),
+    (b)-[:HAS_FUNCTION]->(f:Function) WHERE f.code IN [1010, 1020]
+    RETURN collect(b) AS buildings`; the code list may also be a list
+    parameter (`f.code IN $codes`). Any other predicate (building attributes,
+    other parameters, OR, OPTIONAL MATCH, WITH, ...) makes the query
+    unrecognized.
+
+    Args:
+        cypher: Cypher query
+        parameters: Query parameters for `IN $name` conditions
+
+    Returns:
+        Dict with 'districts' / 'function_codes' (allowed values, None = no
+        value restriction) and 'require_district' / 'require_function' (the
+        relationship must exist), or None if the query is not such a selection
+    """
+    located = _collect_return(cypher)
+    if located is None:
+        return None
+    return_position, building_variable, _ = located
+    head = cypher[:return_position]
+
+    keywords = _top_level_keywords(head)
+    parameters = parameters or {}
+    listed_parameters = _LIST_PARAMETER.findall(head)
+    if "$" in _LIST_PARAMETER.sub("", head) or any(keyword in _SELECTION_BLOCKERS for _, keyword in keywords):
+        return None
+    if any(not isinstance(parameters.get(name), (list, tuple)) for name in listed_parameters):
+        return None
+
+    # Split into pattern parts (after MATCH) and condition parts (after WHERE)
+    boundaries = [(position, keyword) for position, keyword in keywords if keyword in ("MATCH", "WHERE")]
+    if not boundaries or boundaries[0][1] != "MATCH" or head[:boundaries[0][0]].strip():
+        return None
+    patterns, conditions = [], []
+    for (position, keyword), (end, _) in zip(boundaries, boundaries[1:] + [(len(head), None)]):
+        text = head[position + len(keyword):end]
+        (patterns if keyword == "MATCH" else conditions).append(text)
+
+    labels: Dict[str, str] = {}
+    values: Dict[str, List[List[Any]]] = {"District": [], "Function": []}
+    relationships = set()
+    for pattern in patterns:
+        for node in _NODE_PATTERN.finditer(pattern):
+            variable, label, properties = node.groups()
+            if label is not None:
+                if label not in _SELECTION_LABELS or labels.get(variable, label) != label:
+                    return None
+                if variable:
+                    labels[variable] = label
+            if properties and properties.strip():
+                condition = re.fullmatch(
+                    r"\s*(Gemeinde_name|code)\s*:\s*(" + _VALUE + r")\s*", properties, re.IGNORECASE
+                )
+                expected = {"District": "gemeinde_name", "Function": "code"}.get(label)
+                if not condition or condition.group(1).lower() != expected:
+                    return None
+                values[label].append(_literal_values(condition.group(2), None))
+        relationships.update(match.group(1) for match in _RELATIONSHIP_PATTERN.finditer(pattern))
+        # Nothing but nodes, relationships and commas may remain
+        rest = _RELATIONSHIP_PATTERN.sub("", _NODE_PATTERN.sub("", pattern))
+        if rest.replace(",", "").strip():
+            return None
+
+    for text in conditions:
+        for conjunct in re.split(r"\bAND\b", text, flags=re.IGNORECASE):
+            match = _CONDITION_PATTERN.fullmatch(conjunct.strip())
+            if not match:
+                return None
+            variable, prop, single, listed, parameter = match.groups()
+            label = labels.get(variable)
+            if (label, prop.lower()) not in (("District", "gemeinde_name"), ("Function", "code")):
+                return None
+            values[label].append(list(parameters[parameter]) if parameter else _literal_values(single, listed))
+
+    if labels.get(building_variable) != "Building" or list(labels.values()).count("Building") != 1:
+        return None
+    if not relationships <= {"IN_DISTRICT", "HAS_FUNCTION"}:
+        return None
+
+    selection: Dict[str, Any] = {}
+    for label, values_key, required_key in (
+        ("District", "districts", "require_district"),
+        ("Function", "function_codes", "require_function"),
+    ):
+        required = label in labels.values()
+        if required != (_SELECTION_LABELS[label] in relationships):
+            return None
+        # Several conditions on the same node intersect
+        allowed = None
+        for listed in values[label]:
+            allowed = [value for value in listed if allowed is None or value in allowed]
+        selection[values_key] = allowed
+        selection[required_key] = required
+    return selection
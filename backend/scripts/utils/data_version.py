@@ -0,0 +1,73 @@
+"""
+Dataset version tracking for in-memory caches.
+
+The data import scripts write a version stamp to a (:DatasetVersion) node
+whenever they modify the database. Caches remember the version they were
+built from and compare it against the tracker to detect stale data.
+"""
+
+from typing import Optional
+import threading
+import time
+
+from ..config import DATA_VERSION_CHECK_SECONDS
+from .neo4j_client import neo4j_client, async_neo4j_client
+
+
+class DataVersionTracker:
+    """Polls the dataset version stamp at most once per check interval."""
+    
+    def __init__(self, check_interval: float = DATA_VERSION_CHECK_SECONDS):
+        self._check_interval = check_interval
+        self._version: Optional[int] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def current(self, force: bool = False) -> Optional[int]:
+        """
+        Return the current dataset version.
+        
+        Args:
+            force: Query the database even if the last check is recent
+            
+        Returns:
+            Version stamp, or None if the import scripts never wrote one
+        """
+        with self._lock:
+            now = time.monotonic()
+            due = self._checked_at is None or now - self._checked_at >= self._check_interval
+            if force or due:
+                try:
+                    self._version = neo4j_client.get_data_version()
+                except Exception as e:
+                    # Keep the last known version; a failed check must not drop caches
+                    print(f"Data version check failed: {e}")
+                self._checked_at = now
+            return self._version
+    
+    async def acurrent(self, force: bool = False) -> Optional[int]:
+        """
+        Async variant of current() that awaits the version check.
+        
+        After it returned, current() uses the fresh value without a database
+        round trip until the check interval has passed again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            due = self._checked_at is None or now - self._checked_at >= self._check_interval
+            if not (force or due):
+                return self._version
+        try:
+            version = await async_neo4j_client.get_data_version()
+        except Exception as e:
+            # Keep the last known version; a failed check must not drop caches
+            print(f"Data version check failed: {e}")
+            version = self._version
+        with self._lock:
+            self._version = version
+            self._checked_at = now
+            return self._version
+
+
+# Global instance for convenience
+data_version_tracker = DataVersionTracker()
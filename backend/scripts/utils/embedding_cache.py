@@ -0,0 +1,179 @@
+"""
+Persistent cache of query embeddings.
+
+The building_function_query values extracted from user questions repeat
+heavily ("Schulen", "Wohngebäude", "Krankenhäuser"), so their embeddings are
+kept in a small SQLite database keyed by (model, normalized text) instead of
+calling the embedding API for every query. Vectors are stored as float32
+blobs; a hit costs one indexed SQLite lookup.
+
+- Text normalization: Unicode NFC, whitespace collapsed, lower case
+- LRU eviction: each hit refreshes the entry's last-used time, the least
+  recently used entries are deleted beyond EMBEDDING_CACHE_MAX_ENTRIES
+- Warm-up: texts from EMBEDDING_CACHE_WARMUP are embedded in one batch
+  request at API startup (only those not cached yet)
+"""
+
+from typing import List, Optional, Sequence
+from pathlib import Path
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+from ..config import EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+from .llm_client import llm_client
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text)
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Cache key text: NFC-normalized, whitespace collapsed, lower case."""
+    return " ".join(unicodedata.normalize("NFC", text).split()).lower()
+
+
+class EmbeddingCache:
+    """SQLite-backed LRU cache of text embeddings."""
+
+    _instance: Optional["EmbeddingCache"] = None
+
+    def __new__(cls):
+        """Singleton pattern so all nodes share one database connection."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._path = EMBEDDING_CACHE_PATH
+            cls._instance._connection = None
+            cls._instance._lock = threading.Lock()
+            cls._instance.max_entries = EMBEDDING_CACHE_MAX_ENTRIES
+        return cls._instance
+
+    def open(self, path: str):
+        """Use the cache database at path (created if missing)."""
+        with self._lock:
+            self._close()
+            self._path = path
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _db(self) -> sqlite3.Connection:
+        """Database connection, opened on first use (lock held)."""
+        if self._connection is None:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT count(*) FROM embeddings").fetchone()[0]
+
+    def get(self, text: str, model: Optional[str] = None) -> Optional[List[float]]:
+        """
+        Cached embedding of a text.
+
+        Args:
+            text: Text (normalized for the lookup)
+            model: Model identifier (default: the current embedding provider)
+
+        Returns:
+            Embedding vector, or None if not cached
+        """
+        key = normalize_text(text)
+        model = model or llm_client.embedding_provider.name
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT vector FROM embeddings WHERE model = ? AND text = ?", (model, key)).fetchone()
+            if row is None:
+                return None
+            with db:
+                db.execute(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?", (time.time(), model, key)
+                )
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def put(self, texts: Sequence[str], embeddings: Sequence[Sequence[float]], model: Optional[str] = None):
+        """Store embeddings of texts and evict the least recently used entries beyond max_entries."""
+        model = model or llm_client.embedding_provider.name
+        now = time.time()
+        rows = [
+            (model, normalize_text(text), np.asarray(embedding, dtype=np.float32).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            db = self._db()
+            with db:
+                db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+                excess = db.execute("SELECT count(*) FROM embeddings").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    db.execute(
+                        "DELETE FROM embeddings WHERE rowid IN "
+                        "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                        (excess,),
+                    )
+
+    def embed(self, text: str) -> List[float]:
+        """
+        Embedding of a text with the configured model, from the cache if possible.
+
+        Falls back to the embedding API if the cache is disabled or the
+        database cannot be used.
+        """
+        if not EMBEDDING_CACHE_ENABLED:
+            return llm_client.create_embedding(text)
+
+        try:
+            cached = self.get(text)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Embedding cache lookup failed: {e}")
+            return llm_client.create_embedding(text)
+        if cached is not None:
+            return cached
+
+        embedding = llm_client.create_embedding(text)
+        try:
+            self.put([text], [embedding])
+        except (sqlite3.Error, OSError) as e:
+            print(f"Embedding cache write failed: {e}")
+        return embedding
+
+    def warm(self, texts: Sequence[str]) -> int:
+        """
+        Embed the texts that are not cached yet (one batch request).
+
+        Returns:
+            Number of newly embedded texts
+        """
+        # First text per cache key, embedded as written
+        missing = {}
+        for text in texts:
+            if text.strip() and normalize_text(text) not in missing and self.get(text) is None:
+                missing[normalize_text(text)] = text
+        missing = list(missing.values())
+        if missing:
+            self.put(missing, llm_client.create_embeddings(missing))
+        return len(missing)
+
+
+# Global instance for convenience
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,94 @@
+"""
+Embedding providers behind LLMClient.create_embedding.
+
+- "openai": OpenAI embedding API (OPENAI_EMBEDDING_MODEL), matching the
+  description_embedding_small/_large vectors of the Function nodes
+- "local": sentence-transformers model running in-process on the CPU
+  (LOCAL_EMBEDDING_MODEL), matching description_embedding_local written by
+  db/create_local_function_embeddings.py; no network access needed
+
+Each provider names the vector space ("small", "large" or "local") its query
+embeddings live in, so function search compares against the stored vectors
+of the same model.
+"""
+
+from abc import ABC, abstractmethod
+from typing import List, Sequence
+
+from ..config import EMBEDDING_PROVIDER, OPENAI_EMBEDDING_MODEL, LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_DEVICE
+
+
+class EmbeddingProvider(ABC):
+    """Creates embeddings for texts in one vector space."""
+
+    # Model identifier (e.g. part of the embedding cache key)
+    name: str = ""
+    # Stored Function vectors of the same space: description_embedding_<space>
+    space: str = ""
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embeddings of texts, in order."""
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embedding API."""
+
+    def __init__(self, client, model: str = OPENAI_EMBEDDING_MODEL):
+        self._client = client
+        self.name = model
+        self.space = "large" if "large" in model.lower() else "small"
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        response = self._client.embeddings.create(model=self.name, input=list(texts))
+        return [item.embedding for item in response.data]
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """sentence-transformers model on the local CPU (loaded on first use)."""
+
+    space = "local"
+
+    def __init__(self, model: str = LOCAL_EMBEDDING_MODEL, device: str = LOCAL_EMBEDDING_DEVICE):
+        self.name = f"local:{model}"
+        self._model_name = model
+        self._device = device
+        self._model = None
+
+    def _load(self):
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise ImportError(
+                    "EMBEDDING_PROVIDER=local requires sentence-transformers (pip install sentence-transformers)"
+                ) from e
+            self._model = SentenceTransformer(self._model_name, device=self._device)
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        """Length of the embedding vectors."""
+        return self._load().get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = self._load().encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(float).tolist()
+
+
+def create_embedding_provider(name: str = EMBEDDING_PROVIDER, openai_client=None) -> EmbeddingProvider:
+    """
+    Embedding provider by name.
+
+    Args:
+        name: "openai" or "local"
+        openai_client: OpenAI client for the "openai" provider
+
+    Raises:
+        ValueError: For unknown provider names
+    """
+    if name == "openai":
+        return OpenAIEmbeddingProvider(openai_client)
+    if name == "local":
+        return LocalEmbeddingProvider()
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER '{name}', expected 'openai' or 'local'")
@@ -0,0 +1,230 @@
+"""
+Process-wide cache of pre-parsed building footprints.
+
+Holds the footprint polygons of all Building nodes as a shapely geometry
+array with an id -> row index and an STRtree over all footprints, so the
+footprint-aware spatial modes (intersects, within, overlap fraction) run
+without parsing GeoJSON on every request.
+
+Like the centroid cache it is warmed from a single Neo4j scan (at API
+startup) and reloaded when the dataset version stamp changes. Buildings that
+are not cached fall back to batch-parsing their own `geometry_geojson`, which
+is fetched by id if the building was retrieved without it (projected results).
+
+attach_footprint_geojson adds the footprints to the final result buildings
+that a client displays.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import threading
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry.base import BaseGeometry
+
+from .geometry import parse_building_footprints
+from .neo4j_client import neo4j_client
+from .data_version import data_version_tracker
+
+
+class _FootprintState:
+    """Immutable snapshot of the cached footprints (swapped atomically)."""
+
+    def __init__(self, ids: np.ndarray, footprints: np.ndarray, version: Optional[int]):
+        self.ids = ids
+        self.footprints = footprints
+        self.rows: Dict[str, int] = {building_id: row for row, building_id in enumerate(ids)}
+        self.tree = STRtree(footprints)
+        self.version = version
+
+        bounds = shapely.bounds(footprints)
+        extents = np.maximum(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1])
+        self.max_extent = float(np.nanmax(extents)) if len(extents) else 0.0
+
+
+class FootprintCache:
+    """In-memory cache of building footprint polygons in EPSG:25833."""
+
+    _instance: Optional["FootprintCache"] = None
+
+    def __new__(cls):
+        """Singleton pattern so all nodes share one cache."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._state = None
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether the cache currently holds footprints."""
+        return self._state is not None
+
+    @property
+    def max_extent(self) -> Optional[float]:
+        """Largest footprint width/height in meters (None while cold)."""
+        state = self._state
+        return state.max_extent if state else None
+
+    def __len__(self) -> int:
+        state = self._state
+        return len(state.ids) if state else 0
+
+    def load(self, records: List[Dict[str, Any]], version: Optional[int] = None) -> int:
+        """
+        Replace the cache contents from id/geometry_geojson records.
+
+        Returns:
+            Number of footprints cached (records without a valid polygon are skipped)
+        """
+        footprints, valid = parse_building_footprints(records)
+        ids = np.array([record.get("id") for record in records], dtype=object)
+        keep = valid & np.array([building_id is not None for building_id in ids], dtype=bool)
+
+        self._state = _FootprintState(ids[keep], footprints[keep], version)
+        return len(self)
+
+    def warm(self) -> int:
+        """
+        Load and parse all building footprints from Neo4j in a single scan.
+
+        Returns:
+            Number of footprints cached
+        """
+        with self._lock:
+            version = data_version_tracker.current(force=True)
+            records = neo4j_client.get_building_footprints()
+            return self.load(records, version)
+
+    def invalidate(self):
+        """Drop all cached footprints."""
+        self._state = None
+
+    def ensure_current(self) -> bool:
+        """
+        Reload the cache if the dataset changed since it was warmed.
+
+        Returns:
+            True if the cache is warm after the check
+        """
+        state = self._state
+        if state is None:
+            return False
+
+        # The new snapshot is swapped in only once it is complete: during a
+        # reload (or after a failed one) requests keep using the previous one
+        if data_version_tracker.current() != state.version and not self._lock.locked():
+            try:
+                self.warm()
+            except Exception as e:
+                print(f"Footprint cache reload failed, keeping the previous snapshot: {e}")
+        return self.is_warm
+
+    def hit_ids(self, geometry: BaseGeometry, predicate: str) -> Optional[frozenset]:
+        """
+        Ids of all cached buildings whose footprint matches the filter geometry.
+
+        One STRtree query over all cached footprints; callers that test many
+        batches against the same geometry (streamed chunks) compute it once
+        and pass it to match().
+
+        Returns:
+            Set of building ids, or None while the cache is cold
+        """
+        state = self._state
+        if state is None:
+            return None
+        return frozenset(state.ids[state.tree.query(geometry, predicate=predicate)])
+
+    def match(
+        self,
+        buildings: List[Dict[str, Any]],
+        geometry: BaseGeometry,
+        predicate: str,
+        hit_ids: Optional[frozenset] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Test building footprints against a filter geometry.
+
+        Cached footprints are matched with one STRtree query over all cached
+        buildings (or looked up in precomputed hit_ids); footprints that are
+        not cached are parsed from the buildings' own `geometry_geojson`
+        (fetched by id if missing) and tested vectorized.
+
+        Args:
+            buildings: List of building dictionaries
+            geometry: Filter geometry
+            predicate: "intersects" or "contains", evaluated as
+                predicate(geometry, footprint)
+            hit_ids: Result of hit_ids(geometry, predicate), if already computed
+
+        Returns:
+            Tuple of (footprints, matches): footprint geometries (None if
+            unavailable) and a boolean mask of matching buildings
+        """
+        state = self._state
+        footprints = np.full(len(buildings), None, dtype=object)
+        rows = np.full(len(buildings), -1, dtype=np.intp)
+        matches = np.zeros(len(buildings), dtype=bool)
+
+        if state is not None:
+            rows[:] = [state.rows.get(building.get("id"), -1) for building in buildings]
+            cached = rows >= 0
+            if cached.any():
+                footprints[cached] = state.footprints[rows[cached]]
+                if hit_ids is None:
+                    hits = state.tree.query(geometry, predicate=predicate)
+                    matches[cached] = np.isin(rows[cached], hits)
+                else:
+                    matches[cached] = [state.ids[row] in hit_ids for row in rows[cached]]
+
+        missing = np.flatnonzero(rows < 0)
+        if len(missing):
+            parsed, valid = parse_building_footprints(_with_footprints([buildings[i] for i in missing]))
+            footprints[missing] = parsed
+            if valid.any():
+                shapely.prepare(geometry)
+                test = shapely.contains if predicate == "contains" else shapely.intersects
+                matches[missing[valid]] = test(geometry, parsed[valid])
+
+        return footprints, matches
+
+
+def _with_footprints(buildings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copies of buildings without `geometry_geojson` get it fetched by id (one query)."""
+    ids = [b.get("id") for b in buildings if not b.get("geometry_geojson") and b.get("id") is not None]
+    if not ids:
+        return buildings
+    
+    fetched = {
+        record["id"]: record["geometry_geojson"]
+        for record in neo4j_client.get_building_footprints(ids)
+    }
+    return [
+        {**b, "geometry_geojson": fetched[b.get("id")]}
+        if not b.get("geometry_geojson") and b.get("id") in fetched else b
+        for b in buildings
+    ]
+
+
+def attach_footprint_geojson(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Add `geometry_geojson` to the buildings of a results structure.
+    
+    Results are retrieved without footprints (see cypher_rewrite.project_buildings);
+    this fetches them in one query for the final buildings only.
+    
+    Args:
+        results: Results structure [{"buildings": [...], ...}]
+        
+    Returns:
+        New results structure (the input is not modified)
+    """
+    if not results or not isinstance(results[0], dict) or not results[0].get("buildings"):
+        return results
+    return [{**results[0], "buildings": _with_footprints(results[0]["buildings"])}] + list(results[1:])
+
+
+# Global instance for convenience
+footprint_cache = FootprintCache()
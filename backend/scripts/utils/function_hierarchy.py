@@ -0,0 +1,135 @@
+"""
+Process-wide transitive closure of the building function hierarchy.
+
+The ALKIS function codes encode their hierarchy: the parent of a code is
+the code with its last non-zero digit cleared (1021 -> 1020 -> 1000,
+2111 -> 2110 -> 2100 -> 2000), the same rule the import script uses for
+(:Function)-[:HAS_SUBFUNCTION]->(:Function). Missing intermediate codes are
+skipped, so every code hangs below its nearest existing ancestor.
+
+At load time, every function code is mapped to the set of all its
+descendants. Matched parent functions ("Wohngebäude", "Gebäude für
+öffentliche Zwecke") then expand to their full code lists in one dict
+lookup, without traversing HAS_SUBFUNCTION per query and without the LLM
+listing child codes. The closure is built from
+neo4j_client.get_building_functions() on first use and rebuilt when the
+dataset version stamp changes.
+"""
+
+from typing import Dict, FrozenSet, Iterable, List, Optional
+import threading
+
+from .neo4j_client import neo4j_client
+from .data_version import data_version_tracker
+
+
+def parent_code(code: int) -> Optional[int]:
+    """Parent code by the ALKIS digit rule (1021 -> 1020, 1000 -> None)."""
+    factor = 1
+    while factor <= code:
+        digit = (code // factor) % 10
+        if digit:
+            parent = code - digit * factor
+            return parent or None
+        factor *= 10
+    return None
+
+
+class FunctionHierarchy:
+    """Parent -> all-descendants sets of the building function codes."""
+
+    _instance: Optional["FunctionHierarchy"] = None
+
+    def __new__(cls):
+        """Singleton pattern so all nodes share one closure."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._descendants = None
+            cls._instance._version = None
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether function codes are loaded."""
+        return bool(self._descendants)
+
+    def __len__(self) -> int:
+        return len(self._descendants or {})
+
+    def load(self, codes: Iterable[int], version: Optional[int] = None) -> int:
+        """
+        Replace the closure.
+
+        Args:
+            codes: All function codes
+            version: Dataset version the codes belong to
+
+        Returns:
+            Number of function codes
+        """
+        known = {int(code) for code in codes if code is not None}
+        descendants: Dict[int, set] = {code: set() for code in known}
+        for code in known:
+            ancestor = parent_code(code)
+            while ancestor is not None:
+                if ancestor in known:
+                    descendants[ancestor].add(code)
+                ancestor = parent_code(ancestor)
+        self._descendants = {code: frozenset(children) for code, children in descendants.items()}
+        self._version = version
+        return len(self)
+
+    def warm(self) -> int:
+        """
+        Build the closure from all functions in Neo4j.
+
+        Returns:
+            Number of function codes
+        """
+        with self._lock:
+            version = data_version_tracker.current(force=True)
+            return self.load([f.get("code") for f in neo4j_client.get_building_functions()], version)
+
+    def invalidate(self):
+        """Drop the loaded closure."""
+        self._descendants = None
+
+    def ensure_current(self) -> bool:
+        """
+        Build the closure on first use and rebuild it if the dataset changed.
+
+        Returns:
+            True if function codes are loaded after the check
+        """
+        # A loaded closure stays in use while another request rebuilds it, and is
+        # only replaced once the new one is complete (kept if the rebuild fails)
+        reloading = self._descendants is not None and self._lock.locked()
+        if (self._descendants is None or data_version_tracker.current() != self._version) and not reloading:
+            try:
+                self.warm()
+            except Exception as e:
+                print(f"Function hierarchy load failed: {e}")
+        return self.is_warm
+
+    def descendants(self, code: int) -> FrozenSet[int]:
+        """All codes below a function code (empty for leaves and unknown codes)."""
+        return (self._descendants or {}).get(code, frozenset())
+
+    def expand(self, codes: Iterable[int]) -> List[int]:
+        """
+        Function codes together with all their descendants.
+
+        Returns:
+            Sorted list of distinct codes (stable, so equal selections give
+            equal query parameters)
+        """
+        expanded = set()
+        for code in codes:
+            expanded.add(code)
+            expanded |= self.descendants(code)
+        return sorted(expanded)
+
+
+# Global instance for convenience
+function_hierarchy = FunctionHierarchy()
@@ -0,0 +1,200 @@
+"""
+Process-wide in-memory vector index over the building function embeddings.
+
+There are only a few hundred (:Function) nodes, so their
+description_embedding_small/_large/_local vectors fit in small float32
+matrices (one per vector space). The rows are L2-normalized once at load
+time; scoring a query is a single matrix-vector product over all functions,
+and the selection policy (relative_top1 / threshold / top_k) is applied to
+the score vector in NumPy. No database round trip is needed per search.
+
+Scores use the same scale as Neo4j's cosine vector index,
+(1 + cosine) / 2, so the thresholds of the embedding_search node keep their
+meaning. The index is warmed from a single Neo4j scan (at API startup or on
+first use) and reloaded when the dataset version stamp changes.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import threading
+
+import numpy as np
+
+from .neo4j_client import neo4j_client
+from .data_version import data_version_tracker
+
+# Embedding properties per vector space (see embedding_providers)
+EMBEDDING_PROPERTIES = {"small": "embedding_small", "large": "embedding_large", "local": "embedding_local"}
+
+
+def select_scores(
+    scores: np.ndarray,
+    method: str = "relative_top1",
+    top_k: int = 5,
+    score_threshold: float = 0.6,
+    relative_delta: float = 0.05
+) -> np.ndarray:
+    """
+    Positions of the selected scores, best first.
+
+    Args:
+        scores: Similarity scores
+        method: "relative_top1" (within relative_delta of the best score),
+            "threshold" (at least score_threshold) or "top_k" (best top_k);
+            other values select the best 5
+        top_k / score_threshold / relative_delta: Parameters of the methods
+
+    Returns:
+        Integer array of positions into scores, sorted by descending score
+    """
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if method == "relative_top1":
+        selected = np.flatnonzero(scores >= max(0.0, float(scores.max()) - relative_delta))
+    elif method == "threshold":
+        selected = np.flatnonzero(scores >= score_threshold)
+    else:
+        k = min(top_k if method == "top_k" else 5, len(scores))
+        selected = np.argpartition(-scores, k - 1)[:k] if k > 0 else np.empty(0, dtype=np.intp)
+    # Stable, so equal scores keep the function (code) order
+    return selected[np.argsort(-scores[selected], kind="stable")]
+
+
+class _IndexState:
+    """Immutable snapshot of the function metadata and normalized embedding matrices."""
+
+    def __init__(self, functions: List[Dict[str, Any]], version: Optional[int]):
+        self.functions = [
+            {"code": f.get("code"), "name": f.get("name"), "description": f.get("description")}
+            for f in functions
+        ]
+        self.version = version
+        # vector space -> (function positions, (n, dim) float32 matrix of unit rows)
+        self.matrices: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for space, key in EMBEDDING_PROPERTIES.items():
+            rows = [i for i, f in enumerate(functions) if f.get(key)]
+            if not rows:
+                continue
+            matrix = np.asarray([functions[i][key] for i in rows], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1)
+            valid = norms > 0
+            self.matrices[space] = (
+                np.asarray(rows, dtype=np.intp)[valid],
+                np.ascontiguousarray(matrix[valid] / norms[valid, None]),
+            )
+
+
+class FunctionIndex:
+    """In-memory cosine similarity search over the building function embeddings."""
+
+    _instance: Optional["FunctionIndex"] = None
+
+    def __new__(cls):
+        """Singleton pattern so all nodes share one index."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._state = None
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether function embeddings are loaded."""
+        state = self._state
+        return state is not None and bool(state.matrices)
+
+    def __len__(self) -> int:
+        state = self._state
+        return len(state.functions) if state else 0
+
+    def load(self, functions: List[Dict[str, Any]], version: Optional[int] = None) -> int:
+        """
+        Replace the index contents.
+
+        Args:
+            functions: Dicts with 'code', 'name', 'description' and the
+                'embedding_small' / 'embedding_large' / 'embedding_local'
+                vectors (may be missing)
+            version: Dataset version the functions belong to
+
+        Returns:
+            Number of functions
+        """
+        self._state = _IndexState(functions, version)
+        return len(self)
+
+    def warm(self) -> int:
+        """
+        Load all functions with their embeddings from Neo4j in a single scan.
+
+        Returns:
+            Number of functions
+        """
+        with self._lock:
+            version = data_version_tracker.current(force=True)
+            return self.load(neo4j_client.get_function_embeddings(), version)
+
+    def invalidate(self):
+        """Drop the loaded index."""
+        self._state = None
+
+    def ensure_current(self) -> bool:
+        """
+        Load the index on first use and reload it if the dataset changed.
+
+        Returns:
+            True if embeddings are loaded after the check
+        """
+        state = self._state
+        # A loaded index stays in use while another request reloads it, and is
+        # only replaced once the new one is complete (kept if the reload fails)
+        reloading = state is not None and self._lock.locked()
+        if (state is None or data_version_tracker.current() != state.version) and not reloading:
+            try:
+                self.warm()
+            except Exception as e:
+                print(f"Function index load failed: {e}")
+        return self.is_warm
+
+    def search(
+        self,
+        embedding: List[float],
+        space: str = "small",
+        **policy
+    ) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """
+        Score all functions against a query embedding and apply the selection policy.
+
+        Args:
+            embedding: Query embedding vector
+            space: Vector space of the query embedding ("small", "large" or
+                "local"; searched against description_embedding_<space>)
+            **policy: method, top_k, score_threshold, relative_delta (see select_scores)
+
+        Returns:
+            Tuple of (selected functions with 'code', 'name', 'description'
+            and 'score', best first; best score), or None if no embeddings of
+            the space (or of the query's dimension) are loaded
+        """
+        state = self._state
+        if state is None or space not in state.matrices:
+            return None
+
+        positions, matrix = state.matrices[space]
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if query.shape != (matrix.shape[1],) or norm == 0:
+            return None
+
+        # Same scale as Neo4j's cosine vector index
+        scores = (1.0 + matrix @ (query / norm)) / 2.0
+        selected = select_scores(scores, **policy)
+        functions = [
+            {**state.functions[positions[i]], "score": float(scores[i])}
+            for i in selected
+        ]
+        return functions, float(scores.max())
+
+
+# Global instance for convenience
+function_index = FunctionIndex()
@@ -0,0 +1,175 @@
+"""
+Vectorized geometry helpers for batches of buildings.
+
+Parses building geometries for a whole result set at once with shapely 2.x
+array functions. Unparseable geometries do not raise; they are reported via
+a boolean validity mask so callers can skip them in bulk.
+"""
+
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import Point
+from shapely.geometry.base import BaseGeometry
+
+# shapely type ids (see shapely.GeometryType)
+_POINT = shapely.GeometryType.POINT
+_AREAL = (
+    shapely.GeometryType.POLYGON,
+    shapely.GeometryType.MULTIPOLYGON,
+    shapely.GeometryType.GEOMETRYCOLLECTION,
+)
+
+
+def _string_array(values: List[Any]) -> np.ndarray:
+    """Object array of non-empty strings; everything else becomes None."""
+    array = np.empty(len(values), dtype=object)
+    array[:] = [value if isinstance(value, str) and value.strip() else None for value in values]
+    return array
+
+
+def _to_points(geometries: np.ndarray) -> np.ndarray:
+    """Reduce geometries to points: keep points, use centroids of areal types, drop the rest."""
+    type_ids = shapely.get_type_id(geometries)
+    points = np.full(len(geometries), None, dtype=object)
+
+    is_point = type_ids == _POINT
+    points[is_point] = geometries[is_point]
+
+    is_areal = np.isin(type_ids, _AREAL)
+    if is_areal.any():
+        points[is_areal] = shapely.centroid(geometries[is_areal])
+
+    return points
+
+
+def parse_building_points(buildings: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse centroid points for a batch of buildings.
+
+    Uses the WKT ``centroid`` field first. Buildings without a usable centroid
+    fall back to ``geometry_geojson`` (GeoJSON or WKT), using the centroid of
+    polygonal geometries.
+
+    Args:
+        buildings: List of building dictionaries
+
+    Returns:
+        Tuple of (points, valid) where points is an object array of shapely
+        Points (None where parsing failed) and valid is a boolean mask
+    """
+    points = np.full(len(buildings), None, dtype=object)
+    if not buildings:
+        return points, np.zeros(0, dtype=bool)
+
+    centroids = _string_array([building.get("centroid") for building in buildings])
+    parsed = shapely.from_wkt(centroids, on_invalid="ignore")
+    is_point = shapely.get_type_id(parsed) == _POINT
+    points[is_point] = parsed[is_point]
+
+    missing = np.flatnonzero(~is_point)
+    if len(missing):
+        raw = _string_array([buildings[i].get("geometry_geojson") for i in missing])
+        is_json = np.array([value is not None and value.lstrip().startswith("{") for value in raw], dtype=bool)
+
+        fallback = np.full(len(missing), None, dtype=object)
+        if is_json.any():
+            fallback[is_json] = shapely.from_geojson(raw[is_json], on_invalid="ignore")
+        if (~is_json).any():
+            fallback[~is_json] = shapely.from_wkt(raw[~is_json], on_invalid="ignore")
+
+        points[missing] = _to_points(fallback)
+
+    valid = ~(shapely.is_missing(points) | shapely.is_empty(points))
+    points[~valid] = None
+    return points, valid
+
+
+def parse_building_footprints(buildings: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse footprint polygons for a batch of buildings from ``geometry_geojson``.
+
+    Accepts GeoJSON or WKT. Only polygonal geometries with a positive area
+    count as valid footprints.
+
+    Args:
+        buildings: List of building dictionaries
+
+    Returns:
+        Tuple of (footprints, valid) where footprints is an object array of
+        shapely geometries (None where parsing failed) and valid is a boolean mask
+    """
+    footprints = np.full(len(buildings), None, dtype=object)
+    if not buildings:
+        return footprints, np.zeros(0, dtype=bool)
+
+    raw = _string_array([building.get("geometry_geojson") for building in buildings])
+    is_json = np.array([value is not None and value.lstrip().startswith("{") for value in raw], dtype=bool)
+    if is_json.any():
+        footprints[is_json] = shapely.from_geojson(raw[is_json], on_invalid="ignore")
+    if (~is_json).any():
+        footprints[~is_json] = shapely.from_wkt(raw[~is_json], on_invalid="ignore")
+
+    is_polygonal = np.isin(
+        shapely.get_type_id(footprints),
+        (shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON),
+    )
+    valid = is_polygonal & (shapely.area(footprints) > 0)
+    footprints[~valid] = None
+    return footprints, valid
+
+
+def points_xy(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extract float64 coordinate arrays from an array of points.
+
+    Missing points yield NaN coordinates.
+    """
+    return shapely.get_x(points), shapely.get_y(points)
+
+
+def contains_mask(geometry: BaseGeometry, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Vectorized containment test of coordinates in a (multi)polygon.
+
+    Equivalent to ``geometry.contains(Point(x, y))`` for every coordinate
+    pair; NaN coordinates never match. The geometry is prepared in place so
+    repeated tests against complex polygons use its spatial index.
+    """
+    shapely.prepare(geometry)
+    return shapely.contains_xy(geometry, x, y)
+
+
+def bbox_mask(geometry: BaseGeometry, xy: np.ndarray) -> np.ndarray:
+    """Vectorized test of coordinates against the envelope of a geometry (NaN never matches)."""
+    min_x, min_y, max_x, max_y = geometry.bounds
+    x, y = xy[:, 0], xy[:, 1]
+    return (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+
+
+def points_in_polygon(geometry: BaseGeometry, xy: np.ndarray) -> np.ndarray:
+    """
+    Containment mask of coordinates in a (multi)polygon.
+
+    Coordinates outside the envelope are rejected with a cheap bounding-box
+    test first; only the remaining candidates are tested exactly against the
+    prepared geometry.
+
+    Args:
+        geometry: Shapely Polygon or MultiPolygon
+        xy: Float array of shape (n, 2)
+
+    Returns:
+        Boolean mask of contained coordinates
+    """
+    mask = np.zeros(len(xy), dtype=bool)
+    candidates = np.flatnonzero(bbox_mask(geometry, xy))
+    if len(candidates):
+        mask[candidates] = contains_mask(geometry, xy[candidates, 0], xy[candidates, 1])
+    return mask
+
+
+def distances_to(points: np.ndarray, point: Point) -> np.ndarray:
+    """Vectorized distances from an array of points to a reference point (NaN for missing)."""
+    return shapely.distance(points, point)
@@ -0,0 +1,237 @@
+"""
+Uniform grid cell index over building centroids with per-cell aggregates.
+
+Buckets all centroids (EPSG:25833, meters) into square cells of a fixed size.
+Each cell stores the positions of its buildings plus precomputed aggregates
+(count, area sum/sum of squares/min/max, floors sum/sum of squares/min/max
+and a floors histogram).
+
+Radius and polygon queries classify the occupied cells first: cells that are
+fully covered by the query geometry are taken whole, only the buildings in
+boundary cells are tested point by point. Aggregate queries combine the
+precomputed cell aggregates of covered cells with the values of the matching
+boundary buildings, so counts and summary statistics for a region never touch
+the individual buildings of its interior.
+"""
+
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+# Floors above ground are histogrammed in bins 0..MAX_FLOORS_BIN (last bin: and more)
+MAX_FLOORS_BIN = 64
+
+
+def _reduce(ufunc: np.ufunc, values: np.ndarray, starts: np.ndarray, empty: float) -> np.ndarray:
+    """Segmented reduction over sorted values; `empty` replaces NaN before reducing."""
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.float64)
+    return ufunc.reduceat(np.where(np.isnan(values), empty, values), starts)
+
+
+class GridIndex:
+    """Square grid over centroid coordinates with per-cell aggregates."""
+
+    def __init__(
+        self,
+        xy: np.ndarray,
+        cell_size: float,
+        area: Optional[np.ndarray] = None,
+        floors: Optional[np.ndarray] = None
+    ):
+        """
+        Build the grid.
+
+        Args:
+            xy: Float array of shape (n, 2); rows with NaN coordinates are skipped
+            cell_size: Cell edge length in meters
+            area: Optional float array of building areas (NaN if unknown)
+            floors: Optional float array of floors above ground (NaN if unknown)
+        """
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+
+        n = len(xy)
+        self.cell_size = float(cell_size)
+        self._xy = np.ascontiguousarray(xy, dtype=np.float64)
+        self._area = np.full(n, np.nan) if area is None else np.asarray(area, dtype=np.float64)
+        self._floors = np.full(n, np.nan) if floors is None else np.asarray(floors, dtype=np.float64)
+
+        positions = np.flatnonzero(~np.isnan(self._xy).any(axis=1))
+        cols = np.floor(self._xy[positions, 0] / self.cell_size).astype(np.int64)
+        rows = np.floor(self._xy[positions, 1] / self.cell_size).astype(np.int64)
+
+        self._col0 = int(cols.min()) if len(cols) else 0
+        self._row0 = int(rows.min()) if len(rows) else 0
+        self._width = int(cols.max()) - self._col0 + 1 if len(cols) else 1
+        keys = (rows - self._row0) * self._width + (cols - self._col0)
+
+        order = np.argsort(keys, kind="stable")
+        self._positions = positions[order]
+        cell_keys, self._starts, self._counts = np.unique(keys[order], return_index=True, return_counts=True)
+        self._cell_col = cell_keys % self._width + self._col0
+        self._cell_row = cell_keys // self._width + self._row0
+
+        self._build_aggregates()
+
+    def _build_aggregates(self):
+        """Precompute per-cell aggregates with segmented reductions."""
+        area = self._area[self._positions]
+        floors = self._floors[self._positions]
+        starts = self._starts
+
+        self._area_count = np.add.reduceat(~np.isnan(area), starts) if len(area) else np.zeros(0, dtype=np.int64)
+        self._area_sum = _reduce(np.add, area, starts, 0.0)
+        self._area_sumsq = _reduce(np.add, area * area, starts, 0.0)
+        self._area_min = _reduce(np.minimum, area, starts, np.inf)
+        self._area_max = _reduce(np.maximum, area, starts, -np.inf)
+
+        self._floors_count = np.add.reduceat(~np.isnan(floors), starts) if len(floors) else np.zeros(0, dtype=np.int64)
+        self._floors_sum = _reduce(np.add, floors, starts, 0.0)
+        self._floors_sumsq = _reduce(np.add, floors * floors, starts, 0.0)
+        self._floors_min = _reduce(np.minimum, floors, starts, np.inf)
+        self._floors_max = _reduce(np.maximum, floors, starts, -np.inf)
+
+        # Histogram per cell, flattened to one bincount over (cell, bin)
+        cell_of_row = np.repeat(np.arange(len(starts)), self._counts)
+        has_floors = ~np.isnan(floors)
+        bins = np.clip(floors[has_floors], 0, MAX_FLOORS_BIN).astype(np.int64)
+        flat = cell_of_row[has_floors] * (MAX_FLOORS_BIN + 1) + bins
+        self._floors_histogram = np.bincount(
+            flat, minlength=len(starts) * (MAX_FLOORS_BIN + 1)
+        ).reshape(len(starts), MAX_FLOORS_BIN + 1)
+
+    def __len__(self) -> int:
+        """Number of indexed buildings (rows with valid coordinates)."""
+        return len(self._positions)
+
+    @property
+    def cell_count(self) -> int:
+        """Number of occupied cells."""
+        return len(self._starts)
+
+    def _cell_bounds(self, cells: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Bounds (min_x, min_y, max_x, max_y) of the given occupied cells."""
+        min_x = self._cell_col[cells] * self.cell_size
+        min_y = self._cell_row[cells] * self.cell_size
+        return min_x, min_y, min_x + self.cell_size, min_y + self.cell_size
+
+    def _cells_in_bounds(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        """Occupied cells that overlap a bounding box."""
+        col_lo, col_hi = np.floor(min_x / self.cell_size), np.floor(max_x / self.cell_size)
+        row_lo, row_hi = np.floor(min_y / self.cell_size), np.floor(max_y / self.cell_size)
+        return np.flatnonzero(
+            (self._cell_col >= col_lo) & (self._cell_col <= col_hi)
+            & (self._cell_row >= row_lo) & (self._cell_row <= row_hi)
+        )
+
+    def _members(self, cells: np.ndarray) -> np.ndarray:
+        """Positions of all buildings in the given cells (vectorized range gather)."""
+        lengths = self._counts[cells]
+        if lengths.sum() == 0:
+            return np.empty(0, dtype=np.intp)
+        offsets = np.repeat(self._starts[cells] - (np.cumsum(lengths) - lengths), lengths)
+        return self._positions[offsets + np.arange(lengths.sum())]
+
+    def _cover_radius(self, center: Tuple[float, float], radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Split a radius query into fully covered cells and matching boundary positions."""
+        cx, cy = center
+        cells = self._cells_in_bounds(cx - radius, cy - radius, cx + radius, cy + radius)
+        min_x, min_y, max_x, max_y = self._cell_bounds(cells)
+
+        far_x = np.maximum(np.abs(min_x - cx), np.abs(max_x - cx))
+        far_y = np.maximum(np.abs(min_y - cy), np.abs(max_y - cy))
+        near_x = np.maximum.reduce([min_x - cx, np.zeros_like(min_x), cx - max_x])
+        near_y = np.maximum.reduce([min_y - cy, np.zeros_like(min_y), cy - max_y])
+        squared = radius * radius
+
+        full = far_x * far_x + far_y * far_y <= squared
+        boundary = ~full & (near_x * near_x + near_y * near_y <= squared)
+
+        candidates = self._members(cells[boundary])
+        dx = self._xy[candidates, 0] - cx
+        dy = self._xy[candidates, 1] - cy
+        return cells[full], candidates[dx * dx + dy * dy <= squared]
+
+    def _cover_polygon(self, geometry: BaseGeometry) -> Tuple[np.ndarray, np.ndarray]:
+        """Split a polygon query into fully covered cells and matching boundary positions."""
+        cells = self._cells_in_bounds(*geometry.bounds)
+        boxes = shapely.box(*self._cell_bounds(cells))
+
+        shapely.prepare(geometry)
+        # contains_properly: cells touching the polygon boundary are tested point by
+        # point, matching contains_xy (points on the boundary are not contained)
+        full = shapely.contains_properly(geometry, boxes)
+        boundary = ~full & shapely.intersects(geometry, boxes)
+
+        candidates = self._members(cells[boundary])
+        inside = shapely.contains_xy(geometry, self._xy[candidates, 0], self._xy[candidates, 1])
+        return cells[full], candidates[inside]
+
+    def query_radius(self, center: Tuple[float, float], radius: float) -> np.ndarray:
+        """
+        Positions of all buildings within radius (inclusive) of a center.
+
+        Returns:
+            Sorted integer array of positions
+        """
+        full, boundary = self._cover_radius(center, float(radius))
+        return np.sort(np.concatenate((self._members(full), boundary)))
+
+    def query_polygon(self, geometry: BaseGeometry) -> np.ndarray:
+        """
+        Positions of all buildings whose centroid lies inside a (multi)polygon.
+
+        Returns:
+            Sorted integer array of positions
+        """
+        full, boundary = self._cover_polygon(geometry)
+        return np.sort(np.concatenate((self._members(full), boundary)))
+
+    def aggregate_radius(self, center: Tuple[float, float], radius: float) -> Dict[str, Any]:
+        """Aggregates (see _aggregate) of all buildings within radius of a center."""
+        return self._aggregate(*self._cover_radius(center, float(radius)))
+
+    def aggregate_polygon(self, geometry: BaseGeometry) -> Dict[str, Any]:
+        """Aggregates (see _aggregate) of all buildings inside a (multi)polygon."""
+        return self._aggregate(*self._cover_polygon(geometry))
+
+    def _aggregate(self, cells: np.ndarray, boundary: np.ndarray) -> Dict[str, Any]:
+        """
+        Combine the aggregates of covered cells with the values of boundary buildings.
+
+        Returns:
+            Dict with building_count, area_count/sum/sumsq/min/max,
+            floors_count/sum/sumsq/min/max and floors_histogram ({floors: count})
+        """
+        area = self._area[boundary]
+        floors = self._floors[boundary]
+        area_valid = area[~np.isnan(area)]
+        floors_valid = floors[~np.isnan(floors)]
+
+        histogram = self._floors_histogram[cells].sum(axis=0)
+        histogram += np.bincount(
+            np.clip(floors_valid, 0, MAX_FLOORS_BIN).astype(np.int64), minlength=MAX_FLOORS_BIN + 1
+        )
+
+        area_min = min(self._area_min[cells].min(initial=np.inf), area_valid.min(initial=np.inf))
+        area_max = max(self._area_max[cells].max(initial=-np.inf), area_valid.max(initial=-np.inf))
+        floors_min = min(self._floors_min[cells].min(initial=np.inf), floors_valid.min(initial=np.inf))
+        floors_max = max(self._floors_max[cells].max(initial=-np.inf), floors_valid.max(initial=-np.inf))
+
+        return {
+            "building_count": int(self._counts[cells].sum() + len(boundary)),
+            "area_count": int(self._area_count[cells].sum() + len(area_valid)),
+            "area_sum": float(self._area_sum[cells].sum() + area_valid.sum()),
+            "area_sumsq": float(self._area_sumsq[cells].sum() + (area_valid * area_valid).sum()),
+            "area_min": float(area_min) if np.isfinite(area_min) else None,
+            "area_max": float(area_max) if np.isfinite(area_max) else None,
+            "floors_count": int(self._floors_count[cells].sum() + len(floors_valid)),
+            "floors_sum": float(self._floors_sum[cells].sum() + floors_valid.sum()),
+            "floors_sumsq": float(self._floors_sumsq[cells].sum() + (floors_valid * floors_valid).sum()),
+            "floors_min": float(floors_min) if np.isfinite(floors_min) else None,
+            "floors_max": float(floors_max) if np.isfinite(floors_max) else None,
+            "floors_histogram": {int(b): int(c) for b, c in enumerate(histogram) if c},
+        }
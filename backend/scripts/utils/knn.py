@@ -0,0 +1,117 @@
+"""
+Exact k-nearest-neighbour search over coordinate arrays.
+
+Works directly on float64 (n, 2) coordinate arrays (e.g. from the centroid
+cache) and selects the k winners with numpy.argpartition in O(n) instead of
+sorting all candidates. Only the winners are sorted. Ties are broken by
+position so results are deterministic.
+
+Rows with NaN coordinates (missing geometry) are never returned.
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+def _squared_distances(xy: np.ndarray, origin: Tuple[float, float]) -> np.ndarray:
+    """Squared distances to the origin; invalid rows become +inf."""
+    dx = xy[:, 0] - origin[0]
+    dy = xy[:, 1] - origin[1]
+    squared = dx * dx + dy * dy
+    squared[np.isnan(squared)] = np.inf
+    return squared
+
+
+def k_nearest(xy: np.ndarray, origin: Tuple[float, float], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k rows nearest to an origin.
+
+    Args:
+        xy: Float array of shape (n, 2) with x/y coordinates
+        origin: Reference (x, y) coordinate
+        k: Number of neighbours
+
+    Returns:
+        Tuple of (positions, distances) of at most k rows, sorted by
+        ascending distance (ties by position)
+    """
+    squared = _squared_distances(xy, origin)
+    valid_count = int(np.count_nonzero(np.isfinite(squared)))
+    k = min(int(k), valid_count)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+
+    if k < valid_count:
+        # Partition to find the k-th distance, then keep everything up to it
+        # so that ties at the boundary are resolved by position below
+        kth = squared[np.argpartition(squared, k - 1)[k - 1]]
+        candidates = np.flatnonzero(squared <= kth)
+    else:
+        candidates = np.flatnonzero(np.isfinite(squared))
+
+    order = np.lexsort((candidates, squared[candidates]))[:k]
+    positions = candidates[order]
+    return positions, np.sqrt(squared[positions])
+
+
+def k_nearest_per_group(
+    xy: np.ndarray,
+    groups: Sequence,
+    origin: Tuple[float, float],
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k rows nearest to an origin within every group, in one pass.
+
+    Rows are bucketed by group with one stable integer argsort; within every
+    group larger than k, argpartition finds the k-th distance. Only these
+    survivors (at most k per group plus ties at the boundary) are sorted.
+
+    Args:
+        xy: Float array of shape (n, 2) with x/y coordinates
+        groups: Group key per row (e.g. building function code); None is a group too
+        origin: Reference (x, y) coordinate
+        k: Number of neighbours per group
+
+    Returns:
+        Tuple of (positions, distances) over all groups, sorted by ascending
+        distance (ties by position)
+    """
+    squared = _squared_distances(xy, origin)
+    valid = np.flatnonzero(np.isfinite(squared))
+    if k <= 0 or len(valid) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+
+    keys = np.array([str(groups[i]) for i in valid], dtype=object)
+    _, group_ids = np.unique(keys, return_inverse=True)
+    group_ids = group_ids.ravel()
+
+    # Rows of each group are contiguous in by_group (kept in position order)
+    by_group = np.argsort(group_ids, kind="stable")
+    bounds = np.flatnonzero(np.r_[True, np.diff(group_ids[by_group]) != 0, True])
+
+    survivors = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        members = valid[by_group[start:end]]
+        if len(members) > k:
+            # Keep everything up to the k-th distance so ties are resolved by position below
+            distances = squared[members]
+            kth = distances[np.argpartition(distances, k - 1)[k - 1]]
+            members = members[distances <= kth]
+        survivors.append(members)
+    survivors = np.concatenate(survivors)
+    survivor_groups = group_ids[np.searchsorted(valid, survivors)]
+
+    order = np.lexsort((survivors, squared[survivors], survivor_groups))
+    sorted_groups = survivor_groups[order]
+
+    # Rank within group = offset from the first row of that group in sorted order
+    group_start = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    starts = np.repeat(group_start, np.diff(np.r_[group_start, len(sorted_groups)]))
+    ranks = np.arange(len(sorted_groups)) - starts
+
+    winners = survivors[order[ranks < k]]
+    final = np.lexsort((winners, squared[winners]))
+    positions = winners[final]
+    return positions, np.sqrt(squared[positions])
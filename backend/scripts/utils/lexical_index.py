@@ -0,0 +1,287 @@
+"""
+Process-wide lexical index over the building function names and descriptions.
+
+Most building function queries are plain German nouns that literally name a
+function ("Krankenhäuser", "Schulen", "Hotels"). Those are resolved from a
+precomputed token index without calling the embedding API:
+
+- Normalization: lower case, umlauts folded to the base vowel (ä -> a,
+  ß -> ss), split on non-alphanumerics, stopwords removed
+- Stemming: light German suffix stripping (em/er/nd, then t/e/s/n), so
+  singular and plural forms share a stem ("Krankenhäuser" / "Krankenhaus")
+- Compounds: stems are split into known head and modifier stems
+  ("wohngebaud" -> "gebaud", "wohn") so parts of compounds are searchable
+- BM25 over name (weighted) and description tokens ranks partial matches
+
+match() only returns confident hits (the query is a complete name or name
+alternative, or every query stem is a whole word of few function names);
+search() ranks all functions with BM25 and serves as the text fallback when
+vector search is unavailable. The index is built from
+neo4j_client.get_building_functions() on first use and rebuilt when the
+dataset version stamp changes.
+"""
+
+from typing import Dict, Any, List, Optional, Set
+from collections import Counter
+import math
+import re
+import threading
+
+from ..config import LEXICAL_MAX_HITS
+from .neo4j_client import neo4j_client
+from .data_version import data_version_tracker
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_FOLD = str.maketrans({"ä": "a", "ö": "o", "ü": "u", "ß": "ss"})
+
+# Folded, unstemmed
+STOPWORDS = {
+    "der", "die", "das", "den", "dem", "des", "ein", "eine", "einer", "eines", "einem", "einen",
+    "und", "oder", "mit", "ohne", "fur", "von", "vom", "zum", "zur", "zu", "im", "in", "am", "an",
+    "auf", "aus", "bei", "als", "ist", "sind", "wird", "werden", "dient", "alle", "sonstige", "sonstiges",
+}
+
+# Minimum length of compound parts
+MIN_PART = 4
+# Name tokens count like this many description tokens
+NAME_WEIGHT = 3
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def stem(word: str) -> str:
+    """Light German stem of a folded lower-case word."""
+    while len(word) > 3:
+        if len(word) > 5 and word[-2:] in ("em", "er", "nd"):
+            word = word[:-2]
+        elif word[-1] in "tesn":
+            word = word[:-1]
+        else:
+            break
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Stems of the words of a text, without stopwords."""
+    words = _TOKEN.findall((text or "").lower().translate(_FOLD))
+    return [stem(w) for w in words if w not in STOPWORDS]
+
+
+def split_compound(token: str, vocabulary: Set[str]) -> List[str]:
+    """
+    Parts of a compound stem, longest known head first.
+
+    Args:
+        token: Stem to split
+        vocabulary: Known whole-word stems
+
+    Returns:
+        Head and modifier stems (modifiers split recursively), or an empty
+        list if the token does not end in a known stem
+    """
+    for i in range(MIN_PART, len(token) - MIN_PART + 1):
+        head = token[i:]
+        if head not in vocabulary:
+            continue
+        modifier = stem(token[:i])
+        return [head] + (split_compound(modifier, vocabulary) or [modifier])
+    return []
+
+
+class _IndexState:
+    """Immutable snapshot of the token statistics of all functions."""
+
+    def __init__(self, functions: List[Dict[str, Any]], version: Optional[int]):
+        self.functions = [
+            {"code": f.get("code"), "name": f.get("name") or "", "description": f.get("description") or ""}
+            for f in functions
+        ]
+        self.version = version
+
+        names = [tokenize(f["name"]) for f in self.functions]
+        descriptions = [tokenize(f["description"]) for f in self.functions]
+        self.vocabulary = {t for tokens in names + descriptions for t in tokens if len(t) >= MIN_PART}
+
+        # Whole-word name stems per function
+        self.name_tokens = [set(tokens) for tokens in names]
+        # Sorted stems of each name and comma-separated name alternative -> function positions
+        self.aliases: Dict[str, List[int]] = {}
+        for i, f in enumerate(self.functions):
+            for alias in {f["name"], *f["name"].split(",")}:
+                key = self._key(tokenize(alias))
+                if key and i not in self.aliases.setdefault(key, []):
+                    self.aliases[key].append(i)
+
+        # BM25 term frequencies over name (weighted) and description tokens incl. compound parts
+        self.frequencies: List[Counter] = []
+        for name, description in zip(names, descriptions):
+            counts = Counter()
+            for tokens, weight in ((name, NAME_WEIGHT), (description, 1)):
+                for token in self.expand(tokens):
+                    counts[token] += weight
+            self.frequencies.append(counts)
+        self.lengths = [sum(c.values()) for c in self.frequencies]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        documents = Counter(t for counts in self.frequencies for t in counts)
+        n = len(self.frequencies)
+        self.idf = {t: math.log(1 + (n - df + 0.5) / (df + 0.5)) for t, df in documents.items()}
+
+    @staticmethod
+    def _key(tokens: List[str]) -> str:
+        return " ".join(sorted(set(tokens)))
+
+    def expand(self, tokens: List[str]) -> List[str]:
+        """Tokens followed by the parts of compound tokens."""
+        expanded = list(tokens)
+        for token in tokens:
+            expanded.extend(split_compound(token, self.vocabulary))
+        return expanded
+
+    def scores(self, tokens: List[str]) -> List[float]:
+        """BM25 score of every function for the query tokens."""
+        terms = set(self.expand(tokens))
+        scores = [0.0] * len(self.frequencies)
+        for i, (counts, length) in enumerate(zip(self.frequencies, self.lengths)):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.average_length) if self.average_length else BM25_K1
+            for term in terms:
+                tf = counts.get(term)
+                if tf:
+                    scores[i] += self.idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+
+class LexicalIndex:
+    """Token and BM25 search over the building function names and descriptions."""
+
+    _instance: Optional["LexicalIndex"] = None
+
+    def __new__(cls):
+        """Singleton pattern so all nodes share one index."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._state = None
+            cls._instance._lock = threading.Lock()
+            cls._instance.max_hits = LEXICAL_MAX_HITS
+        return cls._instance
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether functions are loaded."""
+        state = self._state
+        return state is not None and bool(state.functions)
+
+    def __len__(self) -> int:
+        state = self._state
+        return len(state.functions) if state else 0
+
+    def load(self, functions: List[Dict[str, Any]], version: Optional[int] = None) -> int:
+        """
+        Replace the index contents.
+
+        Args:
+            functions: Dicts with 'code', 'name' and 'description'
+            version: Dataset version the functions belong to
+
+        Returns:
+            Number of functions
+        """
+        self._state = _IndexState(functions, version)
+        return len(self)
+
+    def warm(self) -> int:
+        """
+        Build the index from all functions in Neo4j.
+
+        Returns:
+            Number of functions
+        """
+        with self._lock:
+            version = data_version_tracker.current(force=True)
+            return self.load(neo4j_client.get_building_functions(), version)
+
+    def invalidate(self):
+        """Drop the loaded index."""
+        self._state = None
+
+    def ensure_current(self) -> bool:
+        """
+        Build the index on first use and rebuild it if the dataset changed.
+
+        Returns:
+            True if functions are loaded after the check
+        """
+        state = self._state
+        # A loaded index stays in use while another request reloads it, and is
+        # only replaced once the new one is complete (kept if the reload fails)
+        reloading = state is not None and self._lock.locked()
+        if (state is None or data_version_tracker.current() != state.version) and not reloading:
+            try:
+                self.warm()
+            except Exception as e:
+                print(f"Lexical index load failed: {e}")
+        return self.is_warm
+
+    def _result(self, state: _IndexState, positions: List[int], scores: List[float]) -> List[Dict[str, Any]]:
+        """Functions at positions with BM25 scores normalized to the best one."""
+        best = max((scores[i] for i in positions), default=0.0)
+        return [
+            {**state.functions[i], "score": round(scores[i] / best, 4) if best > 0 else 1.0}
+            for i in positions
+        ]
+
+    def match(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Functions the query names unambiguously.
+
+        A query matches if its stems equal those of a function name or of one
+        of its comma-separated alternatives ("Hotels" -> "Hotel, Motel,
+        Pension"), or if every query stem is a whole word in the names of at
+        most max_hits functions ("Schulen" -> "Allgemein bildende Schule",
+        "Berufsbildende Schule"). Compound parts do not count here.
+
+        Returns:
+            Matching functions with 'code', 'name', 'description' and 'score'
+            (1.0), best BM25 match first; empty if there is no confident hit
+        """
+        state = self._state
+        tokens = tokenize(query)
+        if state is None or not tokens:
+            return []
+
+        positions = state.aliases.get(state._key(tokens))
+        if not positions:
+            wanted = set(tokens)
+            positions = [i for i, name in enumerate(state.name_tokens) if wanted <= name]
+            if len(positions) > self.max_hits:
+                return []
+        if not positions:
+            return []
+
+        scores = state.scores(tokens)
+        # Stable, so equal scores keep the function (code) order
+        return [{**state.functions[i], "score": 1.0} for i in sorted(positions, key=lambda i: -scores[i])]
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Functions ranked by BM25 relevance to the query.
+
+        Args:
+            query: Building function query
+            top_k: Maximum number of results
+
+        Returns:
+            Up to top_k functions with a positive score, with 'code', 'name',
+            'description' and 'score' (relative to the best match), best first
+        """
+        state = self._state
+        tokens = tokenize(query)
+        if state is None or not tokens:
+            return []
+
+        scores = state.scores(tokens)
+        positions = sorted((i for i, s in enumerate(scores) if s > 0), key=lambda i: -scores[i])[:top_k]
+        return self._result(state, positions, scores)
+
+
+# Global instance for convenience
+lexical_index = LexicalIndex()
@@ -2,7 +2,8 @@ from openai import OpenAI
 from typing import List, Dict, Any, Optional
 import json
 
-from ..config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_EMBEDDING_MODEL
+from ..config import OPENAI_API_KEY, OPENAI_MODEL
+from .embedding_providers import EmbeddingProvider, create_embedding_provider
 
 
 class LLMClient:
@@ -15,6 +16,7 @@ class LLMClient:
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._client = None
+            cls._instance._embedding_provider = None
         return cls._instance
     
     def __init__(self):
@@ -56,21 +58,24 @@ class LLMClient:
         )
         return json.loads(response)
     
+    @property
+    def embedding_provider(self) -> EmbeddingProvider:
+        """Provider configured by EMBEDDING_PROVIDER (created on first use)."""
+        if self._embedding_provider is None:
+            self._embedding_provider = create_embedding_provider(openai_client=self._client)
+        return self._embedding_provider
+    
+    def set_embedding_provider(self, provider: EmbeddingProvider):
+        """Replace the embedding provider (e.g. a local model)."""
+        self._embedding_provider = provider
+    
     def create_embedding(self, text: str) -> List[float]:
         """Create an embedding for the given text."""
-        response = self._client.embeddings.create(
-            model=OPENAI_EMBEDDING_MODEL,
-            input=text
-        )
-        return response.data[0].embedding
+        return self.embedding_provider.embed([text])[0]
     
     def create_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Create embeddings for multiple texts."""
-        response = self._client.embeddings.create(
-            model=OPENAI_EMBEDDING_MODEL,
-            input=texts
-        )
-        return [item.embedding for item in response.data]
+        return self.embedding_provider.embed(texts)
 
 
 # Global instance for convenience
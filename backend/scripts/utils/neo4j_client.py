@@ -1,8 +1,67 @@
-from neo4j import GraphDatabase
-from typing import List, Dict, Any, Optional
-from contextlib import contextmanager
+from neo4j import GraphDatabase, AsyncGraphDatabase, READ_ACCESS, unit_of_work
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator
+from contextlib import contextmanager, asynccontextmanager
 
-from ..config import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_DATABASE
+from ..config import (
+    NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_DATABASE,
+    NEO4J_MAX_POOL_SIZE, NEO4J_CONNECTION_ACQUISITION_TIMEOUT, NEO4J_MAX_CONNECTION_LIFETIME,
+    NEO4J_QUERY_TIMEOUT, NEO4J_BULK_TIMEOUT, NEO4J_MAX_RETRY_TIME, NEO4J_MAX_ROWS
+)
+
+# Name of the DatasetVersion node maintained by data_import/data_version.py
+DATASET_NAME = "ax_ploration"
+
+# Application name in the transaction metadata (visible in SHOW TRANSACTIONS and the query log)
+APPLICATION_NAME = "ax_ploration"
+
+# Connection pool and retry settings shared by the sync and async driver
+POOL_CONFIG = {
+    "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+    "connection_acquisition_timeout": NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+    "max_connection_lifetime": NEO4J_MAX_CONNECTION_LIFETIME,
+    "max_transaction_retry_time": NEO4J_MAX_RETRY_TIME,
+}
+
+
+# Full-scan loads of the process-wide caches: longer timeout, no row ceiling
+BULK_LOAD = {"timeout": NEO4J_BULK_TIMEOUT, "max_rows": 0}
+
+
+class RowLimitExceeded(Exception):
+    """A query returned more rows than the configured ceiling (NEO4J_MAX_ROWS)."""
+
+
+def transaction_config(tag: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Timeout and metadata of a read transaction.
+    
+    Args:
+        tag: Name of the calling operation, recorded in the transaction metadata
+        timeout: Seconds before the server aborts the transaction
+            (None: NEO4J_QUERY_TIMEOUT, 0: server default)
+    """
+    timeout = NEO4J_QUERY_TIMEOUT if timeout is None else timeout
+    return {"timeout": timeout or None, "metadata": {"app": APPLICATION_NAME, "tag": tag}}
+
+
+def _row_count(records) -> int:
+    """
+    Number of result rows in records.
+
+    A record counts as the length of its longest list column (at least 1),
+    so `RETURN collect(b) AS buildings` counts the collected buildings, not
+    the single record carrying them.
+    """
+    return sum(
+        max([1] + [len(value) for value in record.values() if isinstance(value, list)])
+        for record in records
+    )
+
+
+def _check_rows(count: int, max_rows: int):
+    """Raise RowLimitExceeded if more than max_rows rows were pulled (0 = unlimited)."""
+    if max_rows and count > max_rows:
+        raise RowLimitExceeded(f"Query returned more than {max_rows} rows (NEO4J_MAX_ROWS)")
 
 
 class Neo4jClient:
@@ -21,7 +80,8 @@ class Neo4jClient:
         if self._driver is None:
             self._driver = GraphDatabase.driver(
                 NEO4J_URI,
-                auth=(NEO4J_USERNAME, NEO4J_PASSWORD)
+                auth=(NEO4J_USERNAME, NEO4J_PASSWORD),
+                **POOL_CONFIG
             )
     
     def close(self):
@@ -31,19 +91,69 @@ class Neo4jClient:
             self._driver = None
     
     @contextmanager
-    def session(self):
-        """Context manager for Neo4j sessions."""
-        session = self._driver.session(database=NEO4J_DATABASE)
+    def session(self, **config):
+        """Context manager for Neo4j sessions (extra config is passed to the driver)."""
+        session = self._driver.session(database=NEO4J_DATABASE, **config)
         try:
             yield session
         finally:
             session.close()
     
-    def execute_query(self, cypher: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Execute a Cypher query and return results as list of dicts."""
-        with self.session() as session:
-            result = session.run(cypher, parameters or {})
-            return [record.data() for record in result]
+    def execute_query(
+        self,
+        cypher: str,
+        parameters: Dict[str, Any] = None,
+        tag: str = "query",
+        timeout: Optional[float] = None,
+        max_rows: int = NEO4J_MAX_ROWS
+    ) -> List[Dict[str, Any]]:
+        """Execute a read-only Cypher query and return results as list of dicts.
+        
+        The query runs as a managed read transaction (routed to a reader in a
+        cluster, retried by the driver on transient errors for up to
+        NEO4J_MAX_RETRY_TIME) with a server-side timeout and the tag in the
+        transaction metadata. At most max_rows rows are pulled (records, or
+        elements of collected list columns); one more aborts the query with
+        RowLimitExceeded.
+        """
+        @unit_of_work(**transaction_config(tag, timeout))
+        def read(tx):
+            result = tx.run(cypher, parameters or {})
+            records = result.fetch(max_rows + 1) if max_rows else list(result)
+            _check_rows(_row_count(records), max_rows)
+            return [record.data() for record in records]
+        
+        with self.session(default_access_mode=READ_ACCESS) as session:
+            return session.execute_read(read)
+    
+    def stream_records(
+        self,
+        cypher: str,
+        parameters: Dict[str, Any] = None,
+        chunk_size: int = 1000,
+        tag: str = "stream",
+        timeout: Optional[float] = None,
+        max_rows: int = NEO4J_MAX_ROWS
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Execute a read-only Cypher query and yield results in chunks of dicts as they arrive.
+        
+        Records are pulled from the Bolt stream chunk_size at a time, so only
+        one chunk is held in memory. The session stays open until the
+        generator is exhausted or closed. The query runs in an explicit read
+        transaction with timeout, metadata and row ceiling like
+        execute_query; it is not retried because chunks were already handed out.
+        """
+        with self.session(fetch_size=chunk_size, default_access_mode=READ_ACCESS) as session:
+            with session.begin_transaction(**transaction_config(tag, timeout)) as tx:
+                result = tx.run(cypher, parameters or {})
+                count = 0
+                while True:
+                    records = result.fetch(chunk_size)
+                    if not records:
+                        break
+                    count += _row_count(records)
+                    _check_rows(count, max_rows)
+                    yield [record.data() for record in records]
     
     def verify_connection(self) -> bool:
         """Verify that the database connection works."""
@@ -55,6 +165,94 @@ class Neo4jClient:
             print(f"Neo4j connection failed: {e}")
             return False
     
+    def get_data_version(self) -> Optional[int]:
+        """Return the dataset version stamp written by the data import scripts (None if never set)."""
+        query = """
+        MATCH (v:DatasetVersion {name: $name})
+        RETURN v.version AS version
+        """
+        records = self.execute_query(query, {"name": DATASET_NAME})
+        return records[0]["version"] if records else None
+    
+    def has_building_locations(self) -> bool:
+        """Whether the online `building_location` point index and Building.location values exist."""
+        indexes = self.execute_query(
+            """
+            SHOW INDEXES YIELD type, labelsOrTypes, properties, state
+            WHERE type = 'POINT' AND labelsOrTypes = ['Building'] AND properties = ['location'] AND state = 'ONLINE'
+            RETURN count(*) AS indexes
+            """,
+            tag="location_check"
+        )
+        if not indexes or not indexes[0]["indexes"]:
+            return False
+        located = self.execute_query(
+            "MATCH (b:Building) WHERE b.location IS NOT NULL RETURN b.id AS id LIMIT 1",
+            tag="location_check"
+        )
+        return bool(located)
+    
+    def get_statistics_cube(self) -> List[Dict[str, Any]]:
+        """Retrieve the statistics cube cells written by data_import/statistics_cube.py.
+        
+        Returns:
+            All StatisticsCell property maps, or an empty list if the cube is
+            missing or was built for an older dataset version
+        """
+        query = """
+        MATCH (v:DatasetVersion {name: $name})
+        WHERE v.cube_version = v.version
+        MATCH (c:StatisticsCell)
+        RETURN c {.*} AS cell
+        """
+        records = self.execute_query(query, {"name": DATASET_NAME}, tag="statistics_cube", **BULK_LOAD)
+        return [record["cell"] for record in records]
+    
+    def get_building_centroids(self) -> List[Dict[str, Any]]:
+        """Retrieve id, centroid WKT, area and floors of all buildings in a single scan."""
+        query = """
+        MATCH (b:Building)
+        RETURN b.id AS id, b.centroid AS centroid, b.area AS area, b.floors_above AS floors_above
+        """
+        return self.execute_query(query, tag="building_centroids", **BULK_LOAD)
+    
+    def get_building_footprints(self, building_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Retrieve id and footprint GeoJSON of the given buildings (all buildings in a single scan if None)."""
+        if building_ids is None:
+            query = """
+            MATCH (b:Building)
+            RETURN b.id AS id, b.geometry_geojson AS geometry_geojson
+            """
+            return self.execute_query(query, tag="building_footprints", **BULK_LOAD)
+        
+        query = """
+        UNWIND $ids AS building_id
+        MATCH (b:Building {id: building_id})
+        RETURN b.id AS id, b.geometry_geojson AS geometry_geojson
+        """
+        return self.execute_query(query, {"ids": list(building_ids)}, tag="building_footprints")
+    
+    def get_building_memberships(self, building_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Look up function code and district name for a list of building ids.
+        
+        Returns:
+            Dict mapping building id to {"function_code": int, "district": str}
+        """
+        query = """
+        UNWIND $ids AS building_id
+        MATCH (b:Building {id: building_id})
+        OPTIONAL MATCH (b)-[:HAS_FUNCTION]->(f:Function)
+        OPTIONAL MATCH (b)-[:IN_DISTRICT]->(d:District)
+        RETURN b.id AS id,
+               head(collect(DISTINCT f.code)) AS function_code,
+               head(collect(DISTINCT d.Gemeinde_name)) AS district
+        """
+        records = self.execute_query(query, {"ids": list(building_ids)}, tag="building_memberships", **BULK_LOAD)
+        return {
+            record["id"]: {"function_code": record["function_code"], "district": record["district"]}
+            for record in records
+        }
+    
     def get_building_functions(self) -> List[Dict[str, Any]]:
         """Retrieve all building functions from the database."""
         query = """
@@ -66,11 +264,26 @@ class Neo4jClient:
         """
         return self.execute_query(query)
     
+    def get_function_embeddings(self) -> List[Dict[str, Any]]:
+        """Retrieve all building functions with their small, large and local description embeddings."""
+        query = """
+        MATCH (f:Function)
+        RETURN f.code AS code,
+               f.name AS name,
+               f.description AS description,
+               f.description_embedding_small AS embedding_small,
+               f.description_embedding_large AS embedding_large,
+               f.description_embedding_local AS embedding_local
+        ORDER BY f.code
+        """
+        return self.execute_query(query, tag="function_embeddings")
+    
     def similarity_search(
         self, 
         embedding: List[float], 
         top_k: int = 5,
-        use_large_model: bool = False
+        use_large_model: bool = False,
+        space: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Perform similarity search on building function embeddings.
         
@@ -78,9 +291,11 @@ class Neo4jClient:
             embedding: Query embedding vector
             top_k: Number of results to return
             use_large_model: If True, use description_embedding_large, else description_embedding_small
+            space: Vector space ("small", "large", "local"); overrides use_large_model
         """
         # Determine which embedding property to use based on model
-        index_name = "function_embeddings_large" if use_large_model else "function_embeddings_small"
+        space = space or ("large" if use_large_model else "small")
+        index_name = f"function_embeddings_{space}"
         
         query = """
         CALL db.index.vector.queryNodes($index_name, $top_k, $embedding)
@@ -101,7 +316,7 @@ class Neo4jClient:
             # Fallback: if vector index is missing, do a cosine similarity scan on the embedding property
             error_text = str(e)
             if "no such vector" in error_text.lower() or "vector schema index" in error_text.lower():
-                prop = "description_embedding_large" if use_large_model else "description_embedding_small"
+                prop = f"description_embedding_{space}"
                 fallback_query = f"""
                 MATCH (f:Function)
                 WHERE f.{prop} IS NOT NULL
@@ -120,5 +335,123 @@ class Neo4jClient:
             raise
 
 
-# Global instance for convenience
-neo4j_client = Neo4jClient()
\ No newline at end of file
+class AsyncNeo4jClient:
+    """
+    Asyncio client for Neo4j, used by the API and the async workflow path.
+    
+    Queries await the database instead of blocking the event loop, so
+    concurrent requests share the connection pool instead of serializing on
+    database I/O. The driver is created on first use, inside the running
+    event loop.
+    """
+    
+    _instance: Optional["AsyncNeo4jClient"] = None
+    
+    def __new__(cls):
+        """Singleton pattern to reuse the driver's connection pool."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._driver = None
+        return cls._instance
+    
+    @property
+    def driver(self):
+        """The async driver (created lazily)."""
+        if self._driver is None:
+            self._driver = AsyncGraphDatabase.driver(
+                NEO4J_URI,
+                auth=(NEO4J_USERNAME, NEO4J_PASSWORD),
+                **POOL_CONFIG
+            )
+        return self._driver
+    
+    async def close(self):
+        """Close the driver and its pooled connections."""
+        if self._driver:
+            await self._driver.close()
+            self._driver = None
+    
+    @asynccontextmanager
+    async def session(self, **config):
+        """Async context manager for Neo4j sessions (extra config is passed to the driver)."""
+        session = self.driver.session(database=NEO4J_DATABASE, **config)
+        try:
+            yield session
+        finally:
+            await session.close()
+    
+    async def execute_query(
+        self,
+        cypher: str,
+        parameters: Dict[str, Any] = None,
+        tag: str = "query",
+        timeout: Optional[float] = None,
+        max_rows: int = NEO4J_MAX_ROWS
+    ) -> List[Dict[str, Any]]:
+        """Execute a read-only Cypher query in a managed read transaction (see Neo4jClient.execute_query)."""
+        @unit_of_work(**transaction_config(tag, timeout))
+        async def read(tx):
+            result = await tx.run(cypher, parameters or {})
+            records = await result.fetch(max_rows + 1) if max_rows else [record async for record in result]
+            _check_rows(_row_count(records), max_rows)
+            return [record.data() for record in records]
+        
+        async with self.session(default_access_mode=READ_ACCESS) as session:
+            return await session.execute_read(read)
+    
+    async def stream_records(
+        self,
+        cypher: str,
+        parameters: Dict[str, Any] = None,
+        chunk_size: int = 1000,
+        tag: str = "stream",
+        timeout: Optional[float] = None,
+        max_rows: int = NEO4J_MAX_ROWS
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Execute a read-only Cypher query and yield results in chunks of dicts as they arrive (see Neo4jClient.stream_records)."""
+        async with self.session(fetch_size=chunk_size, default_access_mode=READ_ACCESS) as session:
+            async with await session.begin_transaction(**transaction_config(tag, timeout)) as tx:
+                result = await tx.run(cypher, parameters or {})
+                count = 0
+                while True:
+                    records = await result.fetch(chunk_size)
+                    if not records:
+                        break
+                    count += _row_count(records)
+                    _check_rows(count, max_rows)
+                    yield [record.data() for record in records]
+    
+    async def verify_connection(self) -> bool:
+        """Verify that the database connection works."""
+        try:
+            async with self.session() as session:
+                await session.run("RETURN 1")
+            return True
+        except Exception as e:
+            print(f"Neo4j connection failed: {e}")
+            return False
+    
+    async def get_data_version(self) -> Optional[int]:
+        """Return the dataset version stamp written by the data import scripts (None if never set)."""
+        query = """
+        MATCH (v:DatasetVersion {name: $name})
+        RETURN v.version AS version
+        """
+        records = await self.execute_query(query, {"name": DATASET_NAME})
+        return records[0]["version"] if records else None
+    
+    async def get_building_functions(self) -> List[Dict[str, Any]]:
+        """Retrieve all building functions from the database."""
+        query = """
+        MATCH (f:Function)
+        RETURN f.code AS code, 
+               f.name AS name,
+               f.description AS description
+        ORDER BY f.code
+        """
+        return await self.execute_query(query)
+
+
+# Global instances for convenience
+neo4j_client = Neo4jClient()
+async_neo4j_client = AsyncNeo4jClient()
\ No newline at end of file
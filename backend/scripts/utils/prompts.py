@@ -14,6 +14,8 @@ Your task is to identify from a user query:
 2. Is a specific building function needed?
 3. Extract ONLY the building function-relevant parts (remove location, statistics, filters)
 4. Detect the query language (full language name, e.g., "German", "English", "French", etc.)
+5. Does the query only ask for statistics (count, average, minimum, maximum, median) instead of individual buildings?
+6. Should the statistics be broken down by district, building function or floor band?
 
 Available attributes from Neo4j Aura database schema - choose ONLY from these:
 
@@ -24,12 +26,22 @@ Respond in JSON format:
     "attributes": ["list", "of", "attributes"],
     "needs_building_function": true/false,
     "building_function_query": "extracted terms regarding the building function (e.g., 'schools', 'Wohngebäude', 'hospitals')",
-    "query_language": "Full language name (e.g., 'German', 'English', 'French', etc.)"
+    "query_language": "Full language name (e.g., 'German', 'English', 'French', etc.)",
+    "statistics_only": true/false,
+    "group_by": ["district" | "function" | "floor_band"]
 }}
 
+Set "statistics_only" to true only if the answer needs nothing but aggregated numbers
+(e.g. "Wie viele ...?", "average area of ...", "maximale Stockwerkzahl"). Set it to false
+if individual buildings should be listed, shown or described.
+
+Set "group_by" only if the user asks for a breakdown ("pro Bezirk", "nach Gebäudefunktion",
+"by number of floors", "je Stockwerksklasse"), in the order of nesting. Otherwise use [].
+
 Examples:
-- Query: "Wie viele Schulen gibt es in Pankow?" -> building_function_query: "Schulen", query_language: "German"
-- Query: "Show me hospitals with more than 3 floors" -> building_function_query: "hospitals", query_language: "English"
+- Query: "Wie viele Schulen gibt es in Pankow?" -> building_function_query: "Schulen", query_language: "German", statistics_only: true
+- Query: "Show me hospitals with more than 3 floors" -> building_function_query: "hospitals", query_language: "English", statistics_only: false
+- Query: "Durchschnittliche Fläche der Wohngebäude pro Bezirk" -> building_function_query: "Wohngebäude", query_language: "German", statistics_only: true, group_by: ["district"]
 - Query: "Liste alle Gebäude auf in denen Vertretungen ausländische Regierungen sitzen" -> building_function_query: "Gebäude mit Vertretungen ausländischer Regierungen", query_language: "German"
 """,
         "user": "Analyze this query: {query}",
@@ -49,6 +61,7 @@ Außerdem wichtig:
 - Ignoriere räumliche Filterungen, diese werden später automatisch angewendet. Angbaben wie (Suche im Umkreis von X Metern um Y oder innerhalb von Polygon Z) werden später berücksichtigt.
 - Schreibe auf gar keinen Fall räumliche Filterungen in die Cypher-Query und verwende keine Platzhalter dafür. 
 - Ignoriere jedes Limit, dass durch die Query des Users gesetzt wird. Alle passenden Gebäude aus WHERE müssen zurückgegeben werden.
+- Wenn Gebäudefunktionen angegeben sind, filtere sie immer mit `(b)-[:HAS_FUNCTION]->(f:Function) WHERE f.code IN $codes`. Der Parameter $codes enthält die angegebenen Codes und alle ihre Unterfunktionen; schreibe die Codes nie als Liste in die Query. Ohne Gebäudefunktionen verwende $codes nicht.
 - Verwende immer explizit collect(b) AS buildings. Schränke die Attribute der Buildings nicht weiter ein indem du collect({{name: b.name, id: b.id}}) AS buildings oder ähnliches nutzt. Gebe immer alle Attribute zurück.
 
 Antworte NUR mit der Cypher-Query, ohne Erklärungen.""",
@@ -85,11 +98,16 @@ Respond in JSON format:
 {{
     "mode": "nearest" or "radius",
     "value": <number>,
+    "per_function": true/false,
     "reasoning": "Brief explanation"
 }}
 
+Set "per_function" to true only if the user wants the nearest X buildings for EACH building type separately
+(e.g. "die 3 nächsten Schulen und Kitas jeweils", "the nearest 2 of each type"). Otherwise false.
+
 Examples:
-- "Show me the 5 nearest schools" → {{"mode": "nearest", "value": 5}}
+- "Show me the 5 nearest schools" → {{"mode": "nearest", "value": 5, "per_function": false}}
+- "Die jeweils 3 nächsten Schulen und Kindergärten" → {{"mode": "nearest", "value": 3, "per_function": true}}
 - "Find all buildings within 500m" → {{"mode": "radius", "value": 500}}
 - "Which hospitals are nearby?" → {{"mode": "nearest", "value": 10}} (default: 10)
 - "Buildings within 1km" → {{"mode": "radius", "value": 1000}}
@@ -0,0 +1,215 @@
+"""
+Result cache for executed Cypher queries.
+
+Frequent questions lead to the same generated Cypher over and over; the
+cache keeps the records of such queries so they are not re-run and
+re-materialized by Neo4j each time.
+
+- Key: normalized query text (whitespace collapsed and keywords upper-cased
+  outside string literals, so formatting and keyword case do not matter)
+  plus the query parameters
+- Records are stored pickled: the byte size of an entry is exact and every
+  hit returns a fresh copy that callers may modify
+- Entries expire after QUERY_CACHE_TTL_SECONDS; the least recently used
+  entries are evicted while the cache holds more than QUERY_CACHE_MAX_BYTES
+- All entries are dropped when the dataset version stamp written by the
+  import scripts changes
+"""
+
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+import json
+import pickle
+import re
+import threading
+import time
+
+from ..config import QUERY_CACHE_ENABLED, QUERY_CACHE_MAX_BYTES, QUERY_CACHE_TTL_SECONDS
+from .neo4j_client import neo4j_client, async_neo4j_client
+from .data_version import data_version_tracker
+
+# String literals ('...' / "..." with escapes) and backtick-quoted identifiers keep their text
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`", re.DOTALL)
+_KEYWORD = re.compile(
+    r"\b(MATCH|OPTIONAL|WHERE|WITH|RETURN|DISTINCT|ORDER|BY|SKIP|LIMIT|UNWIND|AS|AND|OR|XOR|NOT|IN|IS|NULL|"
+    r"TRUE|FALSE|ASC|ASCENDING|DESC|DESCENDING|CASE|WHEN|THEN|ELSE|END|UNION|ALL|CALL|YIELD|EXISTS|"
+    r"STARTS|ENDS|CONTAINS|COUNT|COLLECT|SUM|AVG|MIN|MAX|HEAD|SIZE)\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_cypher(cypher: str) -> str:
+    """
+    Canonical form of a Cypher query for cache keys.
+
+    Whitespace runs are collapsed and keywords are upper-cased; string
+    literals, labels, property names and variables keep their case because
+    Cypher compares them case-sensitively.
+    """
+    parts = []
+    position = 0
+    for literal in _LITERAL.finditer(cypher):
+        parts.append(_KEYWORD.sub(lambda m: m.group().upper(), re.sub(r"\s+", " ", cypher[position:literal.start()])))
+        parts.append(literal.group())
+        position = literal.end()
+    parts.append(_KEYWORD.sub(lambda m: m.group().upper(), re.sub(r"\s+", " ", cypher[position:])))
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def cache_key(cypher: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+    """Cache key of a query: normalized text plus canonical JSON of the parameters."""
+    return normalize_cypher(cypher) + "\n" + json.dumps(parameters or {}, sort_keys=True, default=str)
+
+
+class _CachedResult:
+    """Pickled records of one query."""
+
+    def __init__(self, payload: bytes, version: Optional[int]):
+        self.payload = payload
+        self.version = version
+        self.created_at = time.monotonic()
+
+
+class QueryCache:
+    """LRU cache of query records bounded by total byte size."""
+
+    _instance: Optional["QueryCache"] = None
+
+    def __new__(cls):
+        """Singleton pattern so all nodes share one cache."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._entries = OrderedDict()
+            cls._instance._bytes = 0
+            cls._instance._version = None
+            cls._instance._lock = threading.Lock()
+            cls._instance._metrics = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        return cls._instance
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: str):
+        """Remove an entry (lock held)."""
+        self._bytes -= len(self._entries.pop(key).payload)
+
+    def invalidate(self):
+        """Drop all entries (e.g. after the database was modified)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._metrics["invalidations"] += 1
+
+    def _check_version(self) -> Optional[int]:
+        """Drop all entries if the dataset version changed since they were stored."""
+        version = data_version_tracker.current()
+        if version != self._version:
+            if self._entries:
+                self.invalidate()
+            self._version = version
+        return version
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Cached records of a query.
+
+        Returns:
+            A fresh copy of the records, or None on a miss
+        """
+        version = self._check_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version != version:
+                self._drop(key)
+                entry = None
+            elif entry is not None and time.monotonic() - entry.created_at > QUERY_CACHE_TTL_SECONDS:
+                self._drop(key)
+                self._metrics["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            payload = entry.payload
+        return pickle.loads(payload)
+
+    def put(self, key: str, records: List[Dict[str, Any]]) -> bool:
+        """
+        Store the records of a query.
+
+        Returns:
+            True if stored (results larger than the whole cache or that
+            cannot be pickled are not cached)
+        """
+        try:
+            payload = pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+        if len(payload) > QUERY_CACHE_MAX_BYTES:
+            return False
+
+        version = self._check_version()
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _CachedResult(payload, version)
+            self._bytes += len(payload)
+            while self._bytes > QUERY_CACHE_MAX_BYTES:
+                self._drop(next(iter(self._entries)))
+                self._metrics["evictions"] += 1
+        return True
+
+    def execute(self, cypher: str, parameters: Optional[Dict[str, Any]] = None, tag: str = "query") -> List[Dict[str, Any]]:
+        """
+        Run a read query through the cache (drop-in for neo4j_client.execute_query).
+
+        Args:
+            cypher: Cypher query
+            parameters: Query parameters (part of the cache key)
+            tag: Transaction metadata tag of the query
+
+        Returns:
+            List of record dicts, from the cache or from Neo4j
+        """
+        if not QUERY_CACHE_ENABLED:
+            return neo4j_client.execute_query(cypher, parameters, tag=tag)
+
+        key = cache_key(cypher, parameters)
+        records = self.get(key)
+        if records is None:
+            records = neo4j_client.execute_query(cypher, parameters, tag=tag)
+            self.put(key, records)
+        return records
+
+    async def aexecute(self, cypher: str, parameters: Optional[Dict[str, Any]] = None, tag: str = "query") -> List[Dict[str, Any]]:
+        """Async variant of execute() on the async Neo4j client."""
+        if not QUERY_CACHE_ENABLED:
+            return await async_neo4j_client.execute_query(cypher, parameters, tag=tag)
+
+        # Refresh the version stamp without blocking; the lookups below then reuse it
+        await data_version_tracker.acurrent()
+        key = cache_key(cypher, parameters)
+        records = self.get(key)
+        if records is None:
+            records = await async_neo4j_client.execute_query(cypher, parameters, tag=tag)
+            self.put(key, records)
+        return records
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics and current size of the cache."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            entries, size = len(self._entries), self._bytes
+        lookups = metrics["hits"] + metrics["misses"]
+        return {
+            **metrics,
+            "hit_rate": round(metrics["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": QUERY_CACHE_MAX_BYTES,
+        }
+
+
+# Global instance for convenience
+query_cache = QueryCache()
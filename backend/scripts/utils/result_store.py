@@ -0,0 +1,177 @@
+"""
+Server-side store for large building result sets.
+
+The API keeps the full building list of a query under a result id and only
+sends the first page with the final state; clients fetch further pages (or
+value ranges of a sort key) from the result endpoints. Entries expire after
+RESULT_STORE_TTL_SECONDS and the least recently used entries are dropped
+beyond RESULT_STORE_MAX_ENTRIES, so memory stays bounded.
+
+Sort orders are computed once per (result, sort key) with a stable NumPy
+argsort and reused for every page.
+"""
+
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from ..config import RESULT_STORE_TTL_SECONDS, RESULT_STORE_MAX_ENTRIES
+from .building_stats import building_columns
+
+# Sort keys: numeric columns are compared as numbers, the others as strings
+NUMERIC_SORT_KEYS = ("area", "floors_above", "floors_below", "house_number", "_distance", "_overlap_fraction")
+TEXT_SORT_KEYS = ("id", "name", "street_name", "post_code")
+SORT_KEYS = NUMERIC_SORT_KEYS + TEXT_SORT_KEYS
+
+
+class _StoredResult:
+    """Building list of one query with its cached sort orders."""
+
+    def __init__(self, buildings: List[Dict[str, Any]]):
+        self.buildings = buildings
+        self.created_at = time.monotonic()
+        # sort key -> (order, sorted values or None for text keys, number of non-missing values)
+        self.orders: Dict[str, tuple] = {}
+
+    def order(self, sort_by: Optional[str]) -> tuple:
+        """Stable ascending order of the buildings by a sort key (missing values last)."""
+        if sort_by is None:
+            return np.arange(len(self.buildings)), None, len(self.buildings)
+        if sort_by not in self.orders:
+            if sort_by in NUMERIC_SORT_KEYS:
+                if sort_by.startswith("_"):
+                    values = np.array(
+                        [b.get(sort_by) if b.get(sort_by) is not None else np.nan for b in self.buildings],
+                        dtype=np.float64,
+                    )
+                else:
+                    values = building_columns(self.buildings, (sort_by,))[sort_by]
+                order = np.argsort(values, kind="stable")  # NaN sorts last
+                self.orders[sort_by] = (order, values[order], int((~np.isnan(values)).sum()))
+            else:
+                keys = [str(b.get(sort_by)) if b.get(sort_by) is not None else None for b in self.buildings]
+                order = np.array(
+                    sorted(range(len(keys)), key=lambda i: (keys[i] is None, keys[i] or "")),
+                    dtype=np.intp,
+                )
+                self.orders[sort_by] = (order, None, sum(key is not None for key in keys))
+        return self.orders[sort_by]
+
+
+class ResultStore:
+    """In-memory store of building result sets addressed by result id."""
+
+    _instance: Optional["ResultStore"] = None
+
+    def __new__(cls):
+        """Singleton pattern so the API and all requests share one store."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._results = OrderedDict()
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def _expire(self):
+        """Drop expired entries and the least recently used ones beyond the limit (lock held)."""
+        now = time.monotonic()
+        for result_id in [rid for rid, entry in self._results.items() if now - entry.created_at > RESULT_STORE_TTL_SECONDS]:
+            del self._results[result_id]
+        while len(self._results) > RESULT_STORE_MAX_ENTRIES:
+            self._results.popitem(last=False)
+
+    def put(self, buildings: List[Dict[str, Any]]) -> str:
+        """
+        Store a building list.
+
+        Returns:
+            Result id for the page/range lookups
+        """
+        result_id = uuid.uuid4().hex
+        with self._lock:
+            self._results[result_id] = _StoredResult(buildings)
+            self._expire()
+        return result_id
+
+    def _get(self, result_id: str) -> Optional[_StoredResult]:
+        with self._lock:
+            self._expire()
+            entry = self._results.get(result_id)
+            if entry is not None:
+                self._results.move_to_end(result_id)
+            return entry
+
+    def page(
+        self,
+        result_id: str,
+        offset: int = 0,
+        limit: int = 100,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        One page of a stored result, optionally sorted and restricted to a value range.
+
+        Args:
+            result_id: Id returned by put
+            offset: Position of the first building within the (sorted, ranged) result
+            limit: Maximum number of buildings
+            sort_by: One of SORT_KEYS (None keeps the original order)
+            descending: Sort descending (missing values stay last)
+            min_value / max_value: Inclusive range of a numeric sort key
+
+        Returns:
+            Dict with 'result_id', 'total' (buildings in range), 'offset',
+            'limit', 'sort_by', 'descending', 'next_offset' (None on the last
+            page) and 'buildings', or None if the result id is unknown or expired
+
+        Raises:
+            ValueError: For unknown sort keys or a range without numeric sort key
+        """
+        if sort_by is not None and sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{sort_by}', expected one of {', '.join(SORT_KEYS)}")
+        if (min_value is not None or max_value is not None) and sort_by not in NUMERIC_SORT_KEYS:
+            raise ValueError("min_value/max_value require a numeric sort key")
+
+        entry = self._get(result_id)
+        if entry is None:
+            return None
+
+        order, values, valid = entry.order(sort_by)
+        # Buildings with a value in sort order, then those without (always last)
+        head, tail = order[:valid], order[valid:]
+        if min_value is not None or max_value is not None:
+            # Restrict to the value range with binary search; missing values are out of range
+            start = 0 if min_value is None else int(np.searchsorted(values[:valid], min_value, side="left"))
+            end = valid if max_value is None else int(np.searchsorted(values[:valid], max_value, side="right"))
+            head, tail = head[start:end], tail[:0]
+        if descending and sort_by is not None:
+            head = head[::-1]
+        order = np.concatenate((head, tail))
+
+        total = len(order)
+        offset = max(offset, 0)
+        selected = order[offset:offset + limit]
+        next_offset = offset + limit if offset + limit < total else None
+        return {
+            "result_id": result_id,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "sort_by": sort_by,
+            "descending": descending,
+            "next_offset": next_offset,
+            "buildings": [entry.buildings[i] for i in selected],
+        }
+
+
+# Global instance for convenience
+result_store = ResultStore()
@@ -0,0 +1,67 @@
+"""
+Spatial index over building centroids.
+
+Wraps shapely's STRtree so that radius queries are answered in a single bulk
+call instead of one shapely predicate per building. Used by the radius
+filter while the centroid grid is unavailable. All coordinates are expected
+in EPSG:25833 (meters).
+
+Query methods return positions into the sequence of points the index was
+built from, so callers can map them back to their own building lists.
+"""
+
+from typing import Sequence, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Point
+
+from .geometry import distances_to
+
+
+class SpatialIndex:
+    """STRtree-backed index over building centroid points."""
+
+    def __init__(self, points: Sequence[Optional[Point]]):
+        """
+        Build the index.
+
+        Args:
+            points: Centroid points, one per building. Entries may be None for
+                buildings without a usable geometry; they are never returned.
+        """
+        self._points = np.empty(len(points), dtype=object)
+        self._points[:] = list(points)
+        self._tree = STRtree(self._points)
+        self._valid_count = int(np.count_nonzero(~shapely.is_missing(self._points)))
+
+    def __len__(self) -> int:
+        """Number of indexed (non-missing) points."""
+        return self._valid_count
+
+    @property
+    def points(self) -> np.ndarray:
+        """Array of indexed points (None for missing geometries)."""
+        return self._points
+
+    def query_radius(self, point: Point, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find all points within a distance of a reference point.
+
+        Args:
+            point: Reference point
+            radius: Maximum distance in meters (inclusive)
+
+        Returns:
+            Tuple of (positions, distances), sorted by ascending distance
+        """
+        positions = self._tree.query(point, predicate="dwithin", distance=radius)
+        return self._sorted_by_distance(positions, point)
+
+    def _sorted_by_distance(self, positions: np.ndarray, point: Point) -> Tuple[np.ndarray, np.ndarray]:
+        """Compute distances for candidate positions and sort them (ties by position)."""
+        distances = distances_to(self._points[positions], point)
+        order = np.lexsort((positions, distances))
+        return positions[order], distances[order]
+
@@ -0,0 +1,186 @@
+"""
+Rule-based parser for the spatial intent of point-filter queries.
+
+Recognizes the common German and English phrasings of "nearest N" and
+"radius X m/km" ("die 5 nächsten Schulen", "im Umkreis von 3 km",
+"within 500m", "the 3 closest hospitals") without an LLM round trip.
+
+The parser is deliberately conservative: it only answers when exactly one
+reading is possible and returns None otherwise (no cue, conflicting cues,
+several candidate distances, nearest without an explicit count), so the
+caller can fall back to the spatial_filter_mode LLM prompt.
+"""
+
+from typing import Any, Dict, List, Optional
+import re
+
+DEFAULT_RADIUS_METERS = 500
+
+_NUMBER_WORDS = {
+    # German
+    "zwei": 2, "drei": 3, "vier": 4, "fünf": 5, "sechs": 6, "sieben": 7,
+    "acht": 8, "neun": 9, "zehn": 10, "elf": 11, "zwölf": 12, "fünfzehn": 15,
+    "zwanzig": 20, "dreißig": 30, "fünfzig": 50, "hundert": 100,
+    # English
+    "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15,
+    "twenty": 20, "thirty": 30, "fifty": 50, "hundred": 100,
+}
+
+_NUMBER = r"\d+(?:[.,]\d+)?"
+# Whole digit counts incl. separators ("1.000", "2,500", but also "1.5"), never part of a longer number
+_DIGIT_COUNT = r"(?<!\d)(?<!\d[.,])\d+(?:[.,]\d+)*(?![.,]?\d)"
+_COUNT = r"(?:" + _DIGIT_COUNT + "|" + "|".join(sorted(_NUMBER_WORDS, key=len, reverse=True)) + r")"
+_THOUSANDS = re.compile(r"\d+(?:[.,]\d{3})+")
+_NEAREST_WORD = r"(?:nächst\w*|naheste\w*|nearest|closest)"
+
+# "500 m", "1,5 km", "2 Kilometern" - but not areas ("500 m²")
+_DISTANCE_PATTERN = re.compile(
+    r"(?<![\w.,])(" + _NUMBER + r")\s*(km|kilomet(?:er|re)\w*|m|met(?:er|re)\w*)(?![\w²³])",
+    re.IGNORECASE,
+)
+# "die 5 nächsten", "the five closest", "5 nearest", "nearest 5", "die nächsten 5"
+_NEAREST_COUNT_PATTERNS = [
+    re.compile(r"\b(" + _COUNT + r")\s+(?:\w+\s+)?" + _NEAREST_WORD + r"\b", re.IGNORECASE),
+    re.compile(r"\b" + _NEAREST_WORD + r"\s+(" + _COUNT + r")\b", re.IGNORECASE),
+]
+_NEAREST_CUE = re.compile(r"\b(?:" + _NEAREST_WORD + r"|nächstgelegen\w*|am nächsten)\b", re.IGNORECASE)
+# Radius cues that precede ("im Umkreis von 3 km") or follow ("500 m entfernt") the distance
+# ("bis zu" / "up to" / "around" also bound heights and sizes, so they are no cue on their own)
+_RADIUS_CUE_BEFORE = re.compile(
+    r"\b(?:umkreis|radius|innerhalb|within|entfernung|abstand|distanz|distance|rund um)\b",
+    re.IGNORECASE,
+)
+_RADIUS_CUE_AFTER = re.compile(r"^\W*(?:\w+\W+)?(?:entfernt|away)\b", re.IGNORECASE)
+_RADIUS_ONLY_CUE = re.compile(r"\b(?:umkreis|radius)\b", re.IGNORECASE)
+# Per-function nearest: a group word right before a function noun ("pro Gebäudetyp",
+# "of each type") or "jeweils" right before the count ("die jeweils 3 nächsten")
+_GROUP_WORD = r"(?:jeweils|je|pro|each|per|for every|for each|of each)"
+_PER_FUNCTION_CUE = re.compile(
+    r"\b" + _GROUP_WORD + r"\s+(?:\w+\s+)?(?:\w*funktion|\w*typ|(?:gebäude|nutzungs)?art|kategorie|nutzung|"
+    r"function|type|kind|category)\w*\b",
+    re.IGNORECASE,
+)
+_PER_GROUP_COUNT = re.compile(r"\bjeweils\s+(?:die\s+|the\s+)?" + _COUNT + r"\b", re.IGNORECASE)
+_GROUP_WORD_CUE = re.compile(r"\b" + _GROUP_WORD + r"\b", re.IGNORECASE)
+
+# How far (in characters) a radius cue may precede / follow a distance quantity
+_CUE_WINDOW_BEFORE = 40
+_CUE_WINDOW_AFTER = 20
+
+# Distance ranges ("3-5 km", "von 3 bis 5 km") have no single radius
+_RANGE_BEFORE = re.compile(r"\d\s*(?:[-–]|bis|to)\s*$", re.IGNORECASE)
+
+
+def _to_number(text: str) -> float:
+    """Parse '1,5' / '1.5' as decimals and '1.000' / '1,000' / '1.000.000' as thousands."""
+    if _THOUSANDS.fullmatch(text):
+        return float(re.sub(r"[.,]", "", text))
+    return float(text.replace(",", "."))
+
+
+def _count_value(token: str) -> Optional[int]:
+    """Convert a count token (digits or number word) to an int; None for decimals ('1.5')."""
+    token = token.lower()
+    if token in _NUMBER_WORDS:
+        return _NUMBER_WORDS[token]
+    if token.isdigit() or _THOUSANDS.fullmatch(token):
+        return int(_to_number(token))
+    return None
+
+
+def _radius_distances(query: str) -> Optional[List[float]]:
+    """Distances in meters that are close to a radius cue; None if one is given as a range."""
+    distances = []
+    for match in _DISTANCE_PATTERN.finditer(query):
+        before = query[max(match.start() - _CUE_WINDOW_BEFORE, 0):match.start()]
+        after = query[match.end():match.end() + _CUE_WINDOW_AFTER]
+        if not (_RADIUS_CUE_BEFORE.search(before) or _RADIUS_CUE_AFTER.search(after)):
+            continue
+        if _RANGE_BEFORE.search(before):
+            return None
+        value = _to_number(match.group(1))
+        if match.group(2).lower().startswith("k"):
+            value *= 1000
+        distances.append(value)
+    return distances
+
+
+def _per_function(query: str) -> Optional[bool]:
+    """
+    Whether "nearest X" applies to each building function separately.
+
+    Returns:
+        True for a per-function cue, False without any group word, None if a
+        group word is used otherwise ("Wohnungen pro Gebäude") and the
+        reading is unclear
+    """
+    if _PER_FUNCTION_CUE.search(query) or _PER_GROUP_COUNT.search(query):
+        return True
+    if _GROUP_WORD_CUE.search(query):
+        return None
+    return False
+
+
+def parse_point_filter_mode(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Determine 'nearest X' or 'radius X' from the query text with rules.
+
+    Args:
+        query: User's original query
+
+    Returns:
+        Dict in the format of determine_point_filter_mode ('mode', 'value',
+        'per_function', 'reasoning'), or None if the query is ambiguous
+    """
+    if not query:
+        return None
+
+    distances = _radius_distances(query)
+    counts = {
+        _count_value(match.group(1))
+        for pattern in _NEAREST_COUNT_PATTERNS
+        for match in pattern.finditer(query)
+    }
+    if distances is None or None in counts:
+        # Distance range or decimal count - let the LLM decide
+        return None
+    distances = sorted(set(distances))
+    counts = sorted(counts)
+    has_nearest_cue = bool(_NEAREST_CUE.search(query))
+
+    if distances and (counts or has_nearest_cue):
+        # "die 5 nächsten Schulen im Umkreis von 1 km" - let the LLM decide
+        return None
+
+    if distances:
+        if len(distances) != 1 or distances[0] <= 0:
+            return None
+        radius = distances[0]
+        return {
+            "mode": "radius",
+            "value": int(radius) if radius.is_integer() else radius,
+            "per_function": False,
+            "reasoning": f"Rule-based: radius of {radius:g}m in query"
+        }
+
+    if counts:
+        per_function = _per_function(query)
+        if len(counts) != 1 or counts[0] <= 0 or per_function is None:
+            return None
+        return {
+            "mode": "nearest",
+            "value": counts[0],
+            "per_function": per_function,
+            "reasoning": f"Rule-based: nearest {counts[0]} buildings in query"
+        }
+
+    if _RADIUS_ONLY_CUE.search(query) and not has_nearest_cue:
+        return {
+            "mode": "radius",
+            "value": DEFAULT_RADIUS_METERS,
+            "per_function": False,
+            "reasoning": f"Rule-based: radius without distance, default {DEFAULT_RADIUS_METERS}m"
+        }
+
+    return None
@@ -0,0 +1,232 @@
+"""
+Process-wide cache of the precomputed statistics cube.
+
+data_import/statistics_cube.py materializes one (:StatisticsCell) node per
+(district, function code) with mergeable summaries: counts, sums, sums of
+squares, min/max, exact floors histograms and a 101-point area quantile
+summary. Statistics for any selection of districts and function codes are
+obtained by merging the matching cells, without touching a single building:
+
+- count, sum, mean, std, min, max: merged moments
+- floors percentiles/histograms: merged exact histograms
+- area percentiles/histogram: mixture of the cells' quantile summaries
+  (exact for a single cell, close approximation for several)
+
+The cube is only used while it was built for the current dataset version;
+like the other caches it is warmed at API startup and reloaded when the
+dataset version stamp changes.
+"""
+
+from typing import Dict, Any, List, Optional
+from collections import Counter
+import threading
+
+import numpy as np
+
+from .building_stats import histogram_percentiles, PERCENTILES, AREA_HISTOGRAM_BINS
+from .neo4j_client import neo4j_client
+from .data_version import data_version_tracker
+
+# Number of quantile points per cell (p0 ... p100) written by the import script
+QUANTILE_POINTS = 101
+
+
+class _CubeState:
+    """Immutable snapshot of the cube cells (swapped atomically)."""
+
+    def __init__(self, cells: List[Dict[str, Any]], version: Optional[int]):
+        self.cells = cells
+        self.version = version
+
+
+def _merge_moments(cells: List[Dict[str, Any]], column: str, integer: bool, decimals: int) -> Dict[str, Any]:
+    """count/sum/mean/std/min/max of a column from the cells' moments."""
+    cells = [cell for cell in cells if cell.get(f"{column}_count")]
+    count = sum(cell[f"{column}_count"] for cell in cells)
+    if not count:
+        return {}
+
+    total = sum(cell[f"{column}_sum"] for cell in cells)
+    mean = total / count
+    variance = max(sum(cell[f"{column}_sumsq"] for cell in cells) / count - mean * mean, 0.0)
+    cast = int if integer else (lambda value: round(float(value), decimals))
+    return {
+        "count": count,
+        "sum": cast(total),
+        "mean": round(mean, decimals),
+        "std": round(float(np.sqrt(variance)), decimals),
+        "min": cast(min(cell[f"{column}_min"] for cell in cells)),
+        "max": cast(max(cell[f"{column}_max"] for cell in cells)),
+    }
+
+
+def _merge_histograms(cells: List[Dict[str, Any]], column: str) -> Dict[int, int]:
+    """Sum the cells' exact {value: count} histograms."""
+    counts: Counter = Counter()
+    for cell in cells:
+        counts.update(dict(zip(cell.get(f"{column}_values") or [], cell.get(f"{column}_counts") or [])))
+    return {int(value): int(count) for value, count in sorted(counts.items())}
+
+
+def _mixture_cdf(cells: List[Dict[str, Any]], points: np.ndarray) -> np.ndarray:
+    """Fraction of values <= points under the count-weighted mixture of the cells' quantile summaries."""
+    levels = np.linspace(0.0, 1.0, QUANTILE_POINTS)
+    weighted = np.zeros(len(points))
+    total = 0
+    for cell in cells:
+        quantiles = np.asarray(cell["area_quantiles"], dtype=np.float64)
+        weighted += cell["area_count"] * np.interp(points, quantiles, levels, left=0.0, right=1.0)
+        total += cell["area_count"]
+    return weighted / total
+
+
+def _area_distribution(cells: List[Dict[str, Any]], minimum: float, maximum: float, decimals: int) -> Dict[str, Any]:
+    """Area percentiles and equal-width histogram from the cells' quantile summaries."""
+    cells = [cell for cell in cells if cell.get("area_count") and cell.get("area_quantiles")]
+    if not cells:
+        return {}
+
+    stats: Dict[str, Any] = {}
+    if len(cells) == 1:
+        quantiles = np.asarray(cells[0]["area_quantiles"], dtype=np.float64)
+        levels = np.linspace(0.0, 100.0, QUANTILE_POINTS)
+        percentiles = np.interp(PERCENTILES, levels, quantiles)
+    else:
+        grid = np.unique(np.concatenate([cell["area_quantiles"] for cell in cells]))
+        cdf = _mixture_cdf(cells, grid)
+        percentiles = np.interp(np.array(PERCENTILES) / 100, cdf, grid)
+    for q, value in zip(PERCENTILES, percentiles):
+        stats[f"p{q}"] = round(float(value), decimals)
+
+    count = sum(cell["area_count"] for cell in cells)
+    edges = np.linspace(minimum, maximum, AREA_HISTOGRAM_BINS + 1)
+    cdf = _mixture_cdf(cells, edges)
+    cdf[0], cdf[-1] = 0.0, 1.0
+    stats["histogram"] = {
+        "bin_edges": [round(float(edge), decimals) for edge in edges],
+        "counts": np.rint(np.diff(cdf) * count).astype(np.int64).tolist(),
+    }
+    return stats
+
+
+class StatisticsCube:
+    """In-memory copy of the statistics cube cells."""
+
+    _instance: Optional["StatisticsCube"] = None
+
+    def __new__(cls):
+        """Singleton pattern so all nodes share one cube."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._state = None
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether a current cube is loaded."""
+        state = self._state
+        return state is not None and bool(state.cells)
+
+    def __len__(self) -> int:
+        state = self._state
+        return len(state.cells) if state else 0
+
+    def load(self, cells: List[Dict[str, Any]], version: Optional[int] = None) -> int:
+        """
+        Replace the cube contents.
+
+        Returns:
+            Number of cells
+        """
+        self._state = _CubeState(list(cells), version)
+        return len(self)
+
+    def warm(self) -> int:
+        """
+        Load the cube cells from Neo4j (none if the cube is missing or outdated).
+
+        Returns:
+            Number of cells
+        """
+        with self._lock:
+            version = data_version_tracker.current(force=True)
+            return self.load(neo4j_client.get_statistics_cube(), version)
+
+    def invalidate(self):
+        """Drop the loaded cube."""
+        self._state = None
+
+    def ensure_current(self) -> bool:
+        """
+        Reload the cube if the dataset changed since it was loaded.
+
+        Returns:
+            True if a current cube is loaded after the check
+        """
+        state = self._state
+        if state is None:
+            return False
+
+        if data_version_tracker.current() != state.version:
+            self.invalidate()
+            try:
+                self.warm()
+            except Exception as e:
+                print(f"Statistics cube reload failed: {e}")
+        return self.is_warm
+
+    def statistics(self, selection: Dict[str, Any], decimals: int = 2) -> Optional[Dict[str, Any]]:
+        """
+        Statistics of the buildings selected by district and function.
+
+        Args:
+            selection: Dict from cypher_rewrite.building_selection ('districts',
+                'function_codes', 'require_district', 'require_function');
+                function groups are rolled up by listing all their codes
+                (function_hierarchy.expand)
+
+        Returns:
+            Statistics dict with the keys of statistics_calculation (house
+            numbers: min/max, area histogram approximated), or None if no
+            current cube is loaded
+        """
+        state = self._state
+        if state is None or not state.cells:
+            return None
+
+        districts = selection.get("districts")
+        codes = selection.get("function_codes")
+        cells = [
+            cell for cell in state.cells
+            if (districts is None or cell.get("district") in districts)
+            and (codes is None or cell.get("function_code") in codes)
+            and not (selection.get("require_district") and cell.get("district") is None)
+            and not (selection.get("require_function") and cell.get("function_code") is None)
+        ]
+
+        stats: Dict[str, Any] = {}
+        area = _merge_moments(cells, "area", integer=False, decimals=decimals)
+        if area:
+            area.update(_area_distribution(cells, area["min"], area["max"], decimals))
+        stats.update({f"area_{name}": value for name, value in area.items()})
+
+        for column in ("floors_above", "floors_below"):
+            floors = _merge_moments(cells, column, integer=True, decimals=decimals)
+            if floors:
+                histogram = _merge_histograms(cells, column)
+                floors.update(histogram_percentiles(histogram, decimals))
+                floors["histogram"] = histogram
+            stats.update({f"{column}_{name}": value for name, value in floors.items()})
+
+        house_numbers = [cell for cell in cells if cell.get("house_number_min") is not None]
+        if house_numbers:
+            stats["house_number_min"] = min(cell["house_number_min"] for cell in house_numbers)
+            stats["house_number_max"] = max(cell["house_number_max"] for cell in house_numbers)
+
+        stats["building_count"] = sum(cell.get("building_count", 0) for cell in cells)
+        return stats
+
+
+# Global instance for convenience
+statistics_cube = StatisticsCube()
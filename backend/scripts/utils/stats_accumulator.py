@@ -0,0 +1,252 @@
+"""
+Mergeable statistics accumulators for chunked and parallel processing.
+
+Buildings can be fed in chunks (e.g. while records stream from Neo4j) or
+accumulated independently in parallel workers and merged afterwards; the
+result has the same flat "<column>_<stat>" keys for every chunking.
+
+- Moments: count, sum, min, max and Welford mean/M2 (merged with Chan's
+  parallel formula), so mean and standard deviation need no stored values
+- Integer columns (floors): exact {value: count} histograms, percentiles are
+  interpolated from them
+- Float columns (area): KLL quantile sketch. It stays exact (plain
+  np.percentile) until more than QUANTILE_SKETCH_K values were added and then
+  uses O(k log n) memory with a rank error of roughly 1/k
+"""
+
+from typing import Dict, Any, List, Optional, Sequence
+from collections import Counter
+
+import numpy as np
+
+from ..config import QUANTILE_SKETCH_K
+from .building_stats import (
+    building_columns, histogram_percentiles, COLUMNS, INTEGER_COLUMNS,
+    RANGE_ONLY_COLUMNS, PERCENTILES, AREA_HISTOGRAM_BINS
+)
+
+
+class Moments:
+    """Count, sum, min, max, mean and M2 of a stream of values."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray):
+        """Add a batch of values (NaN values are ignored)."""
+        valid = values[~np.isnan(values)]
+        if len(valid) == 0:
+            return
+        batch = Moments()
+        batch.count = len(valid)
+        batch.sum = float(valid.sum())
+        batch.mean = float(valid.mean())
+        batch.m2 = float(((valid - batch.mean) ** 2).sum())
+        batch.min = float(valid.min())
+        batch.max = float(valid.max())
+        self.merge(batch)
+
+    def merge(self, other: "Moments"):
+        """Combine with another accumulator (Chan et al. parallel update)."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation."""
+        return float(np.sqrt(self.m2 / self.count)) if self.count else 0.0
+
+
+class QuantileSketch:
+    """KLL sketch: levels of sorted-and-halved samples, level i has weight 2**i."""
+
+    def __init__(self, k: int = QUANTILE_SKETCH_K, seed: Optional[int] = None):
+        self.k = k
+        self.count = 0
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def is_exact(self) -> bool:
+        """Whether all values are still stored (nothing was compacted)."""
+        return len(self._levels) == 1
+
+    def _capacity(self, level: int) -> int:
+        """Capacity of a level; lower levels shrink geometrically."""
+        depth = len(self._levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values: np.ndarray):
+        """Add a batch of values (NaN values are ignored)."""
+        valid = values[~np.isnan(values)]
+        self.count += len(valid)
+        self._levels[0] = np.concatenate((self._levels[0], valid))
+        self._compress()
+
+    def merge(self, other: "QuantileSketch"):
+        """Combine with another sketch level by level."""
+        for level, items in enumerate(other._levels):
+            if level == len(self._levels):
+                self._levels.append(np.empty(0))
+            self._levels[level] = np.concatenate((self._levels[level], items))
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        """Halve every over-full level: sort, keep every other item (random offset) one level up."""
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item stays on its level so no weight is lost
+                odd = len(items) % 2
+                promoted = items[odd:][self._rng.integers(2)::2]
+                self._levels[level + 1] = np.concatenate((self._levels[level + 1], promoted))
+                self._levels[level] = items[:odd]
+            level += 1
+
+    def _weighted(self):
+        """All retained items sorted, with their weights."""
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** i) for i, level in enumerate(self._levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def quantiles(self, percentiles: Sequence[float]) -> np.ndarray:
+        """Percentiles (0-100); exact (np.percentile) while nothing was compacted."""
+        if self.is_exact:
+            return np.percentile(self._levels[0], percentiles)
+        items, weights = self._weighted()
+        cumulative = np.cumsum(weights)
+        ranks = np.asarray(percentiles, dtype=np.float64) / 100 * cumulative[-1]
+        return items[np.minimum(np.searchsorted(cumulative, ranks), len(items) - 1)]
+
+    def histogram(self, bins: int, value_range: tuple) -> tuple:
+        """Equal-width histogram (counts scaled to the total count) and bin edges."""
+        if self.is_exact:
+            return np.histogram(self._levels[0], bins=bins, range=value_range)
+        items, weights = self._weighted()
+        counts, edges = np.histogram(items, bins=bins, range=value_range, weights=weights)
+        return np.rint(counts * self.count / weights.sum()).astype(np.int64), edges
+
+
+class ColumnAccumulator:
+    """Mergeable statistics of one building column."""
+
+    def __init__(self, column: str, k: int = QUANTILE_SKETCH_K):
+        self.column = column
+        self.moments = Moments()
+        self.value_counts: Optional[Counter] = Counter() if column in INTEGER_COLUMNS else None
+        self.sketch: Optional[QuantileSketch] = None
+        if column not in INTEGER_COLUMNS and column not in RANGE_ONLY_COLUMNS:
+            self.sketch = QuantileSketch(k)
+
+    def update(self, values: np.ndarray):
+        """Add a batch of column values (NaN = missing)."""
+        self.moments.update(values)
+        if self.value_counts is not None:
+            unique, counts = np.unique(values[~np.isnan(values)].astype(np.int64), return_counts=True)
+            self.value_counts.update(dict(zip(unique.tolist(), counts.tolist())))
+        if self.sketch is not None:
+            self.sketch.update(values)
+
+    def merge(self, other: "ColumnAccumulator"):
+        """Combine with the accumulator of the same column from another chunk/worker."""
+        self.moments.merge(other.moments)
+        if self.value_counts is not None:
+            self.value_counts.update(other.value_counts)
+        if self.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+    def result(self, decimals: int = 2) -> Dict[str, Any]:
+        """Count, sum, mean, std, min, max, p<q> percentiles and histogram (empty if no values)."""
+        moments = self.moments
+        if moments.count == 0:
+            return {}
+
+        integer = self.column in INTEGER_COLUMNS or self.column in RANGE_ONLY_COLUMNS
+        cast = int if integer else (lambda value: round(float(value), decimals))
+        if self.column in RANGE_ONLY_COLUMNS:
+            return {"min": cast(moments.min), "max": cast(moments.max)}
+
+        stats: Dict[str, Any] = {
+            "count": moments.count,
+            "sum": cast(moments.sum),
+            "mean": round(moments.mean, decimals),
+            "std": round(moments.std, decimals),
+            "min": cast(moments.min),
+            "max": cast(moments.max),
+        }
+        if self.value_counts is not None:
+            counts = {value: count for value, count in sorted(self.value_counts.items())}
+            stats.update(histogram_percentiles(counts, decimals))
+            stats["histogram"] = counts
+        else:
+            for q, value in zip(PERCENTILES, self.sketch.quantiles(PERCENTILES)):
+                stats[f"p{q}"] = round(float(value), decimals)
+            counts, edges = self.sketch.histogram(AREA_HISTOGRAM_BINS, (moments.min, moments.max))
+            stats["histogram"] = {
+                "bin_edges": [round(float(edge), decimals) for edge in edges],
+                "counts": counts.tolist(),
+            }
+        return stats
+
+
+class BuildingStatsAccumulator:
+    """
+    Mergeable building statistics over chunks of buildings.
+
+    Example:
+        accumulator = BuildingStatsAccumulator()
+        for chunk in chunks:
+            accumulator.update(chunk)
+        statistics = accumulator.result()
+    """
+
+    def __init__(self, columns: Optional[Sequence[str]] = None, k: int = QUANTILE_SKETCH_K):
+        self.columns = tuple(columns or COLUMNS)
+        self.building_count = 0
+        self._accumulators = {column: ColumnAccumulator(column, k) for column in self.columns}
+
+    def update(self, buildings: List[Dict[str, Any]]):
+        """Add a chunk of buildings; the chunk is not referenced afterwards."""
+        self.building_count += len(buildings)
+        if not buildings:
+            return
+        for column, values in building_columns(buildings, self.columns).items():
+            self._accumulators[column].update(values)
+
+    def merge(self, other: "BuildingStatsAccumulator") -> "BuildingStatsAccumulator":
+        """Combine with an accumulator over other buildings (same columns)."""
+        self.building_count += other.building_count
+        for column, accumulator in self._accumulators.items():
+            accumulator.merge(other._accumulators[column])
+        return self
+
+    def result(self, decimals: int = 2) -> Dict[str, Any]:
+        """
+        Flat statistics ("<column>_<stat>", "<column>_histogram"); house numbers only get min/max.
+
+        Returns:
+            Statistics dict without building_count (see the building_count attribute)
+        """
+        stats: Dict[str, Any] = {}
+        for column, accumulator in self._accumulators.items():
+            stats.update({f"{column}_{name}": value for name, value in accumulator.result(decimals).items()})
+        return stats
@@ -0,0 +1,50 @@
+"""
+Dataset version stamp shared with the backend caches.
+
+Every import script that modifies the database calls bump_data_version at the
+end. The backend compares the stamp against the version its in-memory caches
+were built from and reloads them when it changes.
+"""
+
+DATASET_NAME = "ax_ploration"
+
+
+def current_data_version(session):
+    """Return the current version stamp, creating the stamp if it does not exist yet."""
+    record = session.run(
+        """
+        MERGE (v:DatasetVersion {name: $name})
+        ON CREATE SET v.version = timestamp()
+        RETURN v.version AS version
+        """,
+        name=DATASET_NAME,
+    ).single()
+    return record["version"]
+
+
+def bump_data_version(session, cube_version=None, keep_cube=False):
+    """
+    Mark the dataset as modified by writing a new version stamp.
+
+    cube_version is the dataset version a statistics cube was computed
+    against. If the dataset is still at that version, the new stamp is also
+    recorded as the cube version in the same statement, so the backend never
+    sees the new version without the matching cube stamp. keep_cube does the
+    same for a cube that is current now; scripts that do not touch building
+    data (e.g. function embeddings) use it so the cube stays valid.
+    """
+    session.run(
+        """
+        MERGE (v:DatasetVersion {name: $name})
+        WITH v, timestamp() AS now
+        SET v.cube_version = CASE
+                WHEN v.version = $cube_version OR ($keep_cube AND v.cube_version = v.version) THEN now
+                ELSE v.cube_version
+            END,
+            v.version = now
+        """,
+        name=DATASET_NAME,
+        cube_version=cube_version,
+        keep_cube=keep_cube,
+    )
+    print("Dataset version updated")
@@ -1,8 +1,11 @@
 from neo4j import GraphDatabase
 import csv
 import os
+import re
 from dotenv import load_dotenv
 
+from data_version import bump_data_version
+
 load_dotenv()
 
 URI = os.getenv("NEO4J_URI")
@@ -22,15 +25,29 @@ driver = GraphDatabase.driver(
     connection_timeout=30
 )
 
+CENTROID_PATTERN = re.compile(r"\(\s*([-+\d.eE]+)\s+([-+\d.eE]+)\s*\)")
+
+
+def parse_centroid_xy(centroid):
+    """Parse x and y from a WKT point such as 'Point (388000.1 5819000.2)'."""
+    match = CENTROID_PATTERN.search(centroid or "")
+    if not match:
+        return None, None
+    return float(match.group(1)), float(match.group(2))
+
+
 # ---------------------
 # Batch insert functions
 # ---------------------
 def insert_buildings(tx, batch):
     for row in batch:
+        x, y = parse_centroid_xy(row.get("centroid"))
         tx.run("""
         MERGE (b:Building {id: $id})
         SET b.area = $area,
             b.centroid = $centroid,
+            b.location = CASE WHEN $x IS NULL THEN null
+                              ELSE point({x: $x, y: $y, crs: 'cartesian'}) END,
             b.floors_above = $floors_above,
             b.floors_below = $floors_below,
             b.street_name = $street_name,
@@ -42,6 +59,8 @@ def insert_buildings(tx, batch):
             "id": row.get("id"),
             "area": row.get("area"),
             "centroid": row.get("centroid"),
+            "x": x,
+            "y": y,
             "floors_above": int(row["floors_above"]) if row.get("floors_above") and row["floors_above"].strip() else None,
             "floors_below": int(row["floors_below"]) if row.get("floors_below") and row["floors_below"].strip() else None,
             "street_name": row.get("street_name"),
@@ -96,6 +115,26 @@ def create_constraints(tx):
     FOR (d:District)
     REQUIRE d.gml_id IS UNIQUE
     """)
+    tx.run("""
+    CREATE POINT INDEX building_location IF NOT EXISTS
+    FOR (b:Building)
+    ON (b.location)
+    """)
+
+
+def backfill_building_locations(session):
+    """Derive native point locations from centroid WKT for buildings imported without one."""
+    session.run("""
+    MATCH (b:Building)
+    WHERE b.location IS NULL AND b.centroid IS NOT NULL
+    CALL {
+        WITH b
+        WITH b, [v IN split(trim(replace(split(b.centroid, '(')[1], ')', '')), ' ') WHERE v <> ''] AS xy
+        WHERE size(xy) = 2
+        SET b.location = point({x: toFloat(xy[0]), y: toFloat(xy[1]), crs: 'cartesian'})
+    } IN TRANSACTIONS OF 5000 ROWS
+    """)
+    print("Building locations backfilled")
 
 
 def import_csv(session, path, insert_func, delimiter=",", max_rows=None):
@@ -124,12 +163,16 @@ def main():
         import_csv(session, buildings_path, insert_buildings)
         print("Buildings imported")
 
+        backfill_building_locations(session)
+
         import_csv(session, districts_path, insert_districts)
         print("Districts imported")
 
         import_csv(session, functions_path, insert_functions, delimiter=";")
         print("Functions imported")
 
+        bump_data_version(session)
+
     driver.close()
 
 if __name__ == "__main__":
@@ -23,6 +23,8 @@ from neo4j import GraphDatabase
 import os
 from dotenv import load_dotenv
 
+from data_version import bump_data_version
+
 load_dotenv()
 
 URI = os.getenv("NEO4J_URI")
@@ -158,6 +160,7 @@ def main():
         # delete_functions_hierarchy_relations(session)
         create_building_relations_from_csv(session, "buildings_for_neo4j.csv")
         # create_function_hierarchy_relations(session)
+        bump_data_version(session)
     driver.close()
 
 
@@ -0,0 +1,169 @@
+"""
+Materialize the building statistics cube.
+
+Aggregates all buildings per (district, function code) cell and stores one
+(:StatisticsCell) summary node per cell. The backend merges cells to
+districts, functions and function groups (function groups are expanded to
+their codes with the function hierarchy).
+
+Per cell and column (area, floors_above, floors_below):
+- count, sum, sum of squares, min, max (mergeable moments)
+- area: 101 quantile points (p0 ... p100) as a mergeable quantile summary
+- floors: exact {floors: count} histogram as two parallel lists
+- house_number (numeric part): min, max
+
+Run after neo4j_import.py and neo4j_relations.py. The cube is only used by
+the backend while the dataset version it was built for is current.
+"""
+
+from collections import defaultdict
+import os
+import re
+
+from neo4j import GraphDatabase
+from dotenv import load_dotenv
+
+from data_version import bump_data_version, current_data_version
+
+load_dotenv()
+
+URI = os.getenv("NEO4J_URI")
+USER = os.getenv("NEO4J_USER")
+PASSWORD = os.getenv("NEO4J_PASSWORD")
+
+BATCH_SIZE = 500
+QUANTILE_POINTS = 101
+
+driver = GraphDatabase.driver(
+    URI,
+    auth=(USER, PASSWORD),
+    max_connection_lifetime=600,
+    connection_timeout=30
+)
+
+
+def to_number(value, integer=False):
+    """Parse a property value; None for missing or invalid values."""
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if integer else number
+
+
+def house_number_value(value):
+    """Numeric part of a house number ("12a" -> 12)."""
+    match = re.search(r"\d+", str(value)) if value else None
+    return int(match.group()) if match else None
+
+
+def quantile_points(values):
+    """Percentiles 0..100 with linear interpolation (like numpy.percentile)."""
+    ordered = sorted(values)
+    points = []
+    for i in range(QUANTILE_POINTS):
+        rank = i / (QUANTILE_POINTS - 1) * (len(ordered) - 1)
+        low = int(rank)
+        high = min(low + 1, len(ordered) - 1)
+        points.append(ordered[low] + (rank - low) * (ordered[high] - ordered[low]))
+    return points
+
+
+def summarize(values, prefix):
+    """Mergeable moments of one column as cell properties."""
+    if not values:
+        return {f"{prefix}_count": 0}
+    return {
+        f"{prefix}_count": len(values),
+        f"{prefix}_sum": float(sum(values)),
+        f"{prefix}_sumsq": float(sum(value * value for value in values)),
+        f"{prefix}_min": min(values),
+        f"{prefix}_max": max(values),
+    }
+
+
+def build_cells(session):
+    """Read all buildings with district and function and aggregate them per cell."""
+    result = session.run(
+        """
+        MATCH (b:Building)
+        OPTIONAL MATCH (b)-[:IN_DISTRICT]->(d:District)
+        OPTIONAL MATCH (b)-[:HAS_FUNCTION]->(f:Function)
+        WITH b, head(collect(DISTINCT d.Gemeinde_name)) AS district,
+             head(collect(DISTINCT f.code)) AS function_code
+        RETURN district, function_code,
+               b.area AS area, b.floors_above AS floors_above,
+               b.floors_below AS floors_below, b.house_number AS house_number
+        """
+    )
+
+    groups = defaultdict(lambda: defaultdict(list))
+    for record in result:
+        group = groups[(record["district"], record["function_code"])]
+        group["buildings"].append(1)
+        for column, integer in (("area", False), ("floors_above", True), ("floors_below", True)):
+            value = to_number(record[column], integer)
+            if value is not None:
+                group[column].append(value)
+        house_number = house_number_value(record["house_number"])
+        if house_number is not None:
+            group["house_number"].append(house_number)
+
+    cells = []
+    for (district, function_code), group in groups.items():
+        cell = {
+            "district": district,
+            "function_code": function_code,
+            "building_count": len(group["buildings"]),
+        }
+        cell.update(summarize(group["area"], "area"))
+        if group["area"]:
+            cell["area_quantiles"] = quantile_points(group["area"])
+        for column in ("floors_above", "floors_below"):
+            cell.update(summarize(group[column], column))
+            histogram = defaultdict(int)
+            for value in group[column]:
+                histogram[value] += 1
+            cell[f"{column}_values"] = sorted(histogram)
+            cell[f"{column}_counts"] = [histogram[value] for value in sorted(histogram)]
+        if group["house_number"]:
+            cell["house_number_min"] = min(group["house_number"])
+            cell["house_number_max"] = max(group["house_number"])
+        # Neo4j does not store null properties
+        cells.append({key: value for key, value in cell.items() if value is not None})
+    return cells
+
+
+def write_cells(tx, batch):
+    tx.run(
+        """
+        UNWIND $cells AS cell
+        CREATE (c:StatisticsCell)
+        SET c = cell
+        """,
+        cells=batch,
+    )
+
+
+def main():
+    with driver.session() as session:
+        # Version the cube is computed against; it is only marked current if no
+        # import modified the dataset in the meantime
+        version = current_data_version(session)
+        cells = build_cells(session)
+        print("Aggregated", sum(cell["building_count"] for cell in cells), "buildings into", len(cells), "cells")
+
+        session.run("MATCH (c:StatisticsCell) DETACH DELETE c")
+        for start in range(0, len(cells), BATCH_SIZE):
+            session.execute_write(write_cells, cells[start:start + BATCH_SIZE])
+        print("Statistics cube written")
+
+        bump_data_version(session, cube_version=version)
+
+    driver.close()
+
+
+if __name__ == "__main__":
+    main()
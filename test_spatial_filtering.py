@@ -13,8 +13,45 @@ from backend.scripts.nodes.spatial_filtering import (
     extract_buildings_list,
     filter_by_polygon,
     filter_by_nearest,
-    filter_by_radius
+    filter_by_radius,
+    filter_by_footprint,
+    region_aggregates,
+    stream_spatial_filter,
+    build_spatial_index
 )
+from backend.scripts.utils.geometry import parse_building_points
+from backend.scripts.utils.centroid_cache import centroid_cache
+from backend.scripts.utils.footprint_cache import footprint_cache, attach_footprint_geojson
+from backend.scripts.utils.cypher_rewrite import (
+    inject_building_predicate, return_building_rows, return_aggregates, building_selection, project_buildings
+)
+from backend.scripts.utils.neo4j_client import neo4j_client, async_neo4j_client, transaction_config, RowLimitExceeded
+from backend.scripts.config import NEO4J_BULK_TIMEOUT, NEO4J_MAX_ROWS
+from backend.scripts.utils.statistics_cube import statistics_cube
+from backend.scripts.utils.result_store import result_store
+from backend.scripts.utils.query_cache import query_cache, normalize_cypher, cache_key
+from backend.scripts.utils.data_version import data_version_tracker
+from backend.scripts.utils.function_index import function_index, select_scores
+from backend.scripts.utils.lexical_index import lexical_index, tokenize
+from backend.scripts.utils.function_hierarchy import function_hierarchy, parent_code
+from backend.scripts.nodes.cypher_generation import generate_cypher_district
+from backend.scripts.utils.embedding_cache import embedding_cache, normalize_text
+from backend.scripts.utils.llm_client import llm_client
+from backend.scripts.utils.embedding_providers import EmbeddingProvider, OpenAIEmbeddingProvider
+from backend.scripts.nodes.embedding_search import embedding_search
+import tempfile
+import os
+from contextlib import contextmanager
+from backend.scripts.utils.building_stats import statistics_from_record, building_columns, floor_bands, group_statistics
+from backend.scripts.utils.spatial_intent import parse_point_filter_mode
+from backend.scripts.utils.grid_index import GridIndex
+from backend.scripts.utils.stats_accumulator import BuildingStatsAccumulator, QuantileSketch
+from backend.scripts.nodes.statistics_calculation import calculate_building_statistics
+from backend.scripts.utils.knn import k_nearest, k_nearest_per_group
+from backend.scripts.nodes.spatial_prefilter import spatial_prefilter, _location_support
+from backend.scripts.nodes.data_retrieval import execute_query, aexecute_query
+import asyncio
+import numpy as np
 from shapely import wkt
 from shapely.geometry import Point
 
@@ -62,6 +99,25 @@ def test_parse_geometry():
     print("✓ Geometry parsing test complete")
 
 
+def test_parse_geometry_batch():
+    """Test vectorized batch parsing with invalid geometries masked out."""
+    print("\n=== Test: Batch Geometry Parsing ===")
+    
+    batch = test_buildings[:2] + [
+        {"id": "CENTROID", "centroid": "Point (388000 5819000)"},
+        {"id": "GEOJSON", "geometry_geojson": '{"type": "Polygon", "coordinates": [[[0, 0], [2, 0], [2, 2], [0, 2], [0, 0]]]}'},
+        {"id": "BROKEN", "centroid": "Point (garbage)", "geometry_geojson": "{not json"},
+        {"id": "EMPTY"},
+    ]
+    points, valid = parse_building_points(batch)
+    print(f"Valid mask: {list(valid)}")
+    
+    assert list(valid) == [True, True, True, True, False, False], "Invalid geometries should be masked, not raised"
+    assert points[3].equals(Point(1, 1)), "Polygon footprints should fall back to their centroid"
+    assert points[4] is None and points[5] is None
+    print("✓ Batch geometry parsing test passed")
+
+
 def test_polygon_filtering():
     """Test polygon containment filtering."""
     print("\n=== Test: Polygon Filtering ===")
@@ -97,6 +153,42 @@ def test_nearest_filtering():
     print("✓ Nearest buildings test passed")
 
 
+def test_knn_engine():
+    """Test argpartition kNN against a full sort, including per-group mode."""
+    print("\n=== Test: kNN Engine ===")
+    import numpy as np
+    
+    rng = np.random.default_rng(42)
+    xy = rng.uniform(0, 1000, size=(5000, 2))
+    xy[::7] = np.nan  # missing geometries
+    origin = (500.0, 500.0)
+    
+    positions, distances = k_nearest(xy, origin, 25)
+    brute = np.hypot(xy[:, 0] - origin[0], xy[:, 1] - origin[1])
+    expected = np.argsort(np.where(np.isnan(brute), np.inf, brute), kind="stable")[:25]
+    assert list(positions) == list(expected), "kNN must match a full sort"
+    assert np.allclose(distances, brute[expected])
+    
+    groups = [i % 3 for i in range(len(xy))]
+    positions, _ = k_nearest_per_group(xy, groups, origin, 4)
+    full_order = np.argsort(np.where(np.isnan(brute), np.inf, brute), kind="stable")
+    for group in range(3):
+        members = [p for p in positions if groups[p] == group]
+        expected_members = [i for i in full_order if groups[i] == group][:4]
+        assert members == expected_members, f"Wrong winners in group {group}"
+    
+    # Ties at the k-th distance are resolved by position; groups smaller than k are kept whole
+    tied = np.array([[1.0, 0.0], [0.0, 1.0], [-1.0, 0.0], [0.0, -1.0], [2.0, 0.0], [5.0, 5.0]])
+    positions, distances = k_nearest_per_group(tied, ["a", "a", "a", "a", "a", "b"], (0.0, 0.0), 2)
+    assert list(positions) == [0, 1, 5] and np.allclose(distances, [1.0, 1.0, np.hypot(5, 5)])
+    
+    # Grouped nearest over buildings only copies the winners
+    filtered = filter_by_nearest(test_buildings, Point(388000, 5819000), 1, group_by=["a", "b", "b", "a", "c"])
+    assert [b["id"] for b in filtered] == ["BUILDING_001", "BUILDING_002", "BUILDING_005"]
+    assert "_distance" not in test_buildings[0], "Input buildings must not be modified"
+    print("✓ kNN engine test passed")
+
+
 def test_radius_filtering():
     """Test radius-based filtering."""
     print("\n=== Test: Radius Filtering ===")
@@ -115,6 +207,973 @@ def test_radius_filtering():
     print("✓ Radius filtering test passed")
 
 
+def test_spatial_intent_parser():
+    """Test the rule-based nearest/radius parser that avoids the LLM call."""
+    print("\n=== Test: Spatial Intent Parser ===")
+    
+    cases = {
+        "Finde alle Gebäude im Umkreis von 3 km": ("radius", 3000),
+        "Gebäude höher als 20 m im Umkreis von 1,5 km": ("radius", 1500),
+        "buildings within 500m": ("radius", 500),
+        "Schulen, höchstens 800 Meter entfernt": ("radius", 800),
+        "Zeige mir die 5 nächsten Schulen": ("nearest", 5),
+        "the three closest hospitals": ("nearest", 3),
+        # Thousands separators belong to the count
+        "die nächsten 1.000 Wohngebäude": ("nearest", 1000),
+        "the nearest 1,000 buildings": ("nearest", 1000),
+        "die 2.500 nächsten Gebäude": ("nearest", 2500),
+        "Zeige die nächsten 5.": ("nearest", 5),
+        "im Umkreis von 1.000 m": ("radius", 1000),
+    }
+    for query, (mode, value) in cases.items():
+        parsed = parse_point_filter_mode(query)
+        print(f"{query!r} → {parsed}")
+        assert parsed["mode"] == mode and parsed["value"] == value, query
+    
+    assert parse_point_filter_mode("Die jeweils 3 nächsten Schulen und Kitas")["per_function"] is True
+    assert parse_point_filter_mode("the 2 nearest buildings of each type")["per_function"] is True
+    assert parse_point_filter_mode("die 5 nächsten Schulen")["per_function"] is False
+    assert parse_point_filter_mode("die jeweils 2.500 nächsten Gebäude")["value"] == 2500
+    # Heights are no radius; "bis zu" only counts with a distance word
+    assert parse_point_filter_mode("Schulen bis zu 2 km entfernt")["value"] == 2000
+    assert parse_point_filter_mode("buildings up to 30 m tall within 1 km")["value"] == 1000
+    
+    # Ambiguous queries are left to the LLM
+    for query in ["Which hospitals are nearby?", "die 5 nächsten Schulen im Umkreis von 1 km", "Gebäude mit 500 m² Fläche",
+                  "Gebäude bis zu 20 m hoch in der Nähe von X", "buildings up to 15 m high near the station",
+                  "Die 5 nächsten Gebäude mit mehr als 10 Wohnungen pro Gebäude",
+                  # Decimal counts and distance ranges
+                  "Zeige die 1.5 nächsten", "die jeweils 1,5 nächsten Gebäude",
+                  "im Umkreis von 3-5 km", "im Umkreis von 3 bis 5 km"]:
+        assert parse_point_filter_mode(query) is None, query
+    print("✓ Spatial intent parser test passed")
+
+
+def test_spatial_index():
+    """Test STRtree radius queries against brute-force distances."""
+    print("\n=== Test: Spatial Index ===")
+    
+    index = build_spatial_index(test_buildings + [{"id": "BROKEN", "centroid": "not wkt"}])
+    center_point = Point(388000, 5819000)
+    
+    assert len(index) == len(test_buildings), "Invalid geometries must not be indexed"
+    
+    positions, distances = index.query_radius(center_point, 100)
+    print(f"Radius positions: {list(positions)}, distances: {[round(d, 1) for d in distances]}")
+    assert list(positions) == [0, 1, 2], "Radius query should be inclusive and sorted by distance"
+    assert list(distances) == sorted(distances)
+    
+    far_point = Point(400000, 5830000)
+    positions, _ = index.query_radius(far_point, 100)
+    assert len(positions) == 0
+    print("✓ Spatial index test passed")
+
+
+def test_centroid_cache():
+    """Test that cached coordinates replace geometry parsing."""
+    print("\n=== Test: Centroid Cache ===")
+    
+    centroid_cache.load([
+        {"id": "BUILDING_001", "centroid": "Point (388000 5819000)"},
+        {"id": "BUILDING_002", "centroid": "Point (388100 5819000)"},
+        {"id": "BROKEN", "centroid": "Point ()"},
+    ])
+    try:
+        xy, found = centroid_cache.coordinates(["BUILDING_002", "UNKNOWN"])
+        print(f"Cached coordinates: {xy.tolist()}, found: {list(found)}")
+        assert len(centroid_cache) == 2, "Invalid centroids must not be cached"
+        assert list(found) == [True, False]
+        assert xy[0].tolist() == [388100.0, 5819000.0]
+        
+        # Cached buildings need no geometry fields; uncached ones fall back to parsing
+        buildings = [{"id": "BUILDING_002"}, test_buildings[2]]
+        filtered = filter_by_nearest(buildings, Point(388000, 5819000), count=2)
+        assert [b["id"] for b in filtered] == ["BUILDING_002", "BUILDING_003"]
+        
+        # A failed reload after a data change keeps the previous snapshot
+        def unavailable():
+            raise RuntimeError("database unavailable")
+        neo4j_client.get_building_centroids = unavailable
+        data_version_tracker.current = lambda force=False: 2
+        try:
+            assert centroid_cache.ensure_current() and len(centroid_cache) == 2
+        finally:
+            del neo4j_client.get_building_centroids
+            del data_version_tracker.current
+    finally:
+        centroid_cache.invalidate()
+    
+    assert not centroid_cache.is_warm
+    print("✓ Centroid cache test passed")
+
+
+def test_grid_index():
+    """Test grid cell queries and aggregates against brute force."""
+    print("\n=== Test: Grid Cell Index ===")
+    import numpy as np
+    
+    rng = np.random.default_rng(7)
+    xy = rng.uniform([387000, 5818000], [389000, 5820000], size=(2000, 2))
+    xy[5] = np.nan  # Missing geometry
+    area = rng.uniform(50, 500, size=2000)
+    area[::7] = np.nan
+    floors = rng.integers(0, 12, size=2000).astype(float)
+    grid = GridIndex(xy, cell_size=100, area=area, floors=floors)
+    assert len(grid) == 1999
+    
+    center, radius = (388000.0, 5819000.0), 450.0
+    expected = np.flatnonzero(np.hypot(xy[:, 0] - center[0], xy[:, 1] - center[1]) <= radius)
+    assert grid.query_radius(center, radius).tolist() == expected.tolist()
+    
+    polygon = wkt.loads("POLYGON((387500 5818500, 388700 5818700, 388300 5819600, 387400 5819300, 387500 5818500))")
+    import shapely
+    expected = np.flatnonzero(shapely.contains_xy(polygon, xy[:, 0], xy[:, 1]))
+    assert grid.query_polygon(polygon).tolist() == expected.tolist()
+    
+    aggregates = grid.aggregate_polygon(polygon)
+    print(f"Polygon aggregates: count={aggregates['building_count']}, area_sum={aggregates['area_sum']:.1f}")
+    assert aggregates["building_count"] == len(expected)
+    assert np.isclose(aggregates["area_sum"], np.nansum(area[expected]))
+    assert aggregates["area_max"] == np.nanmax(area[expected])
+    assert aggregates["floors_min"] == floors[expected].min()
+    assert sum(aggregates["floors_histogram"].values()) == len(expected)
+    
+    # Through the centroid cache: filter result and statistics from aggregates
+    buildings = [
+        {"id": f"G{i}", "centroid": f"Point ({x} {y})", "area": None if np.isnan(a) else f"{a:.2f}", "floors_above": int(f)}
+        for i, ((x, y), a, f) in enumerate(zip(xy, area, floors)) if i != 5
+    ]
+    centroid_cache.load(buildings)
+    try:
+        filtered = filter_by_polygon(buildings, polygon)
+        assert len(filtered) == len(expected)
+        aggregates = region_aggregates(buildings, len(filtered), lambda grid: grid.aggregate_polygon(polygon))
+        assert aggregates is not None
+        from_aggregates = calculate_building_statistics(filtered, aggregates)
+        per_building = calculate_building_statistics(filtered)
+        # Both paths report the same statistics, incl. area percentiles and histogram
+        assert set(from_aggregates) == set(per_building), set(from_aggregates) ^ set(per_building)
+        assert "area_p50" in from_aggregates and "area_histogram" in from_aggregates
+        for key, value in from_aggregates.items():
+            expected_value = per_building[key]
+            if isinstance(value, float):
+                assert abs(value - expected_value) <= 0.011, (key, value, expected_value)
+            else:
+                assert value == expected_value, (key, value, expected_value)
+        
+        radius_filtered = filter_by_radius(buildings, Point(*center), radius)
+        distances = [b["_distance"] for b in radius_filtered]
+        assert distances == sorted(distances) and max(distances) <= radius
+    finally:
+        centroid_cache.invalidate()
+    print("✓ Grid cell index test passed")
+
+
+def test_building_statistics():
+    """Test the columnar statistics engine against plain Python."""
+    print("\n=== Test: Columnar Building Statistics ===")
+    import statistics
+    
+    buildings = [
+        {"area": "198.06", "floors_above": 3, "floors_below": 1, "house_number": "12a"},
+        {"area": "50.5", "floors_above": 1, "floors_below": None, "house_number": "4"},
+        {"area": "", "floors_above": 5, "floors_below": 0, "house_number": "abc"},
+        {"area": "invalid", "floors_above": None, "house_number": None},
+        {"area": "1200", "floors_above": 3, "floors_below": 2, "house_number": "150"},
+    ]
+    stats = calculate_building_statistics(buildings)
+    print(f"Statistics: {stats}")
+    
+    areas = [198.06, 50.5, 1200.0]
+    assert stats["building_count"] == 5
+    assert stats["area_count"] == 3
+    assert stats["area_min"] == 50.5 and stats["area_max"] == 1200.0
+    assert stats["area_mean"] == round(sum(areas) / 3, 2)
+    assert stats["area_std"] == round(statistics.pstdev(areas), 2)
+    assert stats["area_p50"] == 198.06
+    assert sum(stats["area_histogram"]["counts"]) == 3
+    assert stats["floors_above_min"] == 1 and stats["floors_above_max"] == 5
+    assert stats["floors_above_histogram"] == {1: 1, 3: 2, 5: 1}
+    assert stats["floors_below_max"] == 2 and stats["floors_below_count"] == 3
+    assert stats["house_number_min"] == 4 and stats["house_number_max"] == 150
+    assert "house_number_mean" not in stats
+    
+    # Aggregate pushdown: Neo4j computes the same keys in one row
+    cypher = "MATCH (b:Building)-[:HAS_FUNCTION]->(f:Function {code: 2000})\nRETURN collect(b) AS buildings"
+    aggregate_query = return_aggregates(cypher)
+    print(aggregate_query.splitlines()[1])
+    assert "WITH b, toFloat(b.area) AS area" in aggregate_query
+    assert "percentileCont(area, 0.5) AS area_p50" in aggregate_query
+    assert "stDevP(floors_above) AS floors_above_std" in aggregate_query
+    
+    record = {
+        "building_count": 5, "area_count": 3, "area_sum": 1448.56, "area_mean": 482.8533, "area_min": 50.5,
+        "area_max": 1200.0, "area_p50": 198.06, "floors_below_count": 0, "floors_below_min": None,
+        "floors_above_count": 4, "floors_above_min": 1, "floors_above_max": 5, "floors_above_mean": 3.0,
+    }
+    pushed = statistics_from_record(record)
+    assert pushed["area_mean"] == stats["area_mean"] and pushed["area_p50"] == stats["area_p50"]
+    assert pushed["floors_above_max"] == 5 and pushed["building_count"] == 5
+    assert not any(key.startswith("floors_below") for key in pushed)
+    
+    # Group-by: one pass over the columnar arrays, nested by district and floor band
+    columns = building_columns(buildings, ("area", "floors_above"))
+    bands = floor_bands(columns["floors_above"])
+    assert bands == ["3-5", "0-2", "3-5", "unknown", "3-5"]
+    grouped = group_statistics(columns, {"district": ["Pankow", "Mitte", "Pankow", None, "Pankow"], "floor_band": bands})
+    print(f"Grouped: {grouped}")
+    assert grouped["group_by"] == ["district", "floor_band"]
+    assert list(grouped["groups"]) == ["Mitte", "Pankow", "unknown"]
+    pankow = grouped["groups"]["Pankow"]["3-5"]
+    assert pankow["building_count"] == 3
+    assert pankow["area_sum"] == 1398.06 and pankow["area_mean"] == 699.03
+    assert pankow["floors_above_min"] == 3 and pankow["floors_above_max"] == 5
+    assert grouped["groups"]["unknown"]["unknown"] == {"building_count": 1}
+    print("✓ Columnar building statistics test passed")
+
+
+def test_statistics_accumulator():
+    """Test mergeable statistics accumulators against the one-shot engine."""
+    print("\n=== Test: Mergeable Statistics Accumulators ===")
+    rng = np.random.default_rng(7)
+    buildings = [
+        {"area": f"{area:.2f}", "floors_above": int(floors), "floors_below": int(floors) % 2, "house_number": f"{number}b"}
+        for area, floors, number in zip(rng.lognormal(5, 1, 300), rng.integers(0, 12, 300), rng.integers(1, 200, 300))
+    ]
+    expected = calculate_building_statistics(buildings)
+    
+    # Chunks accumulated in "parallel" and merged give the exact one-shot result
+    workers = [BuildingStatsAccumulator(k=1000) for _ in range(3)]
+    for i in range(0, len(buildings), 50):
+        workers[(i // 50) % 3].update(buildings[i:i + 50])
+    merged = workers[0].merge(workers[1]).merge(workers[2])
+    result = {**merged.result(), "building_count": merged.building_count}
+    differing = [key for key in expected if expected[key] != result.get(key)]
+    print(f"Differing keys: {differing}")
+    assert not differing
+    
+    # Beyond k values the sketch stays small with a small rank error
+    values = rng.lognormal(5, 1, 50000)
+    sketch = QuantileSketch(k=200, seed=0)
+    for i in range(0, len(values), 1000):
+        sketch.update(values[i:i + 1000])
+    assert not sketch.is_exact and sketch.count == len(values)
+    assert sum(len(level) for level in sketch._levels) < 1000
+    ordered = np.sort(values)
+    for q, estimate in zip((10, 50, 90), sketch.quantiles((10, 50, 90))):
+        rank = np.searchsorted(ordered, estimate) / len(values) * 100
+        print(f"p{q}: estimate at rank {rank:.2f}")
+        assert abs(rank - q) < 2
+    print("✓ Mergeable statistics accumulator test passed")
+
+
+def _cube_cell(district, function_code, buildings):
+    """Cube cell as written by data_import/statistics_cube.py."""
+    cell = {"district": district, "function_code": function_code, "building_count": len(buildings)}
+    for column in ("area", "floors_above", "floors_below"):
+        values = np.array([float(b[column]) for b in buildings if b.get(column) not in (None, "")])
+        if column != "area":
+            values = np.trunc(values)
+        cell.update({f"{column}_count": len(values), f"{column}_sum": values.sum(), f"{column}_sumsq": (values ** 2).sum(),
+                     f"{column}_min": values.min(), f"{column}_max": values.max()})
+        if column == "area":
+            cell["area_quantiles"] = np.percentile(values, np.arange(101)).tolist()
+        else:
+            unique, counts = np.unique(values.astype(int), return_counts=True)
+            cell[f"{column}_values"], cell[f"{column}_counts"] = unique.tolist(), counts.tolist()
+    house_numbers = [int(b["house_number"].rstrip("b")) for b in buildings]
+    cell["house_number_min"], cell["house_number_max"] = min(house_numbers), max(house_numbers)
+    return cell
+
+
+def test_statistics_cube():
+    """Test district/function selections answered from precomputed cube cells."""
+    print("\n=== Test: Statistics Cube ===")
+    selection = building_selection(
+        "MATCH (b:Building)-[:IN_DISTRICT]->(d:District {Gemeinde_name: 'Pankow'}),\n"
+        "      (b)-[:HAS_FUNCTION]->(f:Function)\nWHERE f.code IN [1010, 1020]\nRETURN collect(b) AS buildings"
+    )
+    print(f"Selection: {selection}")
+    assert selection == {"districts": ["Pankow"], "require_district": True, "function_codes": [1010, 1020], "require_function": True}
+    assert building_selection("MATCH (b:Building) RETURN collect(b) AS buildings")["require_district"] is False
+    # Attribute predicates, OR and parameters cannot be answered from the cube
+    assert building_selection("MATCH (b:Building)-[:IN_DISTRICT]->(d:District) WHERE d.Gemeinde_name = 'Mitte' AND b.floors_above > 3 RETURN collect(b) AS buildings") is None
+    assert building_selection("MATCH (b:Building)-[:HAS_FUNCTION]->(f:Function) WHERE f.code = 1010 OR f.code = 2000 RETURN collect(b) AS buildings") is None
+    assert building_selection("MATCH (b:Building)-[:HAS_FUNCTION]->(f:Function) WHERE f.code IN $codes RETURN collect(b) AS buildings") is None
+    
+    rng = np.random.default_rng(3)
+    def make(n):
+        return [{"area": f"{a:.2f}", "floors_above": int(f), "floors_below": int(f) % 3, "house_number": f"{h}b"}
+                for a, f, h in zip(rng.lognormal(5, 1, n), rng.integers(1, 15, n), rng.integers(1, 300, n))]
+    pankow_1010, pankow_1020, mitte_1010 = make(400), make(250), make(300)
+    statistics_cube.load([
+        _cube_cell("Pankow", 1010, pankow_1010), _cube_cell("Pankow", 1020, pankow_1020), _cube_cell("Mitte", 1010, mitte_1010)
+    ])
+    
+    # A single cell reproduces the live statistics (area histogram is interpolated)
+    single = statistics_cube.statistics({"districts": ["Mitte"], "function_codes": None})
+    expected = calculate_building_statistics(mitte_1010)
+    differing = [key for key in expected if key != "area_histogram" and expected[key] != single.get(key)]
+    print(f"Single cell differing keys: {differing}")
+    assert not differing
+    
+    # Merged cells: exact moments and floors, area percentiles from the quantile mixture
+    merged = statistics_cube.statistics(selection)
+    expected = calculate_building_statistics(pankow_1010 + pankow_1020)
+    for key in ("building_count", "area_count", "area_mean", "area_min", "area_max", "floors_above_p50", "floors_above_histogram", "house_number_max"):
+        assert merged[key] == expected[key], key
+    assert abs(merged["area_std"] - expected["area_std"]) < 0.05
+    for q in (10, 50, 90):
+        print(f"p{q}: cube {merged[f'area_p{q}']} vs exact {expected[f'area_p{q}']}")
+        assert abs(merged[f"area_p{q}"] - expected[f"area_p{q}"]) / expected[f"area_p{q}"] < 0.03
+    assert sum(merged["area_histogram"]["counts"]) == expected["area_count"]
+    statistics_cube.invalidate()
+    assert statistics_cube.statistics(selection) is None
+    print("✓ Statistics cube test passed")
+
+
+def test_result_store():
+    """Test server-side result pages, sort orders and value ranges."""
+    print("\n=== Test: Result Store ===")
+    buildings = [{"id": f"B{i:03d}", "area": str(area), "street_name": street}
+                 for i, (area, street) in enumerate([(120.5, "Weg"), (None, "Allee"), (80, None), (300, "Allee"), (80, "Damm")])]
+    result_id = result_store.put(buildings)
+    
+    first = result_store.page(result_id, limit=2)
+    print(f"First page: {first}")
+    assert [b["id"] for b in first["buildings"]] == ["B000", "B001"] and first["total"] == 5 and first["next_offset"] == 2
+    assert result_store.page(result_id, offset=4, limit=2)["next_offset"] is None
+    
+    # Numeric sort (missing values last, stable for ties), descending and ranges
+    ascending = result_store.page(result_id, limit=10, sort_by="area")
+    assert [b["id"] for b in ascending["buildings"]] == ["B002", "B004", "B000", "B003", "B001"]
+    descending = result_store.page(result_id, limit=10, sort_by="area", descending=True)
+    assert [b["id"] for b in descending["buildings"]] == ["B003", "B000", "B004", "B002", "B001"]
+    ranged = result_store.page(result_id, limit=1, sort_by="area", min_value=80, max_value=120.5)
+    assert ranged["total"] == 3 and [b["id"] for b in ranged["buildings"]] == ["B002"] and ranged["next_offset"] == 1
+    assert [b["id"] for b in result_store.page(result_id, sort_by="street_name")["buildings"]] == ["B001", "B003", "B004", "B000", "B002"]
+    
+    try:
+        result_store.page(result_id, sort_by="street_name", min_value=1)
+        assert False, "range on a text key must be rejected"
+    except ValueError:
+        pass
+    assert result_store.page("unknown") is None
+    print("✓ Result store test passed")
+
+
+def test_query_cache():
+    """Test the Cypher result cache: normalized keys, copies, invalidation and metrics."""
+    print("\n=== Test: Query Cache ===")
+    assert normalize_cypher("match (b:Building)\n  where b.name = 'Haus  Am See'\n return   b;") == \
+        "MATCH (b:Building) WHERE b.name = 'Haus  Am See' RETURN b"
+    assert cache_key("MATCH (b) RETURN b", {"x": 1, "y": 2}) == cache_key("match (b)\nreturn b", {"y": 2, "x": 1})
+    assert cache_key("MATCH (b) RETURN b", {"x": 1}) != cache_key("MATCH (b) RETURN b", {"x": 2})
+    
+    executed = []
+    version = [1]
+    def fake_execute(cypher, parameters=None, tag="query"):
+        executed.append(cypher)
+        return [{"building": {"id": "B1", "area": "120.5"}}]
+    neo4j_client.execute_query = fake_execute
+    data_version_tracker.current = lambda force=False: version[0]
+    try:
+        query_cache.invalidate()
+        before = query_cache.stats()
+        first = query_cache.execute("MATCH (b:Building) RETURN b", {})
+        first[0]["building"]["_distance"] = 10.0  # callers may modify their records
+        second = query_cache.execute("match (b:Building)  RETURN b")
+        stats = query_cache.stats()
+        print(f"Cache stats: {stats}")
+        assert len(executed) == 1 and second == [{"building": {"id": "B1", "area": "120.5"}}]
+        assert stats["hits"] - before["hits"] == 1 and stats["misses"] - before["misses"] == 1
+        assert stats["entries"] == 1 and stats["bytes"] > 0
+        
+        # Re-imported data drops all entries
+        version[0] = 2
+        query_cache.execute("MATCH (b:Building) RETURN b")
+        assert len(executed) == 2 and query_cache.stats()["invalidations"] > stats["invalidations"]
+    finally:
+        del neo4j_client.execute_query
+        del data_version_tracker.current
+        query_cache.invalidate()
+    print("✓ Query cache test passed")
+
+
+def test_async_execute_query():
+    """Test that the async execute_query node matches the sync node."""
+    print("\n=== Test: Async Execute Query ===")
+    records = [{"buildings": [{"id": "B1", "area": "120.5"}, {"id": "B2", "area": "80"}]}]
+    queries = []
+    def fake_execute(cypher, parameters=None, tag="query"):
+        queries.append((tag, cypher))
+        return records
+    async def fake_aexecute(cypher, parameters=None, tag="query"):
+        queries.append((tag, cypher))
+        await asyncio.sleep(0)
+        return records
+    async def fake_version(force=False):
+        return 1
+    neo4j_client.execute_query = fake_execute
+    async_neo4j_client.execute_query = fake_aexecute
+    data_version_tracker.acurrent = fake_version
+    data_version_tracker.current = lambda force=False: 1
+    try:
+        query_cache.invalidate()
+        state = {"cypher_query": "MATCH (b:Building) WHERE b.floors_above > 20 RETURN collect(b) AS buildings"}
+        expected = execute_query(state)
+        query_cache.invalidate()
+        update = asyncio.run(aexecute_query(state))
+        print(f"Async update: {update['messages']}")
+        assert update == expected and len(queries) == 2 and queries[0] == queries[1]
+        assert queries[0][0] == "execute_query"  # transaction metadata tag
+        # Repeated query is answered from the cache on the async path as well
+        asyncio.run(aexecute_query(state))
+        assert len(queries) == 2
+        assert asyncio.run(aexecute_query({"cypher_query": ""}))["error"] == "No Cypher query to execute"
+        
+        # Spatial streaming: the async path fetches through async_neo4j_client.stream_records
+        rows = [[{"building": b} for b in test_buildings[:3]], [{"building": b} for b in test_buildings[3:]]]
+        streamed = []
+        def fake_stream(cypher, parameters=None, chunk_size=1000, tag="stream"):
+            streamed.append("sync")
+            yield from rows
+        async def fake_astream(cypher, parameters=None, chunk_size=1000, tag="stream"):
+            streamed.append("async")
+            for chunk in rows:
+                await asyncio.sleep(0)
+                yield chunk
+        neo4j_client.stream_records = fake_stream
+        async_neo4j_client.stream_records = fake_astream
+        state = {
+            "cypher_query": "MATCH (b:Building) RETURN collect(b) AS buildings",
+            "spatial_filter": "POLYGON((387950 5818950, 388150 5818950, 388150 5819050, 387950 5819050, 387950 5818950))",
+        }
+        expected = execute_query(state)
+        update = asyncio.run(aexecute_query(state))
+        print(f"Async streamed update: {update['messages']}")
+        assert streamed == ["sync", "async"] and update == expected
+        assert update["messages"][0] == "Query executed in streaming mode"
+        assert [b["id"] for b in update["results"][0]["buildings"]] == ["BUILDING_001", "BUILDING_002"]
+    finally:
+        del neo4j_client.execute_query
+        del async_neo4j_client.execute_query
+        for client in (neo4j_client, async_neo4j_client):
+            client.__dict__.pop("stream_records", None)
+        del data_version_tracker.acurrent
+        del data_version_tracker.current
+        query_cache.invalidate()
+    print("✓ Async execute query test passed")
+
+
+def test_query_limits():
+    """Test read transaction settings and the handling of aborted runaway queries."""
+    print("\n=== Test: Query Limits ===")
+    config = transaction_config("execute_query", timeout=5)
+    assert config == {"timeout": 5, "metadata": {"app": "ax_ploration", "tag": "execute_query"}}
+    assert transaction_config("stream", timeout=0)["timeout"] is None  # server default
+    
+    # Full-scan warm-ups run with the bulk timeout and without the row ceiling
+    calls = []
+    def record_call(cypher, parameters=None, tag="query", timeout=None, max_rows=NEO4J_MAX_ROWS):
+        calls.append((tag, timeout, max_rows))
+        return []
+    neo4j_client.execute_query = record_call
+    try:
+        neo4j_client.get_building_centroids()
+        neo4j_client.get_building_footprints()
+        neo4j_client.get_statistics_cube()
+        neo4j_client.get_building_memberships(["B1"])
+    finally:
+        del neo4j_client.execute_query
+    assert all(timeout == NEO4J_BULK_TIMEOUT and max_rows == 0 for _, timeout, max_rows in calls), calls
+    
+    class TimedOut(Exception):
+        code = "Neo.ClientError.Transaction.TransactionTimedOutClientConfiguration"
+    state = {"cypher_query": "MATCH (a:Building), (b:Building) RETURN collect(b) AS buildings"}
+    for error, expected in ((RowLimitExceeded("more than 10 records"), "Query result too large"),
+                            (TimedOut("terminated"), "Query timed out")):
+        def fake_execute(cypher, parameters=None, tag="query"):
+            raise error
+        neo4j_client.execute_query = fake_execute
+        try:
+            query_cache.invalidate()
+            update = execute_query(state)
+        finally:
+            del neo4j_client.execute_query
+        print(f"{type(error).__name__}: {update['messages']}")
+        assert update["error"].startswith(expected) and update["results"] == [{"buildings": []}]
+    
+    # One `collect(b) AS buildings` record is counted by its list length
+    class FakeRecord(dict):
+        def data(self):
+            return dict(self)
+    class FakeResult:
+        def __init__(self, records):
+            self.records = records
+        def fetch(self, n):
+            return self.records[:n]
+        def __iter__(self):
+            return iter(self.records)
+    class FakeSession:
+        def __init__(self, records):
+            self.tx = type("Tx", (), {"run": lambda tx, cypher, parameters: FakeResult(records)})()
+        def execute_read(self, work):
+            return work(self.tx)
+    
+    def fake_session(records):
+        @contextmanager
+        def session(**config):
+            yield FakeSession(records)
+        return session
+    
+    collected = [FakeRecord(buildings=[{"id": i} for i in range(11)], count=11)]
+    neo4j_client.session = fake_session(collected)
+    try:
+        try:
+            neo4j_client.execute_query("MATCH (b:Building) RETURN collect(b) AS buildings", max_rows=10)
+            assert False, "collected list above the ceiling was not rejected"
+        except RowLimitExceeded as e:
+            print(f"RowLimitExceeded: {e}")
+        assert len(neo4j_client.execute_query("...", max_rows=11)[0]["buildings"]) == 11
+        assert len(neo4j_client.execute_query("...", max_rows=0)[0]["buildings"]) == 11
+    finally:
+        del neo4j_client.session
+    print("✓ Query limits test passed")
+
+
+def test_function_index():
+    """Test in-memory function embedding search against the Neo4j score scale and policies."""
+    print("\n=== Test: Function Index ===")
+    rng = np.random.default_rng(11)
+    vectors = rng.normal(size=(6, 8))
+    functions = [
+        {"code": 1000 + 10 * i, "name": f"F{i}", "description": f"Funktion {i}",
+         "embedding_small": (vector * (i + 1)).tolist()}  # Unnormalized on purpose
+        for i, vector in enumerate(vectors)
+    ]
+    functions[5]["embedding_small"] = None  # Missing embedding
+    function_index.load(functions, version=None)
+    
+    query = vectors[2] + 0.1 * rng.normal(size=8)
+    selected, best = function_index.search(query.tolist(), method="top_k", top_k=3)
+    cosine = vectors[:5] @ query / (np.linalg.norm(vectors[:5], axis=1) * np.linalg.norm(query))
+    expected = (1 + cosine) / 2
+    print(f"Top 3: {[(f['code'], round(f['score'], 3)) for f in selected]}")
+    assert [f["code"] for f in selected] == [1000 + 10 * i for i in np.argsort(-expected)[:3]]
+    assert selected[0]["code"] == 1020 and abs(best - expected.max()) < 1e-5
+    assert all(abs(f["score"] - expected[(f["code"] - 1000) // 10]) < 1e-5 for f in selected)
+    
+    # Policies on a score vector
+    scores = np.array([0.80, 0.91, 0.88, 0.50, 0.87])
+    assert select_scores(scores, "relative_top1", relative_delta=0.05).tolist() == [1, 2, 4]
+    assert select_scores(scores, "threshold", score_threshold=0.85).tolist() == [1, 2, 4]
+    assert select_scores(scores, "top_k", top_k=2).tolist() == [1, 2]
+    assert select_scores(scores, "threshold", score_threshold=0.95).tolist() == []
+    
+    # Missing model or mismatching dimension: caller falls back to the vector index
+    assert function_index.search(query.tolist(), space="large") is None
+    assert function_index.search([1.0, 2.0]) is None
+    
+    # A failed reload after a data change keeps the loaded index
+    def unavailable():
+        raise RuntimeError("database unavailable")
+    neo4j_client.get_function_embeddings = unavailable
+    data_version_tracker.current = lambda force=False: 2
+    try:
+        assert function_index.ensure_current() and function_index.search(query.tolist(), method="top_k", top_k=1)
+    finally:
+        del neo4j_client.get_function_embeddings
+        del data_version_tracker.current
+    function_index.invalidate()
+    print("✓ Function index test passed")
+
+
+def test_embedding_cache():
+    """Test the persistent embedding cache: normalized keys, persistence, LRU eviction and warm-up."""
+    print("\n=== Test: Embedding Cache ===")
+    assert normalize_text("  Wohn\u0067ebäude \n") == normalize_text("wohngebäude") == "wohngebäude"
+    
+    calls = []
+    def fake_embeddings(texts):
+        calls.extend(texts)
+        return [[float(len(text)), 0.5, -0.25] for text in texts]
+    llm_client.create_embedding = lambda text: fake_embeddings([text])[0]
+    llm_client.create_embeddings = fake_embeddings
+    max_entries, original_path = embedding_cache.max_entries, embedding_cache._path
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            path = os.path.join(directory, "embeddings.sqlite3")
+            embedding_cache.open(path)
+            assert embedding_cache.embed("Schulen") == [7.0, 0.5, -0.25]
+            assert embedding_cache.embed(" schulen ") == [7.0, 0.5, -0.25] and calls == ["Schulen"]
+            
+            # Persisted across connections
+            embedding_cache.open(path)
+            assert embedding_cache.get("SCHULEN") == [7.0, 0.5, -0.25]
+            
+            # Warm-up embeds only missing texts in one batch
+            assert embedding_cache.warm(["Schulen", "Krankenhäuser", "krankenhäuser", "Kirchen"]) == 2
+            assert calls == ["Schulen", "Krankenhäuser", "Kirchen"] and len(embedding_cache) == 3
+            
+            # LRU: the least recently used entry is evicted first
+            embedding_cache.max_entries = 3
+            embedding_cache.get("Schulen")
+            embedding_cache.embed("Hotels")
+            print(f"Cached entries after eviction: {len(embedding_cache)}")
+            assert len(embedding_cache) == 3 and embedding_cache.get("Krankenhäuser") is None
+            assert embedding_cache.get("Schulen") is not None
+        finally:
+            embedding_cache.max_entries = max_entries
+            embedding_cache.close()
+            embedding_cache.open(original_path)
+            del llm_client.create_embedding
+            del llm_client.create_embeddings
+    print("✓ Embedding cache test passed")
+
+
+def test_embedding_provider():
+    """Test that function search uses the provider's embeddings and vector space."""
+    print("\n=== Test: Embedding Provider ===")
+    assert OpenAIEmbeddingProvider(None, "text-embedding-3-large").space == "large"
+    assert OpenAIEmbeddingProvider(None, "text-embedding-3-small").space == "small"
+    try:
+        EmbeddingProvider()
+        assert False, "Providers must implement embed"
+    except TypeError:
+        pass
+    
+    class KeywordProvider(EmbeddingProvider):
+        """Offline provider: one dimension per keyword."""
+        name, space = "local:keywords", "local"
+        keywords = ("schule", "wohn", "kirche")
+        def embed(self, texts):
+            return [[float(keyword in text.lower()) + 0.01 for keyword in self.keywords] for text in texts]
+    
+    provider = KeywordProvider()
+    functions = [
+        {"code": 3021, "name": "Allgemein bildende Schule", "description": "Schule",
+         "embedding_small": [0.3] * 5, "embedding_local": provider.embed(["Schulgebäude"])[0]},
+        {"code": 1010, "name": "Wohnhaus", "description": "Wohngebäude",
+         "embedding_small": [0.1] * 5, "embedding_local": provider.embed(["Wohngebäude"])[0]},
+        {"code": 3041, "name": "Kirche", "description": "Kirche",
+         "embedding_small": [0.2] * 5, "embedding_local": provider.embed(["Kirche"])[0]},
+    ]
+    original = llm_client.embedding_provider
+    llm_client.set_embedding_provider(provider)
+    data_version_tracker.current = lambda force=False: None
+    function_index.load(functions, version=None)
+    lexical_index.load([], version=None)  # No lexical shortcut
+    with tempfile.TemporaryDirectory() as directory:
+        original_path = embedding_cache._path
+        embedding_cache.open(os.path.join(directory, "embeddings.sqlite3"))
+        try:
+            assert llm_client.create_embeddings(["Schulen", "Kirchen"]) == provider.embed(["Schulen", "Kirchen"])
+            update = embedding_search({"query": "Wie viele Schulen gibt es?", "building_function_query": "Schulen"})
+            print(f"Embedding search: {update['messages']}")
+            assert update["building_functions"] == [3021]
+            # Cached under the provider's model
+            cached = embedding_cache.get("Schulen", model="local:keywords")
+            assert cached is not None and np.allclose(cached, provider.embed(["Schulen"])[0])
+        finally:
+            llm_client.set_embedding_provider(original)
+            embedding_cache.close()
+            embedding_cache.open(original_path)
+            del data_version_tracker.current
+            function_index.invalidate()
+            lexical_index.invalidate()
+    print("✓ Embedding provider test passed")
+
+
+def test_lexical_index():
+    """Test stemmed lexical matching of function names and that confident hits skip the embedding."""
+    print("\n=== Test: Lexical Index ===")
+    assert tokenize("Krankenhäuser") == tokenize("Krankenhaus")
+    assert tokenize("Kindergärten") == tokenize("Kindergarten")
+    
+    functions = [
+        {"code": 1000, "name": "Wohngebäude", "description": "'Wohngebäude' ist ein Gebäude, das zum Wohnen dient."},
+        {"code": 2071, "name": "Hotel, Motel, Pension", "description": "Gebäude zur Beherbergung von Gästen."},
+        {"code": 3021, "name": "Allgemein bildende Schule", "description": "Gebäude einer Grundschule oder eines Gymnasiums."},
+        {"code": 3022, "name": "Berufsbildende Schule", "description": "Gebäude einer Berufsschule."},
+        {"code": 3023, "name": "Hochschulgebäude (Fachhochschule, Universität)", "description": "Gebäude für Lehre."},
+        {"code": 3051, "name": "Krankenhaus", "description": "Gebäude zur stationären Behandlung von Kranken."},
+    ]
+    data_version_tracker.current = lambda force=False: None
+    lexical_index.load(functions, version=None)
+    
+    def codes(matches):
+        return [m["code"] for m in matches]
+    
+    try:
+        assert codes(lexical_index.match("Krankenhäuser")) == [3051]
+        assert codes(lexical_index.match("Hotels")) == [2071]  # Name alternative
+        assert codes(lexical_index.match("Wohngebäude")) == [1000]
+        # Whole name words only: "Hochschulgebäude" is not a "Schule"
+        assert sorted(codes(lexical_index.match("Schulen"))) == [3021, 3022]
+        assert lexical_index.match("Gebäude") == []  # Too ambiguous
+        assert lexical_index.match("Grundschulen") == []  # Left to embedding search
+        
+        # BM25 ranking finds compound parts
+        ranked = lexical_index.search("Hochschulen")
+        print(f"BM25 'Hochschulen': {[(f['code'], f['score']) for f in ranked]}")
+        assert ranked[0]["code"] == 3023 and ranked[0]["score"] == 1.0
+        
+        def no_embedding(text):
+            raise AssertionError(f"embedding requested for {text}")
+        llm_client.create_embedding = no_embedding
+        update = embedding_search({"query": "Wie viele Krankenhäuser?", "building_function_query": "Krankenhäuser"})
+        print(f"Embedding search: {update['messages']}")
+        assert update["building_functions"] == [3051] and update["building_function_scores"] == [1.0]
+    finally:
+        del data_version_tracker.current
+        del llm_client.create_embedding
+        lexical_index.invalidate()
+    print("✓ Lexical index test passed")
+
+
+def test_function_hierarchy():
+    """Test subfunction expansion from the hierarchy closure and `IN $codes` selections."""
+    print("\n=== Test: Function Hierarchy ===")
+    assert [parent_code(c) for c in (1021, 1020, 1000, 2111, 3098)] == [1020, 1000, None, 2110, 3090]
+    
+    codes = [1000, 1010, 1020, 1021, 1022, 1310, 1311, 2000, 2100, 2110, 2111, 3000, 3020, 3021, 3022, 3051]
+    function_hierarchy.load(codes, version=None)
+    assert function_hierarchy.descendants(1020) == {1021, 1022}
+    # Transitive, and 1310 hangs below 1000 because 1300 does not exist
+    assert function_hierarchy.descendants(1000) == {1010, 1020, 1021, 1022, 1310, 1311}
+    assert function_hierarchy.descendants(2000) == {2100, 2110, 2111}
+    assert function_hierarchy.expand([3020, 3051, 3021]) == [3020, 3021, 3022, 3051]
+    assert function_hierarchy.expand([9999]) == [9999]  # Unknown codes are kept
+    
+    # Generated Cypher filters with one $codes parameter incl. subfunctions
+    data_version_tracker.current = lambda force=False: None
+    cypher = "MATCH (b:Building)-[:HAS_FUNCTION]->(f:Function) WHERE f.code IN $codes RETURN collect(b) AS buildings"
+    llm_client.chat_completion = lambda messages: f"```cypher\n{cypher}\n```"
+    try:
+        state = {
+            "query": "Wie viele öffentliche Gebäude für Bildung gibt es?", "attributes": [],
+            "building_functions": [3020], "building_function_names": ["Gebäude für Bildung und Forschung"],
+            "cypher_parameters": {"bbox": [1, 2, 3, 4]}
+        }
+        update = generate_cypher_district(state)
+        print(f"Cypher generation: {update['messages']}")
+        assert update["cypher_query"] == cypher
+        assert update["cypher_parameters"] == {"bbox": [1, 2, 3, 4], "codes": [3020, 3021, 3022]}
+        
+        # Inlined literal codes are rewritten to the parameter, so the expansion is kept
+        llm_client.chat_completion = lambda messages: cypher.replace("IN $codes", "IN [3020]")
+        update = generate_cypher_district(state)
+        assert update["cypher_query"] == cypher
+        
+        # $codes without building functions, or no function filter at all: regenerated once
+        responses = [cypher, cypher.replace("-[:HAS_FUNCTION]->(f:Function) WHERE f.code IN $codes", "")]
+        prompts = []
+        def regenerate(messages):
+            prompts.append(messages[-1]["content"])
+            return responses.pop(0)
+        llm_client.chat_completion = regenerate
+        update = generate_cypher_district({**state, "building_functions": [], "building_function_names": []})
+        print(f"Regenerated: {update['messages']}")
+        assert "$codes" not in update["cypher_query"] and "codes" not in update["cypher_parameters"]
+        assert "$codes ist nicht definiert" in prompts[-1]
+        
+        responses = [cypher.replace(" WHERE f.code IN $codes", "")] * 2
+        update = generate_cypher_district(state)
+        assert update["cypher_query"] == "" and "$codes" in update["error"] and len(prompts) == 4
+    finally:
+        del data_version_tracker.current
+        del llm_client.chat_completion
+        function_hierarchy.invalidate()
+    
+    # The cube selection resolves the list parameter
+    parameters = {"bbox": [1, 2, 3, 4], "codes": [3020, 3021, 3022]}
+    selection = building_selection(cypher, parameters)
+    assert selection["function_codes"] == [3020, 3021, 3022] and selection["require_function"] is True
+    assert building_selection(cypher, {"codes": 3020}) is None  # Not a list
+    assert building_selection(cypher.replace("IN $codes", "IN $codes AND b.id = $id"), parameters) is None
+    print("✓ Function hierarchy test passed")
+
+
+def test_footprint_filtering():
+    """Test footprint-aware polygon modes (intersects, within, overlap)."""
+    print("\n=== Test: Footprint Filtering ===")
+    
+    footprints = [
+        # Completely inside
+        {"id": "FP_INSIDE", "geometry_geojson": "POLYGON((388000 5819000, 388010 5819000, 388010 5819010, 388000 5819010, 388000 5819000))"},
+        # 25% inside (centroid outside)
+        {"id": "FP_EDGE", "geometry_geojson": "POLYGON((388195 5819000, 388215 5819000, 388215 5819010, 388195 5819010, 388195 5819000))"},
+        # Outside
+        {"id": "FP_OUTSIDE", "geometry_geojson": "POLYGON((388500 5819000, 388510 5819000, 388510 5819010, 388500 5819010, 388500 5819000))"},
+        # No footprint
+        {"id": "FP_POINT", "geometry_geojson": "POINT(388000 5819000)"},
+    ]
+    polygon = wkt.loads("POLYGON((387900 5818900, 388200 5818900, 388200 5819200, 387900 5819200, 387900 5818900))")
+    
+    def run_modes():
+        return (
+            [b["id"] for b in filter_by_footprint(footprints, polygon, "intersects")],
+            [b["id"] for b in filter_by_footprint(footprints, polygon, "within")],
+            filter_by_footprint(footprints, polygon, "overlap", min_overlap=0.2),
+            [b["id"] for b in filter_by_footprint(footprints, polygon, "overlap", min_overlap=0.5)],
+        )
+    
+    intersects, within, overlap, overlap_half = run_modes()
+    print(f"Intersects: {intersects}, within: {within}, overlap>=0.5: {overlap_half}")
+    assert intersects == ["FP_INSIDE", "FP_EDGE"]
+    assert within == ["FP_INSIDE"]
+    assert [(b["id"], b["_overlap_fraction"]) for b in overlap] == [("FP_INSIDE", 1.0), ("FP_EDGE", 0.25)]
+    assert overlap_half == ["FP_INSIDE"]
+    
+    # Cached footprints give the same result via the STRtree
+    footprint_cache.load(footprints[:2])
+    try:
+        assert len(footprint_cache) == 2
+        assert footprint_cache.max_extent == 20.0
+        cached_modes = run_modes()
+        assert cached_modes[0] == intersects and cached_modes[1] == within
+        assert cached_modes[3] == overlap_half
+        
+        # Streamed chunks share one STRtree query instead of one per chunk
+        tree, queries = footprint_cache._state.tree, []
+        class CountingTree:
+            def query(self, geometry, predicate=None):
+                queries.append(predicate)
+                return tree.query(geometry, predicate=predicate)
+        footprint_cache._state.tree = CountingTree()
+        data_version_tracker.current = lambda force=False: None
+        state = {"spatial_filter": polygon.wkt, "spatial_polygon_mode": "intersects", "query": "", "messages": []}
+        streamed = stream_spatial_filter(state, iter([[b] for b in footprints]))
+        assert [b["id"] for b in streamed["results"][0]["buildings"]] == intersects and queries == ["intersects"]
+    finally:
+        if "current" in vars(data_version_tracker):
+            del data_version_tracker.current
+        footprint_cache.invalidate()
+    
+    # Projected buildings (no geometry_geojson): footprints are fetched by id only when needed
+    fetched = []
+    def get_building_footprints(ids):
+        fetched.append(list(ids))
+        return [b for b in footprints if b["id"] in ids]
+    projected = [{"id": b["id"]} for b in footprints]
+    footprint_cache.load(footprints[:1])
+    neo4j_client.get_building_footprints = get_building_footprints
+    try:
+        assert [b["id"] for b in filter_by_footprint(projected, polygon, "intersects")] == intersects
+        assert fetched == [["FP_EDGE", "FP_OUTSIDE", "FP_POINT"]]
+        assert all("geometry_geojson" not in b for b in projected)
+        attached = attach_footprint_geojson([{"buildings": projected[:2], "statistics": {}}])
+        assert [b["geometry_geojson"] for b in attached[0]["buildings"]] == [b["geometry_geojson"] for b in footprints[:2]]
+    finally:
+        del neo4j_client.get_building_footprints
+        footprint_cache.invalidate()
+    print("✓ Footprint filtering test passed")
+
+
+def test_spatial_prefilter():
+    """Test injection of the spatial pushdown predicate into generated Cypher."""
+    print("\n=== Test: Spatial Pre-Filter ===")
+    
+    cypher = (
+        "MATCH (b:Building)-[:IN_DISTRICT]->(d:District {Gemeinde_name: 'Pankow'})\n"
+        "RETURN collect(b) AS buildings"
+    )
+    rewritten = inject_building_predicate(cypher, "{var}.floors_above > 3")
+    print(rewritten)
+    assert rewritten.endswith("WITH * WHERE b.floors_above > 3\nRETURN collect(b) AS buildings")
+    
+    # Unknown query shapes are left alone
+    assert inject_building_predicate("MATCH (f:Function) RETURN collect(f) AS functions", "{var}.x") is None
+    assert inject_building_predicate(cypher + " UNION " + cypher, "{var}.x") is None
+    
+    state_polygon = {
+        "query": "Gebäude in diesem Bereich",
+        "spatial_filter": "POLYGON((387900 5818900, 388200 5818900, 388200 5819200, 387900 5819200, 387900 5818900))",
+        "cypher_query": cypher,
+        "messages": []
+    }
+    checks = []
+    def has_building_locations():
+        checks.append(True)
+        return located
+    neo4j_client.has_building_locations = has_building_locations
+    data_version_tracker.current = lambda force=False: None
+    try:
+        located = True
+        _location_support.clear()
+        result = spatial_prefilter(state_polygon)
+        print(result["messages"])
+        assert "point.withinBBox(b.location" in result["cypher_query"]
+        assert result["cypher_parameters"]["spatial_upper_right"].x == 388200
+        
+        # Footprint intersection widens the box so edge buildings stay candidates
+        result = spatial_prefilter({**state_polygon, "spatial_polygon_mode": "intersects"})
+        assert result["cypher_parameters"]["spatial_upper_right"].x > 388200
+        assert len(checks) == 1  # Checked once per dataset version
+        
+        # Concurrent requests share one check
+        _location_support.clear()
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: spatial_prefilter(state_polygon), range(16)))
+        assert all("cypher_query" in result for result in results) and len(checks) == 2
+        
+        # Without Building.location the predicate would drop every building: no pushdown
+        located = False
+        _location_support.clear()
+        result = spatial_prefilter(state_polygon)
+        print(result["messages"])
+        assert "cypher_query" not in result and "Building.location" in result["messages"][0]
+    finally:
+        del neo4j_client.has_building_locations
+        del data_version_tracker.current
+        _location_support.clear()
+    print("✓ Spatial pre-filter test passed")
+
+
+def test_streaming_filter():
+    """Test chunk-wise spatial filtering against the materialized node."""
+    print("\n=== Test: Streaming Spatial Filter ===")
+    
+    cypher = "MATCH (b:Building)-[:IN_DISTRICT]->(d:District)\nRETURN collect(DISTINCT b) AS buildings;"
+    rows = return_building_rows(cypher)
+    print(rows)
+    assert rows.endswith("RETURN DISTINCT b AS building")
+    assert return_building_rows("MATCH (b:Building) RETURN collect(b) AS buildings, count(b) AS n") is None
+    projected = project_buildings(cypher)
+    print(projected.splitlines()[-1])
+    assert projected.endswith("RETURN collect(DISTINCT b {.id, .name, .street_name, .house_number, .post_code, "
+                              ".area, .floors_above, .floors_below, .centroid}) AS buildings")
+    assert "geometry_geojson" not in return_building_rows(cypher, projected=True)
+    
+    chunks = [test_buildings[:2], test_buildings[2:4], test_buildings[4:]]
+    states = [
+        {"spatial_filter": "POLYGON((387900 5818900, 388200 5818900, 388200 5819200, 387900 5819200, 387900 5818900))"},
+        {"spatial_filter": "POINT(388000 5819000)", "spatial_point_filter": {"mode": "nearest", "value": 3}},
+        {"spatial_filter": "POINT(388000 5819000)", "spatial_point_filter": {"mode": "radius", "value": 300}},
+    ]
+    for state in states:
+        state = {**state, "query": "", "messages": []}
+        streamed = stream_spatial_filter(state, iter(chunks))
+        materialized = spatial_filtering({**state, "results": [{"buildings": test_buildings}]})
+        streamed_ids = [b["id"] for b in streamed["results"][0]["buildings"]]
+        materialized_ids = [b["id"] for b in materialized["results"][0]["buildings"]]
+        print(f"{streamed['spatial_comparison']['mode']}: {streamed_ids}")
+        assert streamed_ids == materialized_ids
+        assert streamed["spatial_comparison"]["original_count"] == len(test_buildings)
+        
+        # Statistics-only: chunks are folded into an accumulator, no buildings are kept
+        aggregated = stream_spatial_filter(state, iter(chunks), BuildingStatsAccumulator())
+        assert aggregated["results"][0]["aggregated"] and aggregated["results"][0]["buildings"] == []
+        assert aggregated["results"][0]["statistics"]["building_count"] == len(materialized_ids)
+    
+    # Per-function nearest needs all candidates and is not streamed
+    state = {"spatial_filter": "POINT(388000 5819000)", "spatial_point_filter": {"mode": "nearest", "value": 1, "per_function": True}}
+    assert stream_spatial_filter(state, iter(chunks)) is None
+    print("✓ Streaming spatial filter test passed")
+
+
 def test_full_node():
     """Test the complete spatial_filtering node."""
     print("\n=== Test: Full Spatial Filtering Node ===")
@@ -165,9 +1224,30 @@ if __name__ == "__main__":
     
     try:
         test_parse_geometry()
+        test_parse_geometry_batch()
         test_polygon_filtering()
         test_nearest_filtering()
+        test_knn_engine()
         test_radius_filtering()
+        test_spatial_intent_parser()
+        test_spatial_index()
+        test_centroid_cache()
+        test_grid_index()
+        test_building_statistics()
+        test_statistics_accumulator()
+        test_statistics_cube()
+        test_result_store()
+        test_query_cache()
+        test_async_execute_query()
+        test_query_limits()
+        test_function_index()
+        test_embedding_cache()
+        test_embedding_provider()
+        test_lexical_index()
+        test_function_hierarchy()
+        test_footprint_filtering()
+        test_spatial_prefilter()
+        test_streaming_filter()
         test_full_node()
         
         print("\n" + "=" * 60)